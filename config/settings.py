@@ -4,6 +4,7 @@ Django settings for config project.
 Generated by 'django-admin startproject' using Django 5.2.8.
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,7 +58,56 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# -----------------------
+# Teselas vectoriales (MVT)
+# -----------------------
+# Segundos que se guarda cada tesela generada en la caché de Django
+MVT_CACHE_TIMEOUT = 300
+
+# -----------------------
+# Caché (teselas y respuestas ya serializadas)
+# -----------------------
+# CACHE_BACKEND=locmem|file|redis y CACHE_LOCATION (ruta o URL redis://).
+# locmem es por proceso: con varios workers conviene file o redis. Con locmem
+# tampoco funciona el comando response_cache_stats (los contadores de
+# aciertos/fallos quedan en la memoria de cada proceso del servidor).
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get('CACHE_LOCATION', {
+            'locmem': 'drones-gis',
+            'file': str(BASE_DIR / '.cache'),
+            'redis': 'redis://localhost:6379/1',
+        }[CACHE_BACKEND]),
+        'TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 300)),
+    }
+}
+
+# Colecciones de la API y exportaciones ya renderizadas (core.response_cache).
+# La clave incluye la versión de los datos, así que no hace falta caducarlas
+# pronto: cualquier cambio en la BD genera claves nuevas.
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') != '0'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 3600))
+# Las respuestas más grandes no se guardan (bytes)
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+# Instrumentación por petición (core.middleware.PerformanceMiddleware):
+# cabecera Server-Timing + línea JSON en el logger "core.performance".
+# Desactivada por defecto; con PERF_PROFILE_PATTERN (regex sobre la ruta)
+# se guarda un perfil cProfile de una fracción de esas peticiones.
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', '0') == '1'
+PERF_PROFILE_PATTERN = os.environ.get('PERF_PROFILE_PATTERN', '')
+PERF_PROFILE_SAMPLE_RATE = float(os.environ.get('PERF_PROFILE_SAMPLE_RATE', 0.05))
+PERF_PROFILE_DIR = os.environ.get('PERF_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',  # solo con PERF_INSTRUMENTATION=1
     'corsheaders.middleware.CorsMiddleware',  # lo más arriba posible
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -71,6 +121,21 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -27,6 +27,7 @@ from core.views import (
     delete_flight,
     edit_flight_path,
     api_save_flight_path,
+    vector_tile,
 )
 
 # Router DRF
@@ -62,6 +63,9 @@ urlpatterns = [
     path('export/flights.geojson', export_flights_geojson, name='export_flights_geojson'),
     path('flight/<int:flight_id>/export/', export_single_flight_geojson, name='export_single_flight'),
 
+    # Teselas vectoriales (MVT)
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', vector_tile, name='vector_tile'),
+
     # Cambio de idioma
     path('set-language/', set_language, name='set_language'),
 ]
@@ -0,0 +1,206 @@
+# core/conflicts.py
+
+"""
+Detección de conflictos entre rutas de vuelo y zonas UAS.
+
+Para cada vuelo:
+  1. se buscan las zonas candidatas por bounding box (índice en rejilla),
+  2. se descartan los segmentos de la ruta que no tocan la bbox de la zona,
+  3. se calculan con NumPy, de una vez, todas las intersecciones
+     segmento de ruta × arista de zona,
+  4. se recorren los cruces en orden para obtener los tramos
+     de entrada/salida en cada zona.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.db.models import Q
+
+from .geometry import bbox_of, extract_lines, point_in_polygons
+from .zone_index import ZoneIndex
+
+# Palabras clave (en zone_type) de las zonas que se consideran conflicto;
+# son las mismas que usa el visor para pintar en rojo/naranja.
+CONFLICT_ZONE_KEYWORDS = ("prohib", "restr")
+
+# Límite de celdas de la matriz segmentos × aristas por bloque
+_MAX_PAIRS_PER_CHUNK = 2_000_000
+
+
+def conflict_zones_filter() -> Q:
+    """
+    Filtro SQL con las zonas prohibidas o restringidas.
+    """
+    q = Q()
+    for keyword in CONFLICT_ZONE_KEYWORDS:
+        q |= Q(zone_type__icontains=keyword)
+    return q
+
+
+def _zone_edges(polygons) -> np.ndarray:
+    """
+    Aristas de todos los anillos de la zona como array (m, 4):
+    x1, y1, x2, y2.
+    """
+    edges = []
+    for rings in polygons:
+        for ring in rings:
+            pts = np.asarray(ring, dtype=float)
+            if len(pts) < 2:
+                continue
+            if not np.array_equal(pts[0], pts[-1]):
+                pts = np.vstack([pts, pts[:1]])
+            edges.append(np.hstack([pts[:-1], pts[1:]]))
+    if not edges:
+        return np.empty((0, 4))
+    return np.vstack(edges)
+
+
+def _crossings(path: np.ndarray, edges: np.ndarray, bbox) -> np.ndarray:
+    """
+    Posiciones a lo largo de la ruta (índice de segmento + fracción)
+    donde la ruta corta alguna arista de la zona.
+    """
+    p1 = path[:-1]
+    p2 = path[1:]
+
+    # Solo los segmentos cuya bbox toca la bbox de la zona
+    seg_min = np.minimum(p1, p2)
+    seg_max = np.maximum(p1, p2)
+    mask = (
+        (seg_max[:, 0] >= bbox[0]) & (seg_min[:, 0] <= bbox[2]) &
+        (seg_max[:, 1] >= bbox[1]) & (seg_min[:, 1] <= bbox[3])
+    )
+    seg_idx = np.nonzero(mask)[0]
+    if not len(seg_idx) or not len(edges):
+        return np.empty(0)
+
+    q1 = edges[:, 0:2]
+    q2 = edges[:, 2:4]
+    s = q2 - q1
+
+    positions = []
+    chunk = max(1, _MAX_PAIRS_PER_CHUNK // len(edges))
+    for start in range(0, len(seg_idx), chunk):
+        idx = seg_idx[start:start + chunk]
+        a = p1[idx][:, None, :]          # (k, 1, 2)
+        r = (p2[idx] - p1[idx])[:, None, :]
+        qp = q1[None, :, :] - a          # (k, m, 2)
+
+        denom = r[..., 0] * s[None, :, 1] - r[..., 1] * s[None, :, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (qp[..., 0] * s[None, :, 1] - qp[..., 1] * s[None, :, 0]) / denom
+            u = (qp[..., 0] * r[..., 1] - qp[..., 1] * r[..., 0]) / denom
+
+        hit = (denom != 0) & (t >= 0) & (t < 1) & (u >= 0) & (u < 1)
+        rows, cols = np.nonzero(hit)
+        if len(rows):
+            positions.append(idx[rows] + t[rows, cols])
+
+    if not positions:
+        return np.empty(0)
+    return np.unique(np.round(np.concatenate(positions), 12))
+
+
+def _point_at(path: np.ndarray, position: float) -> List[float]:
+    i = min(int(position), len(path) - 2)
+    frac = position - i
+    x, y = path[i] + (path[i + 1] - path[i]) * frac
+    return [float(x), float(y)]
+
+
+def _segments_inside(path: np.ndarray, polygons, edges: np.ndarray, bbox) -> List[dict]:
+    """
+    Tramos de la ruta dentro de la zona, con sus puntos de entrada y salida.
+    Si la ruta empieza (o acaba) dentro, la entrada (o salida) es None.
+    """
+    crossings = _crossings(path, edges, bbox)
+    inside = point_in_polygons(float(path[0, 0]), float(path[0, 1]), polygons)
+
+    if not len(crossings) and not inside:
+        return []
+
+    segments = []
+    entry: Optional[List[float]] = None
+    current_inside = inside
+    for pos in crossings:
+        pt = _point_at(path, pos)
+        if current_inside:
+            segments.append({"entry": entry, "exit": pt})
+            entry = None
+        else:
+            entry = pt
+        current_inside = not current_inside
+
+    if current_inside:
+        segments.append({"entry": entry, "exit": None})
+    return segments
+
+
+class ConflictChecker:
+    """
+    Comprueba rutas contra un conjunto de zonas. Conviene reutilizar
+    la misma instancia para muchos vuelos: las aristas de cada zona
+    se convierten a NumPy una sola vez.
+    """
+
+    def __init__(self, index: ZoneIndex):
+        self.index = index
+        self._edges: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def for_bbox(cls, bbox=None, all_zones: bool = False):
+        from .models import Zone
+
+        qs = Zone.objects.all() if all_zones else Zone.objects.filter(conflict_zones_filter())
+        return cls(ZoneIndex.for_bbox(bbox, queryset=qs))
+
+    def _edges_for(self, pk) -> np.ndarray:
+        if pk not in self._edges:
+            self._edges[pk] = _zone_edges(self.index.polygons[pk])
+        return self._edges[pk]
+
+    def check(self, path_geojson) -> List[dict]:
+        """
+        Devuelve una lista de conflictos:
+          [{"zone_id", "name", "zone_type", "segments": [{"entry", "exit"}, ...]}]
+        Los puntos son [lon, lat].
+        """
+        conflicts: Dict[int, dict] = {}
+
+        for line in extract_lines(path_geojson):
+            path = np.asarray(line, dtype=float)
+            line_bbox = (path[:, 0].min(), path[:, 1].min(),
+                         path[:, 0].max(), path[:, 1].max())
+
+            for pk in self.index.grid.query_bbox(line_bbox):
+                zone = self.index.zones[pk]
+                zbbox = (zone.min_lon, zone.min_lat, zone.max_lon, zone.max_lat)
+                segments = _segments_inside(
+                    path, self.index.polygons[pk], self._edges_for(pk), zbbox
+                )
+                if not segments:
+                    continue
+                entry = conflicts.setdefault(pk, {
+                    "zone_id": pk,
+                    "name": zone.name,
+                    "zone_type": zone.zone_type,
+                    "segments": [],
+                })
+                entry["segments"].extend(segments)
+
+        return sorted(conflicts.values(), key=lambda c: c["zone_id"])
+
+
+def check_flight_conflicts(path_geojson, all_zones: bool = False) -> List[dict]:
+    """
+    Atajo para comprobar una sola ruta: solo carga las zonas
+    cuya bbox intersecta con la de la ruta.
+    """
+    bbox = bbox_of(path_geojson)
+    if bbox is None:
+        return []
+    return ConflictChecker.for_bbox(bbox, all_zones=all_zones).check(path_geojson)
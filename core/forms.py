@@ -1,7 +1,8 @@
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Photo, Flight
-from .utils_exif import extract_gps_from_image
+from .utils_exif import extract_exif_metadata
 
 
 def dms_to_decimal(dms, ref):
@@ -66,13 +67,19 @@ class PhotoUploadForm(forms.ModelForm):
             lon = float(lon.replace(",", "."))
             cleaned_data["lon"] = lon
 
-        # Si el usuario NO introduce coordenadas → usar EXIF automáticamente
-        if image and (lat is None or lon is None):
-            gps = extract_gps_from_image(image)
+        # Si el usuario NO introduce coordenadas o fecha → usar EXIF automáticamente
+        if image and (lat is None or lon is None or not cleaned_data.get("taken_at")):
+            meta = extract_exif_metadata(image)
 
-            if gps:
-                cleaned_data["lat"] = gps.get("lat")
-                cleaned_data["lon"] = gps.get("lon")
+            if meta and (lat is None or lon is None) and meta["lat"] is not None:
+                cleaned_data["lat"] = meta["lat"]
+                cleaned_data["lon"] = meta["lon"]
+
+            if meta and meta["taken_at"] and not cleaned_data.get("taken_at"):
+                taken_at = meta["taken_at"]
+                if timezone.is_naive(taken_at):
+                    taken_at = timezone.make_aware(taken_at)
+                cleaned_data["taken_at"] = taken_at
 
         # Validación final de rangos
         lat = cleaned_data.get("lat")
@@ -0,0 +1,207 @@
+# core/geodesy.py
+
+"""
+Cálculos geodésicos vectorizados con NumPy.
+
+Todas las funciones trabajan sobre arrays de latitudes y longitudes
+en grados (no sobre listas de puntos de una en una), así que el coste
+por vértice es mínimo incluso con rutas de cientos de miles de puntos.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
+
+# Radio medio de la Tierra (IUGG), el mismo que usaba Flight._haversine_km
+EARTH_RADIUS_KM = 6371.0088
+
+# Elipsoide WGS84
+WGS84_A = 6378.137                 # semieje mayor (km)
+WGS84_F = 1 / 298.257223563        # aplanamiento
+WGS84_B = WGS84_A * (1 - WGS84_F)  # semieje menor (km)
+
+
+def as_lat_lon(points: Sequence[Tuple[float, float]]):
+    """
+    Convierte una secuencia de (lat, lon) en dos arrays float.
+    """
+    arr = np.asarray(points, dtype=float).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Distancia de gran círculo (km) entre pares de puntos; admite
+    escalares o arrays del mismo tamaño.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.asarray(lon2) - np.asarray(lon1))
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def vincenty_km(lat1, lon1, lat2, lon2, max_iter: int = 200, tol: float = 1e-12):
+    """
+    Distancia sobre el elipsoide WGS84 (fórmula inversa de Vincenty),
+    vectorizada. Los pares que no convergen (casi antípodas) se
+    resuelven con haversine.
+    """
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+        np.asarray(lat1, dtype=float), np.asarray(lon1, dtype=float),
+        np.asarray(lat2, dtype=float), np.asarray(lon2, dtype=float),
+    )
+
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.zeros(L.shape, dtype=bool)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.sqrt((cosU2 * sin_lam) ** 2 +
+                                (cosU1 * sinU2 - sinU1 * cosU2 * cos_lam) ** 2)
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0,
+                                    cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_new = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam_new - lam) < tol
+            lam = lam_new
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (
+            cos_2sigma_m + B / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+                B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+            )
+        )
+        dist = WGS84_B * A * (sigma - delta_sigma)
+
+    # Puntos idénticos → 0; sin convergencia → haversine
+    dist = np.where(sin_sigma == 0, 0.0, dist)
+    if not converged.all():
+        dist = np.where(converged, dist, haversine_km(lat1, lon1, lat2, lon2))
+    return dist
+
+
+def segment_lengths_km(lats, lons, method: str = "haversine"):
+    """
+    Longitud (km) de cada segmento de una polilínea: array de n-1 valores.
+    method: "haversine" (esfera) o "vincenty" (elipsoide WGS84).
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if lats.size < 2:
+        return np.zeros(0)
+    fn = vincenty_km if method == "vincenty" else haversine_km
+    return fn(lats[:-1], lons[:-1], lats[1:], lons[1:])
+
+
+def cumulative_distance_km(lats, lons, method: str = "haversine"):
+    """
+    Distancia acumulada (km) en cada vértice; el primero vale 0.
+    """
+    seg = segment_lengths_km(lats, lons, method=method)
+    out = np.zeros(seg.size + 1)
+    np.cumsum(seg, out=out[1:])
+    return out
+
+
+def path_length_km(lats, lons, method: str = "haversine") -> float:
+    """
+    Longitud total (km) de una polilínea.
+    """
+    return float(segment_lengths_km(lats, lons, method=method).sum())
+
+
+def bearings_deg(lats, lons):
+    """
+    Rumbo inicial (grados, 0-360, 0 = norte) de cada segmento.
+    """
+    phi1 = np.radians(np.asarray(lats[:-1], dtype=float))
+    phi2 = np.radians(np.asarray(lats[1:], dtype=float))
+    dlambda = np.radians(np.asarray(lons[1:], dtype=float) - np.asarray(lons[:-1], dtype=float))
+
+    y = np.sin(dlambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return (np.degrees(np.arctan2(y, x)) + 360.0) % 360.0
+
+
+def path_lengths_km(paths: Iterable[Sequence[Tuple[float, float]]], method: str = "haversine"):
+    """
+    Longitud total de muchas rutas a la vez. Cada ruta es una secuencia
+    de (lat, lon). Concatena todos los vértices en un único array y hace
+    una sola pasada vectorizada, descartando los "segmentos" que unen
+    el final de una ruta con el inicio de la siguiente.
+    """
+    arrays = [np.asarray(p, dtype=float).reshape(-1, 2) for p in paths]
+    if not arrays:
+        return np.zeros(0)
+
+    sizes = np.array([len(a) for a in arrays])
+    allpts = np.vstack(arrays) if sizes.sum() else np.zeros((0, 2))
+    seg = segment_lengths_km(allpts[:, 0], allpts[:, 1], method=method)
+
+    # Índice del último vértice de cada ruta dentro del array global
+    ends = np.cumsum(sizes) - 1
+    valid = np.ones(seg.size, dtype=bool)
+    boundaries = ends[:-1]
+    valid[boundaries[(boundaries >= 0) & (boundaries < seg.size)]] = False
+    seg = np.where(valid, seg, 0.0)
+
+    # Suma por ruta: segmentos [inicio, fin-1] de cada una
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    last = cum.size - 1
+    starts = np.clip(ends - sizes + 1, 0, last)
+    totals = cum[np.clip(ends, 0, last)] - cum[starts]
+    return np.where(sizes >= 2, totals, 0.0)
+
+
+def resample_path(lats, lons, frames: int, method: str = "haversine"):
+    """
+    Remuestrea una polilínea en `frames` puntos equiespaciados a lo largo
+    de su longitud (el primero y el último coinciden con los extremos).
+
+    Calcula una vez la distancia acumulada de los vértices y localiza
+    todas las distancias objetivo con una búsqueda binaria (searchsorted);
+    cada punto se interpola linealmente dentro de su segmento.
+    Devuelve (lats, lons, distancia total en km).
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if lats.size < 2 or frames < 2:
+        return lats[:1].copy(), lons[:1].copy(), 0.0
+
+    cum = cumulative_distance_km(lats, lons, method=method)
+    total = float(cum[-1])
+    targets = np.linspace(0.0, total, frames)
+
+    # Segmento que contiene cada objetivo: cum[i] <= d < cum[i + 1]
+    idx = np.clip(np.searchsorted(cum, targets, side="right") - 1, 0, lats.size - 2)
+    seg = cum[idx + 1] - cum[idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(seg > 0, (targets - cum[idx]) / seg, 0.0)
+
+    out_lats = lats[idx] + t * (lats[idx + 1] - lats[idx])
+    out_lons = lons[idx] + t * (lons[idx + 1] - lons[idx])
+    return out_lats, out_lons, total
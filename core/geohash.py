@@ -0,0 +1,174 @@
+# core/geohash.py
+
+"""
+Geohash para indexar puntos (fotos) sin PostGIS.
+
+Un geohash intercala los bits de longitud y latitud (curva Z), así que
+los puntos de una misma celda comparten prefijo y las celdas vecinas
+suelen quedar contiguas en el orden alfabético. Una consulta por bbox se
+traduce en unos pocos rangos de texto (geohash BETWEEN a AND b) que
+resuelve el índice B-tree normal de PostgreSQL o SQLite; después se
+afina con lat/lon exactos.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import List, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {ch: i for i, ch in enumerate(BASE32)}
+
+# Longitud guardada en Photo.geohash: 12 caracteres ≈ 4 cm
+GEOHASH_PRECISION = 12
+
+# Nº máximo de celdas con las que se cubre un bbox en una consulta
+MAX_COVER_CELLS = 32
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    out = []
+    bits = 0
+    value = 0
+    even = True  # los bits pares son de longitud
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                value = (value << 1) | 1
+                lon_lo = mid
+            else:
+                value <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(BASE32[value])
+            bits = value = 0
+    return "".join(out)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    Tamaño (grados de lon, grados de lat) de una celda de esa longitud.
+    """
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 360.0 / (1 << lon_bits), 180.0 / (1 << lat_bits)
+
+
+def decode_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    Celda de un geohash como (min_lon, min_lat, max_lon, max_lat).
+    """
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for ch in geohash:
+        value = _DECODE[ch]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lon_lo, lat_lo, lon_hi, lat_hi
+
+
+def _index(geohash: str) -> int:
+    value = 0
+    for ch in geohash:
+        value = (value << 5) | _DECODE[ch]
+    return value
+
+
+def _from_index(value: int, precision: int) -> str:
+    chars = []
+    for _ in range(precision):
+        chars.append(BASE32[value & 0x1F])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def cover_bbox(bbox, max_cells: int = MAX_COVER_CELLS) -> List[str]:
+    """
+    Geohashes (todos de la misma longitud, la mayor posible sin pasar
+    de max_cells) cuyas celdas cubren el bbox.
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+
+    precision = 1
+    for p in range(1, GEOHASH_PRECISION + 1):
+        dlon, dlat = cell_size(p)
+        nx = math.floor((max_lon + 180.0) / dlon) - math.floor((min_lon + 180.0) / dlon) + 1
+        ny = math.floor((max_lat + 90.0) / dlat) - math.floor((min_lat + 90.0) / dlat) + 1
+        if nx * ny > max_cells:
+            break
+        precision = p
+
+    dlon, dlat = cell_size(precision)
+    cells = set()
+    # Se recorre la rejilla por los centros de celda; los bordes del bbox
+    # se recortan para no salirse del mundo
+    x0 = math.floor((min_lon + 180.0) / dlon)
+    x1 = min(math.floor((max_lon + 180.0) / dlon), round(360.0 / dlon) - 1)
+    y0 = math.floor((min_lat + 90.0) / dlat)
+    y1 = min(math.floor((max_lat + 90.0) / dlat), round(180.0 / dlat) - 1)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            cells.add(encode(-90.0 + (y + 0.5) * dlat, -180.0 + (x + 0.5) * dlon, precision))
+    return sorted(cells)
+
+
+def prefix_ranges(prefixes) -> List[Tuple[str, str]]:
+    """
+    Convierte prefijos de la misma longitud en rangos (desde, hasta)
+    inclusivos sobre geohashes completos, fusionando los consecutivos.
+    """
+    if not prefixes:
+        return []
+    precision = len(prefixes[0])
+    pad = GEOHASH_PRECISION - precision
+    indexes = sorted(_index(p) for p in prefixes)
+
+    ranges = []
+    start = prev = indexes[0]
+    for value in indexes[1:]:
+        if value != prev + 1:
+            ranges.append((start, prev))
+            start = value
+        prev = value
+    ranges.append((start, prev))
+
+    # Solo caracteres del alfabeto: el orden es el mismo con cualquier
+    # collation (no se usa un centinela como "~")
+    return [
+        (_from_index(lo, precision), _from_index(hi, precision) + BASE32[-1] * pad)
+        for lo, hi in ranges
+    ]
+
+
+def bbox_ranges(bbox, max_cells: int = MAX_COVER_CELLS) -> List[Tuple[str, str]]:
+    """
+    Rangos de geohash que cubren un bbox; lista vacía si abarcan el
+    mundo entero (filtrar por geohash no descartaría nada).
+    """
+    ranges = prefix_ranges(cover_bbox(bbox, max_cells))
+    if ranges == [(BASE32[0], BASE32[-1] * GEOHASH_PRECISION)]:
+        return []
+    return ranges
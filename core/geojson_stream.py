@@ -0,0 +1,263 @@
+# core/geojson_stream.py
+
+"""
+Utilidades para escribir y leer GeoJSON de forma incremental (feature a
+feature), sin construir nunca la colección completa en memoria.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Union
+
+# Tamaño aproximado de cada bloque enviado al cliente
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _dumps(obj) -> str:
+    # Salida compacta: en exportaciones grandes los espacios pesan
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _buffered(parts: Iterable[str], size: int) -> Iterator[bytes]:
+    """
+    Agrupa trozos pequeños de texto en bloques de ~size bytes para no
+    enviar al servidor WSGI/ASGI un fragmento por feature.
+    """
+    buf = []
+    buffered = 0
+    for part in parts:
+        data = part.encode("utf-8")
+        buf.append(data)
+        buffered += len(data)
+        if buffered >= size:
+            yield b"".join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield b"".join(buf)
+
+
+def feature_collection_chunks(features: Iterable[dict], chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Genera un FeatureCollection GeoJSON por trozos a partir de
+    un iterable (normalmente un generador) de Features.
+    """
+    def _parts():
+        yield '{"type":"FeatureCollection","features":['
+        first = True
+        for feature in features:
+            if first:
+                first = False
+                yield _dumps(feature)
+            else:
+                yield "," + _dumps(feature)
+        yield "]}"
+
+    return _buffered(_parts(), chunk_size)
+
+
+# Separador de registro de RFC 8142 (GeoJSON Text Sequences)
+RS = "\x1e"
+
+# Formatos de exportación soportados: nombre -> (content type, extensión)
+EXPORT_FORMATS = {
+    "geojson": ("application/geo+json", "geojson"),
+    "geojsonseq": ("application/geo+json-seq", "geojsons"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def feature_sequence_chunks(features: Iterable[dict], record_separator: bool = True,
+                            chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Genera una secuencia de Features, uno por línea.
+    Con record_separator=True cada registro va precedido de RS (RFC 8142);
+    sin él se obtiene GeoJSON delimitado por saltos de línea (NDJSON).
+    """
+    prefix = RS if record_separator else ""
+
+    def _parts():
+        for feature in features:
+            yield prefix + _dumps(feature) + "\n"
+
+    return _buffered(_parts(), chunk_size)
+
+
+def feature_chunks(features: Iterable[dict], fmt: str = "geojson") -> Iterator[bytes]:
+    """
+    Serializa los Features en el formato indicado (ver EXPORT_FORMATS).
+    """
+    if fmt == "geojsonseq":
+        return feature_sequence_chunks(features, record_separator=True)
+    if fmt == "ndjson":
+        return feature_sequence_chunks(features, record_separator=False)
+    return feature_collection_chunks(features)
+
+
+async def _aiterate(items):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def afeature_chunks(features: Union[AsyncIterable[dict], Iterable[dict]], fmt: str = "geojson",
+                          chunk_size: int = STREAM_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """
+    Versión asíncrona de feature_chunks para StreamingHttpResponse con
+    ASGI: los Features pueden venir de un iterador asíncrono (p. ej.
+    QuerySet.aiterator()), así que esperar a la BD no bloquea el worker.
+    """
+    if fmt == "geojson":
+        head, tail, separator, prefix, suffix = '{"type":"FeatureCollection","features":[', "]}", ",", "", ""
+    else:
+        head, tail, separator = "", "", ""
+        prefix, suffix = (RS if fmt == "geojsonseq" else ""), "\n"
+
+    buf = [head.encode("utf-8")]
+    buffered = len(buf[0])
+    first = True
+    async for feature in _aiterate(features):
+        part = prefix + _dumps(feature) + suffix
+        if not first:
+            part = separator + part
+        first = False
+        data = part.encode("utf-8")
+        buf.append(data)
+        buffered += len(data)
+        if buffered >= chunk_size:
+            yield b"".join(buf)
+            buf = []
+            buffered = 0
+    buf.append(tail.encode("utf-8"))
+    data = b"".join(buf)
+    if data:
+        yield data
+
+
+def iter_feature_sequence(stream) -> Iterator[dict]:
+    """
+    Lee una secuencia GeoJSON (RFC 8142 o NDJSON) de un fichero abierto
+    en modo texto y devuelve los Features de uno en uno.
+    Si algún registro es un FeatureCollection, se devuelven sus Features.
+    """
+    for lineno, line in enumerate(stream, start=1):
+        text = line.strip().lstrip(RS).strip()
+        if not text:
+            continue
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Línea {lineno}: JSON no válido ({exc.msg})")
+
+        if isinstance(obj, dict) and obj.get("type") == "FeatureCollection":
+            yield from obj.get("features") or []
+        else:
+            yield obj
+
+
+class _StreamDecoder:
+    """
+    Lector JSON incremental sobre un fichero de texto: mantiene en memoria
+    solo un bloque de lectura más el valor que se está decodificando.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, stream, chunk_size: int = STREAM_CHUNK_BYTES):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> None:
+        # Descartar lo ya consumido antes de leer más
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.stream.read(size)
+        if data:
+            self.buf += data
+        else:
+            self.eof = True
+
+    def peek(self) -> str:
+        """
+        Siguiente carácter significativo (sin consumirlo); "" al final.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill(self.chunk_size)
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Se esperaba '{char}' y se encontró '{found or 'fin de fichero'}'")
+        self.pos += 1
+
+    def value(self):
+        """
+        Decodifica el siguiente valor JSON completo.
+        """
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if self.eof:
+                    raise ValueError(f"JSON no válido ({exc.msg})")
+                # Valor incompleto: leer al menos otro tanto como lo pendiente
+                self._fill(max(self.chunk_size, len(self.buf) - self.pos))
+                continue
+            # Un número al final del buffer puede estar cortado
+            if end == len(self.buf) and not self.eof:
+                self._fill(self.chunk_size)
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_feature_collection(stream, chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[dict]:
+    """
+    Lee un FeatureCollection GeoJSON de un fichero abierto en modo texto
+    y devuelve sus Features de uno en uno, sin cargar el fichero entero:
+    la memoria usada depende del Feature más grande, no del tamaño total.
+    """
+    reader = _StreamDecoder(stream, chunk_size)
+    reader.expect("{")
+
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        reader.expect(":")
+
+        if key == "features":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.peek() == "]":
+                        break
+                    reader.expect(",")
+            # Lo que venga después de "features" no nos interesa
+            return
+
+        # Otras claves (type, name, crs...) son pequeñas y se descartan
+        reader.value()
+        if reader.peek() == "}":
+            return
+        reader.expect(",")
@@ -0,0 +1,245 @@
+# core/geometry.py
+
+from __future__ import annotations
+
+import json
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+
+# Un punto GeoJSON siempre es (lon, lat)
+Coord = Tuple[float, float]
+Ring = List[Coord]
+
+
+def _load(gj: Any) -> Any:
+    """
+    Si el GeoJSON viene guardado como texto, intenta parsearlo.
+    """
+    if isinstance(gj, str):
+        try:
+            return json.loads(gj)
+        except Exception:
+            return None
+    return gj
+
+
+def iter_geometries(gj: Any) -> Iterator[dict]:
+    """
+    Recorre cualquier objeto GeoJSON (geometry, Feature, FeatureCollection
+    o GeometryCollection) y devuelve las geometrías simples que contiene.
+    """
+    gj = _load(gj)
+    if not isinstance(gj, dict):
+        return
+
+    gtype = gj.get("type")
+
+    if gtype == "FeatureCollection":
+        for feat in gj.get("features") or []:
+            yield from iter_geometries(feat)
+    elif gtype == "Feature":
+        yield from iter_geometries(gj.get("geometry"))
+    elif gtype == "GeometryCollection":
+        for geom in gj.get("geometries") or []:
+            yield from iter_geometries(geom)
+    elif gtype in ("Point", "MultiPoint", "LineString", "MultiLineString",
+                   "Polygon", "MultiPolygon"):
+        yield gj
+
+
+def _clean_coords(coords: Any) -> List[Coord]:
+    """
+    Convierte una lista de posiciones GeoJSON en tuplas (lon, lat) float,
+    descartando las que no sean válidas.
+    """
+    points: List[Coord] = []
+    for c in coords or []:
+        if not isinstance(c, (list, tuple)) or len(c) < 2:
+            continue
+        try:
+            points.append((float(c[0]), float(c[1])))
+        except (TypeError, ValueError):
+            continue
+    return points
+
+
+def extract_lines(gj: Any) -> List[List[Coord]]:
+    """
+    Devuelve todas las líneas (lista de (lon, lat)) de un objeto GeoJSON.
+    """
+    lines: List[List[Coord]] = []
+    for geom in iter_geometries(gj):
+        gtype = geom.get("type")
+        coords = geom.get("coordinates") or []
+        if gtype == "LineString":
+            parts = [coords]
+        elif gtype == "MultiLineString":
+            parts = coords
+        else:
+            continue
+        for part in parts:
+            line = _clean_coords(part)
+            if len(line) >= 2:
+                lines.append(line)
+    return lines
+
+
+def extract_polygons(gj: Any) -> List[List[Ring]]:
+    """
+    Devuelve todos los polígonos de un objeto GeoJSON.
+    Cada polígono es una lista de anillos: el primero es el exterior y
+    el resto son huecos.
+    """
+    polygons: List[List[Ring]] = []
+    for geom in iter_geometries(gj):
+        gtype = geom.get("type")
+        coords = geom.get("coordinates") or []
+        if gtype == "Polygon":
+            parts = [coords]
+        elif gtype == "MultiPolygon":
+            parts = coords
+        else:
+            continue
+        for part in parts:
+            rings = [_clean_coords(ring) for ring in part or []]
+            rings = [ring for ring in rings if len(ring) >= 3]
+            if rings:
+                polygons.append(rings)
+    return polygons
+
+
+def bbox_of(gj: Any):
+    """
+    Bounding box (min_lon, min_lat, max_lon, max_lat) de un objeto GeoJSON,
+    o None si no contiene coordenadas válidas.
+    """
+    min_lon = min_lat = float("inf")
+    max_lon = max_lat = float("-inf")
+
+    def _walk(coords):
+        nonlocal min_lon, min_lat, max_lon, max_lat
+        if not isinstance(coords, (list, tuple)) or not coords:
+            return
+        if isinstance(coords[0], (int, float)):
+            if len(coords) < 2:
+                return
+            try:
+                lon, lat = float(coords[0]), float(coords[1])
+            except (TypeError, ValueError):
+                return
+            min_lon, max_lon = min(min_lon, lon), max(max_lon, lon)
+            min_lat, max_lat = min(min_lat, lat), max(max_lat, lat)
+            return
+        for c in coords:
+            _walk(c)
+
+    for geom in iter_geometries(gj):
+        _walk(geom.get("coordinates"))
+
+    if min_lon == float("inf"):
+        return None
+    return (min_lon, min_lat, max_lon, max_lat)
+
+
+# Por debajo de este nº de puntos un tramo se procesa en Python puro:
+# el coste fijo de NumPy no compensa
+_SMALL_RANGE = 48
+
+
+def _farthest(pts, start: int, end: int):
+    """
+    Punto de pts[start+1:end] más alejado del segmento start-end
+    (en unidades planas): (índice, distancia).
+    """
+    ax, ay = pts[start]
+    dx = pts[end][0] - ax
+    dy = pts[end][1] - ay
+    denom = dx * dx + dy * dy
+    best, index = -1.0, start + 1
+    for i in range(start + 1, end):
+        px = pts[i][0] - ax
+        py = pts[i][1] - ay
+        if denom:
+            t = min(1.0, max(0.0, (px * dx + py * dy) / denom))
+            px -= t * dx
+            py -= t * dy
+        d = px * px + py * py
+        if d > best:
+            best, index = d, i
+    return index, best ** 0.5
+
+
+def simplify_dp(points, tolerance: float):
+    """
+    Simplificación Douglas–Peucker (iterativa, sin recursión) de una
+    secuencia de puntos. Conserva siempre el primer y el último punto.
+    En los tramos largos (rutas de telemetría con decenas de miles de
+    puntos) calcula todas las distancias de una vez con NumPy.
+    """
+    n = len(points)
+    if tolerance <= 0 or n < 3:
+        return list(points)
+
+    pts = np.asarray(points, dtype=float)
+    plain = pts.tolist()
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        if end - start < _SMALL_RANGE:
+            index, max_dist = _farthest(plain, start, end)
+        else:
+            a = pts[start]
+            ab = pts[end] - a
+            ap = pts[start + 1:end] - a
+            denom = float(ab @ ab)
+            if denom == 0:
+                dist = np.hypot(ap[:, 0], ap[:, 1])
+            else:
+                t = np.clip((ap @ ab) / denom, 0.0, 1.0)
+                dist = np.hypot(ap[:, 0] - t * ab[0], ap[:, 1] - t * ab[1])
+            i = int(np.argmax(dist))
+            index, max_dist = start + 1 + i, float(dist[i])
+        if max_dist > tolerance:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return [p for p, k in zip(points, keep) if k]
+
+
+def point_in_ring(lon: float, lat: float, ring) -> bool:
+    """
+    Test de punto en anillo por ray casting (regla par-impar).
+    """
+    inside = False
+    n = len(ring)
+    j = n - 1
+    for i in range(n):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat):
+            x_cross = (xj - xi) * (lat - yi) / (yj - yi) + xi
+            if lon < x_cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygons(lon: float, lat: float, polygons) -> bool:
+    """
+    True si el punto cae dentro de alguno de los polígonos
+    (dentro del exterior y fuera de todos sus huecos).
+    """
+    for rings in polygons:
+        if not rings or not point_in_ring(lon, lat, rings[0]):
+            continue
+        if any(point_in_ring(lon, lat, hole) for hole in rings[1:]):
+            continue
+        return True
+    return False
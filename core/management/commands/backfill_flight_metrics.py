@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Flight
+from core.versioning import bump
+
+
+class Command(BaseCommand):
+    help = "Recalcula las métricas persistidas de la ruta (distancia, bbox, nº de puntos) de todos los vuelos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Número de vuelos actualizados por cada bulk_update (por defecto 500).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        fields = list(Flight.METRIC_FIELDS)
+
+        batch = []
+        updated = 0
+
+        for flight in Flight.objects.order_by("id").iterator(chunk_size=batch_size):
+            flight.update_path_metrics()
+            batch.append(flight)
+            if len(batch) >= batch_size:
+                Flight.objects.bulk_update(batch, fields)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Flight.objects.bulk_update(batch, fields)
+            updated += len(batch)
+
+        if updated:
+            bump("flight")
+        self.stdout.write(self.style.SUCCESS(f"Métricas recalculadas para {updated} vuelos."))
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Photo
+from core.versioning import bump
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula el geohash (índice espacial) de las fotos que no lo tienen, "
+        "p. ej. tras cargarlas con SQL directo. Con --all se recalculan todas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recalcula el geohash de todas las fotos, no solo de las que les falta.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Número de fotos actualizadas por cada bulk_update (por defecto 2000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        photos = Photo.objects.only("id", "lat", "lon", "geohash").order_by("id")
+        if not options["all"]:
+            photos = photos.filter(geohash="")
+
+        batch = []
+        updated = 0
+
+        for photo in photos.iterator(chunk_size=batch_size):
+            old = photo.geohash
+            photo.update_geohash()
+            if photo.geohash == old:
+                continue
+            batch.append(photo)
+            if len(batch) >= batch_size:
+                Photo.objects.bulk_update(batch, ["geohash"])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Photo.objects.bulk_update(batch, ["geohash"])
+            updated += len(batch)
+
+        # Las consultas por bbox pueden devolver fotos que antes no encontraban
+        if updated:
+            bump("photo")
+        self.stdout.write(self.style.SUCCESS(f"Geohash actualizado en {updated} fotos."))
@@ -0,0 +1,91 @@
+import glob
+import io
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils_exif import _build_metadata, _read_pillow, extract_exif_metadata
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la lectura de EXIF con Pillow frente al lector de cabecera "
+        "de core.utils_exif sobre las imágenes de Fotos_pruebas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="*",
+            help="Imágenes a medir. Por defecto: Fotos_pruebas/*.jpg",
+        )
+
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Repeticiones por imagen; se toma la mejor (por defecto 20).",
+        )
+
+    def _best_of(self, repeat, fn):
+        best = float("inf")
+        result = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or sorted(
+            glob.glob(os.path.join(settings.BASE_DIR, "Fotos_pruebas", "*.jpg"))
+        )
+        if not paths:
+            self.stderr.write("No hay imágenes que medir.")
+            return
+
+        repeat = max(1, options["repeat"])
+
+        def pillow(data):
+            parsed = _read_pillow(io.BytesIO(data))
+            return _build_metadata(*parsed) if parsed else None
+
+        self.stdout.write(f"{'imagen':<28} {'KB':>7} {'pillow (ms)':>12} {'cabecera (ms)':>14} {'x':>7}  coincide")
+
+        total_pil = total_hdr = 0.0
+        mismatches = 0
+        for path in paths:
+            # Se lee a memoria antes para medir solo el parseo, no el disco
+            with open(path, "rb") as fh:
+                data = fh.read()
+
+            t_pil, m_pil = self._best_of(repeat, lambda: pillow(data))
+            t_hdr, m_hdr = self._best_of(repeat, lambda: extract_exif_metadata(io.BytesIO(data)))
+            total_pil += t_pil
+            total_hdr += t_hdr
+
+            same = m_pil == m_hdr or (
+                m_pil and m_hdr and all(
+                    m_pil[k] == m_hdr[k] or (
+                        isinstance(m_pil[k], float) and isinstance(m_hdr[k], float)
+                        and abs(m_pil[k] - m_hdr[k]) < 1e-9
+                    )
+                    for k in m_pil
+                )
+            )
+            if not same:
+                mismatches += 1
+
+            self.stdout.write(
+                f"{os.path.basename(path)[:28]:<28} {len(data) / 1024:>7.0f} "
+                f"{t_pil * 1000:>12.3f} {t_hdr * 1000:>14.3f} "
+                f"{t_pil / t_hdr if t_hdr else 0:>7.1f}  {'sí' if same else 'NO'}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"Total: pillow {total_pil * 1000:.3f} ms, cabecera {total_hdr * 1000:.3f} ms "
+            f"({total_pil / total_hdr if total_hdr else 0:.1f}x), {mismatches} diferencias"
+        )
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from core.geodesy import path_length_km, path_lengths_km
+from core.models import Flight
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el cálculo de distancia por bucle (Flight._haversine_km) "
+        "con la versión vectorizada de core.geodesy sobre rutas sintéticas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--points",
+            type=int,
+            action="append",
+            help="Nº de vértices de la ruta (se puede repetir). Por defecto: 50, 1000, 100000.",
+        )
+
+        parser.add_argument(
+            "--flights",
+            type=int,
+            default=1000,
+            help="Nº de rutas para la prueba por lotes (por defecto 1000).",
+        )
+
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Repeticiones de cada medida; se toma la mejor (por defecto 3).",
+        )
+
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Semilla del generador aleatorio (por defecto 42).",
+        )
+
+    def _best_of(self, repeat, fn):
+        best = float("inf")
+        result = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
+
+    def _random_path(self, rng, n):
+        # Paseo aleatorio alrededor de Madrid con pasos de ~10 m
+        steps = rng.normal(scale=1e-4, size=(n, 2))
+        steps[0] = (40.4167, -3.7033)
+        return np.cumsum(steps, axis=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        repeat = max(1, options["repeat"])
+        sizes = options.get("points") or [50, 1000, 100000]
+
+        self.stdout.write("Ruta única")
+        self.stdout.write(f"{'vértices':>10} {'bucle (ms)':>12} {'numpy (ms)':>12} {'x':>8} {'dif. (m)':>10}")
+
+        for n in sizes:
+            path = self._random_path(rng, n)
+            pts = [tuple(p) for p in path]
+
+            def loop():
+                total = 0.0
+                for i in range(1, len(pts)):
+                    total += Flight._haversine_km(pts[i - 1], pts[i])
+                return total
+
+            t_loop, d_loop = self._best_of(repeat, loop)
+            t_vec, d_vec = self._best_of(repeat, lambda: path_length_km(path[:, 0], path[:, 1]))
+
+            self.stdout.write(
+                f"{n:>10} {t_loop * 1000:>12.3f} {t_vec * 1000:>12.3f} "
+                f"{t_loop / t_vec if t_vec else 0:>8.1f} {abs(d_loop - d_vec) * 1000:>10.6f}"
+            )
+
+        n_flights = options["flights"]
+        paths = [self._random_path(rng, int(rng.integers(20, 500))) for _ in range(n_flights)]
+
+        def per_flight():
+            return [path_length_km(p[:, 0], p[:, 1]) for p in paths]
+
+        t_each, _ = self._best_of(repeat, per_flight)
+        t_batch, _ = self._best_of(repeat, lambda: path_lengths_km(paths))
+
+        self.stdout.write("")
+        self.stdout.write(f"Lote de {n_flights} rutas")
+        self.stdout.write(f"  una llamada por ruta: {t_each * 1000:.3f} ms")
+        self.stdout.write(f"  path_lengths_km:      {t_batch * 1000:.3f} ms")
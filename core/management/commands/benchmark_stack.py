@@ -0,0 +1,411 @@
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.models import Flight, Photo, Zone
+
+# Tamaños predefinidos: nº de fotos, vuelos y zonas UAS
+SCALES = {
+    "10k": {"photos": 10_000, "flights": 100, "zones": 500},
+    "100k": {"photos": 100_000, "flights": 1_000, "zones": 5_000},
+    "1m": {"photos": 1_000_000, "flights": 10_000, "zones": 50_000},
+}
+
+# Rectángulo aproximado de la Península (lon/lat) donde se generan los datos
+AREA = (-9.5, 36.0, 3.5, 43.9)
+
+# bbox y zoom de las consultas espaciales: un área de ~1° alrededor de Madrid
+BENCH_BBOX = "-4.2,39.9,-3.2,40.9"
+
+# Peticiones medidas: (nombre, URL)
+ENDPOINTS = [
+    ("api_flights", "/api/flights/"),
+    ("api_flights_polyline", "/api/flights/?zoom=12&encoding=polyline"),
+    ("api_flights_page", "/api/flights/?page_size=100"),
+    ("api_photos_page", "/api/photos/?page_size=100"),
+    ("api_photos_bbox", f"/api/photos/?bbox={BENCH_BBOX}&page_size=1000"),
+    ("api_photos_clusters", f"/api/photos/clusters/?bbox={BENCH_BBOX}&zoom=9"),
+    ("api_photos_heatmap", f"/api/photos/heatmap/?bbox={BENCH_BBOX}&zoom=9"),
+    ("api_photos_timeline", "/api/photos/timeline/?bucket=day"),
+    ("api_zones", "/api/zones/"),
+    ("api_zones_zoom8", "/api/zones/?zoom=8"),
+    ("flight_list", "/flights/"),
+    ("photo_list", "/photos/"),
+    ("export_flights", "/export/flights.geojson"),
+    ("export_photos", "/export/photos.geojson"),
+    ("export_photos_ndjson", "/export/photos.geojson?format=ndjson"),
+    ("tile_photos_z8", "/tiles/photos/8/125/97.mvt"),
+    ("tile_zones_z6", "/tiles/zones/6/31/24.mvt"),
+]
+
+ZONE_TYPES = ["Zona prohibida", "Zona restringida", "Zona de control CTR", "Espacio natural protegido"]
+
+
+class _QueryCounter:
+    """
+    execute_wrapper que solo cuenta consultas (más ligero que guardar el SQL).
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos (vuelos, fotos y zonas UAS) a la escala indicada "
+        "y mide latencia, nº de consultas y memoria máxima de la API, las vistas "
+        "HTML, las exportaciones, las teselas e import_uas_zones. Escribe un "
+        "informe JSON comparable entre versiones. Por defecto todo se hace dentro "
+        "de una transacción que se deshace al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="10k",
+            help="Tamaño de los datos: 10k, 100k o 1m fotos (por defecto 10k).",
+        )
+        parser.add_argument("--photos", type=int, help="Nº de fotos (sustituye al de --scale).")
+        parser.add_argument("--flights", type=int, help="Nº de vuelos (sustituye al de --scale).")
+        parser.add_argument("--zones", type=int, help="Nº de zonas UAS (sustituye al de --scale).")
+        parser.add_argument(
+            "--path-points",
+            type=int,
+            default=300,
+            help="Vértices de cada ruta sintética (por defecto 300).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Repeticiones de cada medida (por defecto 5).",
+        )
+        parser.add_argument(
+            "--only",
+            action="append",
+            help="Mide solo los casos cuyo nombre contiene este texto (se puede repetir).",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=42,
+            help="Semilla del generador aleatorio (por defecto 42).",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Fichero JSON del informe (por defecto benchmark-<escala>.json).",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            help="Informe anterior con el que comparar las medianas.",
+        )
+        parser.add_argument(
+            "--response-cache",
+            action="store_true",
+            help="Deja activa la caché de respuestas (por defecto se desactiva para medir el trabajo real).",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Conserva los datos generados en la BD en lugar de deshacer la transacción.",
+        )
+
+    # ---------- Generación de datos ----------
+
+    def _random_path(self, rng, points):
+        start = rng.uniform((AREA[1], AREA[0]), (AREA[3], AREA[2]))
+        # Paseo aleatorio (lat, lon) con pasos de ~20 m
+        steps = rng.normal(scale=2e-4, size=(points, 2))
+        steps[0] = start
+        return np.cumsum(steps, axis=0)
+
+    def _generate_flights(self, rng, count, points):
+        base = datetime.date(2024, 1, 1)
+        paths = []
+        ids = []
+        batch = []
+        for i in range(count):
+            path = self._random_path(rng, points)
+            paths.append(path)
+            flight = Flight(
+                name=f"Benchmark {i:06d}",
+                drone_model="Synthetic",
+                date=base + datetime.timedelta(days=int(rng.integers(0, 365))),
+                path_geojson={
+                    "type": "LineString",
+                    "coordinates": np.round(path[:, ::-1], 6).tolist(),
+                },
+            )
+            # bulk_create no pasa por save()
+            flight.update_path_metrics()
+            batch.append(flight)
+            if len(batch) >= 500:
+                ids.extend(f.pk for f in Flight.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            ids.extend(f.pk for f in Flight.objects.bulk_create(batch))
+        return ids, paths
+
+    def _generate_photos(self, rng, count, flight_ids, paths, batch_size=5000):
+        start = timezone.make_aware(datetime.datetime(2024, 1, 1))
+        done = 0
+        while done < count:
+            n = min(batch_size, count - done)
+            owners = rng.integers(0, len(flight_ids), size=n)
+            seconds = rng.integers(0, 365 * 86400, size=n)
+            jitter = rng.normal(scale=5e-5, size=(n, 2))
+            photos = []
+            for k in range(n):
+                path = paths[owners[k]]
+                lat, lon = path[rng.integers(0, len(path))] + jitter[k]
+                photo = Photo(
+                    flight_id=flight_ids[owners[k]],
+                    image=f"photos/benchmark_{done + k:07d}.jpg",
+                    lat=float(lat),
+                    lon=float(lon),
+                    taken_at=start + datetime.timedelta(seconds=int(seconds[k])),
+                )
+                photo.update_geohash()
+                photos.append(photo)
+            Photo.objects.bulk_create(photos)
+            done += n
+
+    def _write_zones(self, rng, count, path):
+        features = []
+        for i in range(count):
+            lat = rng.uniform(AREA[1], AREA[3])
+            lon = rng.uniform(AREA[0], AREA[2])
+            radius = rng.uniform(0.01, 0.05)
+            angles = np.linspace(0, 2 * np.pi, 33)[:-1]
+            ring = np.column_stack([lon + radius * np.cos(angles), lat + radius * 0.8 * np.sin(angles)])
+            ring = np.round(np.vstack([ring, ring[:1]]), 6).tolist()
+            features.append({
+                "type": "Feature",
+                "id": f"BENCH-{i:06d}",
+                "properties": {
+                    "name": f"Zona benchmark {i}",
+                    "zone_type": ZONE_TYPES[i % len(ZONE_TYPES)],
+                },
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            })
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"type": "FeatureCollection", "features": features}, fh)
+
+    # ---------- Medidas ----------
+
+    def _measure(self, fn, repeat):
+        """
+        Ejecuta fn `repeat` veces midiendo tiempo, y una vez más con
+        tracemalloc para la memoria máxima (tracemalloc ralentiza, por eso
+        no se mezcla con los tiempos). Las consultas son las de la primera
+        ejecución, antes de que las cachés (teselas) estén calientes.
+        """
+        times = []
+        queries = None
+        info = {}
+        for _ in range(repeat):
+            counter = _QueryCounter()
+            with connection.execute_wrapper(counter):
+                t0 = time.perf_counter()
+                info = fn() or {}
+                times.append(time.perf_counter() - t0)
+            if queries is None:
+                queries = counter.count
+
+        tracemalloc.start()
+        try:
+            fn()
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            **info,
+            "queries": queries,
+            "latency_ms": {
+                "min": round(min(times) * 1000, 3),
+                "median": round(statistics.median(times) * 1000, 3),
+                "max": round(max(times) * 1000, 3),
+            },
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+    def _request(self, client, url):
+        def fn():
+            response = client.get(url)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            return {"status": response.status_code, "bytes": size}
+        return fn
+
+    def _selected(self, name, only):
+        return not only or any(part in name for part in only)
+
+    def _compare(self, report, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                old = {r["name"]: r for r in json.load(fh)["results"]}
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"No se puede leer el informe {path}: {exc}")
+
+        self.stdout.write("")
+        self.stdout.write(f"Comparación con {path} (mediana)")
+        self.stdout.write(f"{'caso':<24} {'antes (ms)':>11} {'ahora (ms)':>11} {'x':>7} {'consultas':>12}")
+        for result in report["results"]:
+            before = old.get(result["name"])
+            if not before:
+                continue
+            t_old = before["latency_ms"]["median"]
+            t_new = result["latency_ms"]["median"]
+            self.stdout.write(
+                f"{result['name']:<24} {t_old:>11.2f} {t_new:>11.2f} "
+                f"{(t_old / t_new if t_new else 0):>7.2f} "
+                f"{before['queries']:>5} → {result['queries']:<5}"
+            )
+
+    def handle(self, *args, **options):
+        sizes = dict(SCALES[options["scale"]])
+        for key in ("photos", "flights", "zones"):
+            if options.get(key) is not None:
+                sizes[key] = max(0, options[key])
+        sizes["flights"] = max(1, sizes["flights"])
+        repeat = max(1, options["repeat"])
+        only = options.get("only")
+        rng = np.random.default_rng(options["seed"])
+
+        # Caché propia: las entradas generadas con los datos sintéticos no
+        # deben quedar en la caché real cuando se deshace la transacción
+        overrides = {
+            "CACHES": {"default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "benchmark",
+            }},
+            "ALLOWED_HOSTS": ["*"],
+        }
+        if not options["response_cache"]:
+            overrides["RESPONSE_CACHE_ENABLED"] = False
+
+        results = []
+        generation = {}
+        with override_settings(**overrides), tempfile.TemporaryDirectory() as tmp:
+            with transaction.atomic():
+                self.stdout.write(self.style.NOTICE(
+                    f"Generando {sizes['flights']} vuelos, {sizes['photos']} fotos "
+                    f"y {sizes['zones']} zonas..."
+                ))
+                t0 = time.perf_counter()
+                flight_ids, paths = self._generate_flights(rng, sizes["flights"], max(2, options["path_points"]))
+                generation["flights_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                self._generate_photos(rng, sizes["photos"], flight_ids, paths)
+                generation["photos_s"] = round(time.perf_counter() - t0, 3)
+                del paths
+
+                zones_file = os.path.join(tmp, "zones.geojson")
+                self._write_zones(rng, sizes["zones"], zones_file)
+
+                # La importación deja las zonas en la BD para las medidas siguientes
+                def import_zones():
+                    call_command("import_uas_zones", file=zones_file, stdout=StringIO())
+
+                if sizes["zones"] and self._selected("import_uas_zones", only):
+                    result = self._measure(import_zones, repeat)
+                    results.append({"name": "import_uas_zones", "url": None, **result})
+                    self.stdout.write(f"  import_uas_zones: {result['latency_ms']['median']:.1f} ms")
+                elif sizes["zones"]:
+                    import_zones()
+
+                client = Client()
+                for name, url in ENDPOINTS:
+                    if not self._selected(name, only):
+                        continue
+                    result = self._measure(self._request(client, url), repeat)
+                    results.append({"name": name, "url": url, **result})
+                    self.stdout.write(f"  {name}: {result['latency_ms']['median']:.1f} ms")
+
+                counts = {
+                    "flights": Flight.objects.count(),
+                    "photos": Photo.objects.count(),
+                    "zones": Zone.objects.count(),
+                }
+                if not options["keep"]:
+                    transaction.set_rollback(True)
+
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "revision": _git_revision(),
+            "environment": {
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "numpy": np.__version__,
+                "database": connection.vendor,
+            },
+            "parameters": {
+                "scale": options["scale"],
+                **sizes,
+                "path_points": options["path_points"],
+                "repeat": repeat,
+                "seed": options["seed"],
+                "response_cache": options["response_cache"],
+            },
+            "rows": counts,
+            "generation": generation,
+            "results": results,
+        }
+
+        output = options.get("output") or f"benchmark-{options['scale']}.json"
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+            fh.write("\n")
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'caso':<24} {'mediana (ms)':>13} {'mín (ms)':>10} {'consultas':>10} {'memoria (KB)':>13} {'bytes':>12}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['name']:<24} {r['latency_ms']['median']:>13.2f} {r['latency_ms']['min']:>10.2f} "
+                f"{r['queries']:>10} {r['peak_memory_kb']:>13.1f} {r.get('bytes', 0):>12}"
+            )
+
+        if options.get("compare"):
+            self._compare(report, options["compare"])
+
+        self.stdout.write(self.style.SUCCESS(f"Informe guardado en {output}"))
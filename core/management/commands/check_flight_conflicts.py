@@ -0,0 +1,72 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.conflicts import ConflictChecker
+from core.models import Flight
+
+
+class Command(BaseCommand):
+    help = "Comprueba qué vuelos atraviesan zonas UAS prohibidas o restringidas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--flight",
+            type=int,
+            action="append",
+            help="Id de vuelo a comprobar (se puede repetir). Por defecto, todos.",
+        )
+
+        parser.add_argument(
+            "--all-zones",
+            action="store_true",
+            help="Comprueba contra todas las zonas, no solo prohibidas/restringidas.",
+        )
+
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Escribe el resultado completo en JSON por la salida estándar.",
+        )
+
+    def handle(self, *args, **options):
+        flights = Flight.objects.exclude(path_geojson__isnull=True).order_by("id")
+        if options.get("flight"):
+            flights = flights.filter(id__in=options["flight"])
+            if not flights.exists():
+                raise CommandError("No se encontró ningún vuelo con ruta para esos ids.")
+
+        # Con --json la salida estándar lleva solo el documento JSON
+        # (para poder pasarlo a jq); los mensajes van a stderr, sin el
+        # color de error que stderr usa por defecto
+        info = self.stderr if options.get("json") else self.stdout
+        plain = str
+
+        # Un único índice de zonas reutilizado para todos los vuelos
+        checker = ConflictChecker.for_bbox(all_zones=options.get("all_zones"))
+        info.write(f"Zonas cargadas en el índice: {len(checker.index.grid)}", style_func=plain)
+
+        report = []
+        checked = 0
+        with_conflicts = 0
+
+        for flight in flights.only("id", "name", "path_geojson").iterator(chunk_size=200):
+            conflicts = checker.check(flight.path_geojson)
+            checked += 1
+            if not conflicts:
+                continue
+
+            with_conflicts += 1
+            report.append({"flight_id": flight.id, "name": flight.name, "conflicts": conflicts})
+
+            if not options.get("json"):
+                names = ", ".join(c["name"] for c in conflicts)
+                self.stdout.write(self.style.WARNING(f"Vuelo #{flight.id} ({flight.name}): {names}"))
+
+        if options.get("json"):
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+
+        info.write(
+            f"Comprobados {checked} vuelos. Con conflictos: {with_conflicts}.",
+            style_func=self.style.SUCCESS,
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Photo
+from core.versioning import deferred_bumps
+
+
+class Command(BaseCommand):
+    help = "Genera las miniaturas y versiones WebP de las fotos que aún no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenera los derivados de todas las fotos, aunque ya existan.",
+        )
+
+    def handle(self, *args, **options):
+        force = options.get("force")
+        photos = Photo.objects.exclude(image="").order_by("id")
+
+        done = 0
+        failed = 0
+        # Un solo cambio de versión al final, no uno por foto
+        with deferred_bumps():
+            for photo in photos.iterator(chunk_size=200):
+                if not force and photo.derivatives and photo.derivatives_source == photo.image.name:
+                    continue
+                photo.refresh_derivatives(force=force)
+                if photo.derivatives:
+                    done += 1
+                else:
+                    failed += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Derivados generados para {done} fotos (fallidas: {failed}).")
+        )
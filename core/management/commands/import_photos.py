@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Flight, Photo
+from core.photo_scan import init_worker, scan_file
+from core.versioning import bump
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa en bloque todas las fotos de un directorio (recursivo): "
+        "extrae el GPS/fecha del EXIF en paralelo, copia los ficheros a "
+        "MEDIA_ROOT/photos/ e inserta las filas con bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", type=str, help="Directorio con las imágenes.")
+
+        parser.add_argument(
+            "--flight",
+            type=int,
+            help="ID del vuelo al que se asignan las fotos.",
+        )
+
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Nº de procesos para leer EXIF y copiar (por defecto, nº de CPUs).",
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Filas por cada bulk_create (por defecto 500).",
+        )
+
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Solo lee el EXIF y muestra el resumen; no copia ni inserta nada.",
+        )
+
+    def _find_images(self, root: Path):
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if Path(filename).suffix.lower() in IMAGE_SUFFIXES:
+                    yield os.path.join(dirpath, filename)
+
+    def _flush(self, rows, flight, batch_size):
+        """
+        Inserta un lote, saltando las fotos que ya existen (reanudación).
+        """
+        if not rows:
+            return 0
+        existing = set(
+            Photo.objects.filter(image__in=[r["name"] for r in rows])
+            .values_list("image", flat=True)
+        )
+        photos = []
+        for r in rows:
+            if r["name"] in existing:
+                continue
+            existing.add(r["name"])  # duplicados dentro del mismo lote
+            taken_at = r["taken_at"]
+            if taken_at and timezone.is_naive(taken_at):
+                taken_at = timezone.make_aware(taken_at)
+            photo = Photo(
+                flight=flight,
+                image=r["name"],
+                lat=r["lat"],
+                lon=r["lon"],
+                taken_at=taken_at,
+            )
+            # bulk_create no llama a save()
+            photo.update_geohash()
+            photos.append(photo)
+        with transaction.atomic():
+            Photo.objects.bulk_create(photos, batch_size=batch_size)
+        return len(photos)
+
+    def handle(self, *args, **options):
+        root = Path(options["directory"])
+        if not root.is_dir():
+            raise CommandError(f"No existe el directorio: {root}")
+
+        flight = None
+        if options.get("flight") is not None:
+            flight = Flight.objects.filter(pk=options["flight"]).only("id").first()
+            if flight is None:
+                raise CommandError(f"No existe el vuelo con ID {options['flight']}")
+
+        dry_run = options["dry_run"]
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        media_root = str(settings.MEDIA_ROOT)
+
+        paths = list(self._find_images(root))
+        self.stdout.write(self.style.NOTICE(
+            f"{len(paths)} imágenes encontradas en {root} ({workers} procesos)"
+        ))
+
+        t0 = time.perf_counter()
+        created = skipped = no_gps = errors = 0
+        total_bytes = 0
+        pending = []
+
+        tasks = ((path, media_root, not dry_run) for path in paths)
+        # "spawn" en todas las plataformas: con "fork" los hijos heredarían
+        # la conexión abierta a la BD, y no existe en Windows (ni es el
+        # método por defecto en macOS ni, desde Python 3.14, en Linux)
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings"),),
+        )
+        with pool:
+            for result in pool.map(scan_file, tasks, chunksize=16):
+                if result["error"]:
+                    errors += 1
+                    self.stderr.write(f"  {result['path']}: {result['error']}")
+                    continue
+                total_bytes += result["bytes"]
+                if result["lat"] is None or result["lon"] is None:
+                    no_gps += 1
+                    continue
+                if dry_run:
+                    created += 1
+                    continue
+
+                pending.append(result)
+                if len(pending) >= batch_size:
+                    n = self._flush(pending, flight, batch_size)
+                    created += n
+                    skipped += len(pending) - n
+                    pending = []
+
+        if pending:
+            n = self._flush(pending, flight, batch_size)
+            created += n
+            skipped += len(pending) - n
+
+        if created and not dry_run:
+            bump("photo")
+
+        elapsed = time.perf_counter() - t0
+        rate = len(paths) / elapsed if elapsed else 0
+        mb_rate = total_bytes / (1024 * 1024) / elapsed if elapsed else 0
+
+        verb = "importables" if dry_run else "importadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} fotos {verb}, {skipped} ya existían, "
+            f"{no_gps} sin GPS, {errors} con error."
+        ))
+        self.stdout.write(
+            f"Tiempo: {elapsed:.2f} s ({rate:.1f} imágenes/s, {mb_rate:.1f} MB/s)"
+        )
+        if created and not dry_run:
+            self.stdout.write(
+                "Ejecuta 'python manage.py generate_photo_derivatives' "
+                "para crear las miniaturas de las fotos nuevas."
+            )
@@ -1,10 +1,65 @@
+import hashlib
 import json
+import time
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Q
 
+from core.geojson_stream import RS, iter_feature_collection, iter_feature_sequence
 from core.models import Zone
+from core.tiles import invalidate_layer, invalidate_tiles
+from core.versioning import bump, deferred_bumps
+from core.zone_simplify import rebuild_zone_lods, zone_ids_touching
+
+# Extensiones habituales de GeoJSON Text Sequences / NDJSON
+SEQUENCE_SUFFIXES = {".geojsons", ".geojsonseq", ".geojsonl", ".ndjson", ".jsonl"}
+
+# Propiedades donde se busca el identificador del Feature (en este orden),
+# después de "id" del propio Feature y antes de recurrir a la geometría
+SOURCE_ID_PROPERTIES = ("identifier", "id")
+
+# Campos que se reescriben al actualizar una zona existente
+SYNC_UPDATE_FIELDS = [
+    "name", "zone_type", "geometry", "content_hash", "simplified",
+    "min_lon", "min_lat", "max_lon", "max_lat",
+]
+
+
+def _json_hash(obj) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def feature_source_id(feat, id_property=None):
+    """
+    Identificador estable del Feature en el fichero de origen. Si no
+    trae ninguno se usa un hash de la geometría ("geom:<sha1>"); el
+    nombre no sirve, varias zonas distintas pueden compartirlo.
+    """
+    candidates = [feat.get("id")]
+    props = feat.get("properties") or {}
+    if id_property:
+        candidates.append(props.get(id_property))
+    candidates.extend(props.get(key) for key in SOURCE_ID_PROPERTIES)
+
+    for value in candidates:
+        if value not in (None, ""):
+            return str(value)[:255]
+
+    geometry = feat.get("geometry")
+    if geometry:
+        return "geom:" + _json_hash(geometry)
+    return None
+
+
+def feature_hash(feat) -> str:
+    """
+    Hash del contenido del Feature (independiente del orden de las claves).
+    """
+    return _json_hash(feat)
 
 
 class Command(BaseCommand):
@@ -20,12 +75,45 @@ class Command(BaseCommand):
             ),
         )
 
+        parser.add_argument(
+            "--format",
+            choices=["auto", "geojson", "geojsonseq"],
+            default="auto",
+            help=(
+                "Formato del fichero: FeatureCollection (geojson) o un Feature por "
+                "línea (geojsonseq, RFC 8142 / NDJSON). Por defecto se detecta."
+            ),
+        )
+
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Zonas por cada bulk_create (por defecto 500).",
+        )
+
         parser.add_argument(
             "--keep-existing",
             action="store_true",
             help="No borra las zonas existentes antes de importar.",
         )
 
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help=(
+                "Sincronización incremental: identifica cada zona por el id del "
+                "Feature (o por su geometría si no lo tiene) y solo inserta, "
+                "actualiza o borra las que han cambiado."
+            ),
+        )
+
+        parser.add_argument(
+            "--id-property",
+            type=str,
+            help="Propiedad del Feature que lo identifica (con --sync).",
+        )
+
     def handle(self, *args, **options):
         # 1) Determinar ruta del fichero
         if options.get("file"):
@@ -43,44 +131,237 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.NOTICE(f"Usando fichero: {path}"))
 
-        # 2) Cargar JSON
+        # 2) Detectar formato y preparar la lectura de features
+        fmt = options.get("format") or "auto"
+        if fmt == "auto":
+            fmt = self._detect_format(path)
+        self.stdout.write(f"Formato: {fmt}")
+
+        batch_size = max(1, options.get("batch_size") or 500)
+
+        if options.get("sync") and options.get("keep_existing"):
+            raise CommandError("--sync y --keep-existing no se pueden usar a la vez.")
+
+        # 3) Borrar e insertar dentro de una única transacción: mientras dura
+        #    la importación el resto de la aplicación sigue viendo las zonas
+        #    anteriores, y si algo falla no se pierde nada.
+        with path.open(encoding="utf-8") as stream:
+            if fmt == "geojson":
+                features = iter_feature_collection(stream)
+            else:
+                features = iter_feature_sequence(stream)
+
+            if options.get("sync"):
+                try:
+                    with deferred_bumps(), transaction.atomic():
+                        stats, changed_bboxes = self._sync_zones(
+                            features, batch_size, options.get("id_property")
+                        )
+                        # Solo las zonas cambiadas y sus vecinas (las uniones
+                        # entre ellas pueden haber cambiado)
+                        if changed_bboxes:
+                            touched = zone_ids_touching(changed_bboxes)
+                            rebuild_zone_lods(Zone.objects.filter(pk__in=touched), batch_size=batch_size)
+                except ValueError as exc:
+                    raise CommandError(f"No se pudo leer el GeoJSON (no se ha modificado nada): {exc}")
+
+                invalidate_tiles("zones", changed_bboxes)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        "Sincronización completada. "
+                        f"Creadas {stats['created']}, actualizadas {stats['updated']}, "
+                        f"eliminadas {stats['deleted']}, sin cambios {stats['unchanged']}."
+                    )
+                )
+                if stats["errors"]:
+                    self.stderr.write(
+                        self.style.WARNING(f"Features ignorados por errores: {stats['errors']}.")
+                    )
+                return
+
+            try:
+                with deferred_bumps(), transaction.atomic():
+                    deleted_count = 0
+                    if not options.get("keep_existing"):
+                        # Un solo DELETE sin cargar las filas (delete() las lee
+                        # todas porque hay receptores de post_delete). Zone no
+                        # tiene relaciones; lo que hacían los receptores
+                        # (versión "zone") se hace aquí una vez, y las teselas
+                        # se invalidan al terminar.
+                        zones = Zone.objects.all()
+                        deleted_count = zones._raw_delete(zones.db)
+                        bump("zone")
+                        self.stdout.write(f"Zonas anteriores eliminadas: {deleted_count}")
+                    else:
+                        self.stdout.write("Manteniendo zonas existentes (opción --keep-existing).")
+
+                    # 4) Insertar nuevas zonas por lotes
+                    last_id = Zone.objects.aggregate(last=Max("id"))["last"] or 0
+                    created_count = self._create_zones(features, batch_size)
+
+                    # 5) Versiones simplificadas de las zonas nuevas y de las
+                    #    existentes que tocan (con --keep-existing)
+                    new_zones = Q(id__gt=last_id)
+                    if options.get("keep_existing"):
+                        new_bboxes = (
+                            Zone.objects.filter(new_zones)
+                            .values_list("min_lon", "min_lat", "max_lon", "max_lat")
+                            .iterator(chunk_size=batch_size)
+                        )
+                        touched = [pk for pk in zone_ids_touching(new_bboxes) if pk <= last_id]
+                        new_zones |= Q(pk__in=touched)
+                    rebuild_zone_lods(Zone.objects.filter(new_zones), batch_size=batch_size)
+            except ValueError as exc:
+                raise CommandError(f"No se pudo leer el GeoJSON (no se ha modificado nada): {exc}")
+
+        invalidate_layer("zones")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Importación completada. Creadas {created_count} zonas (eliminadas previamente: {deleted_count})."
+            )
+        )
+
+    def _detect_format(self, path):
+        """
+        Decide entre FeatureCollection y secuencia por la extensión o,
+        si no es concluyente, por el primer carácter del fichero.
+        """
+        if path.suffix.lower() in SEQUENCE_SUFFIXES:
+            return "geojsonseq"
+
+        with path.open(encoding="utf-8") as f:
+            head = f.read(4096).lstrip()
+        if head.startswith(RS):
+            return "geojsonseq"
+        # Un Feature suelto en la primera línea también indica secuencia
+        first_line = head.split("\n", 1)[0]
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-        except Exception as exc:
-            raise CommandError(f"No se pudo leer o parsear el JSON: {exc}")
-
-        # 3) Borrar zonas previas (a menos que se use --keep-existing)
-        deleted_count = 0
-        if not options.get("keep_existing"):
-            deleted_count, _ = Zone.objects.all().delete()
-            self.stdout.write(f"Zonas anteriores eliminadas: {deleted_count}")
-        else:
-            self.stdout.write("Manteniendo zonas existentes (opción --keep-existing).")
+            obj = json.loads(first_line)
+        except ValueError:
+            return "geojson"
+        return "geojsonseq" if isinstance(obj, dict) and obj.get("type") == "Feature" else "geojson"
+
+    def _zone_from_feature(self, feat, id_property=None):
+        props = feat.get("properties") or {}
 
-        # 4) Insertar nuevas zonas
-        features = data.get("features", [])
+        zone = Zone(
+            name=props.get("name") or "Zona UAS",
+            zone_type=props.get("zone_type") or "Zona de ejemplo",
+            geometry=feat,        # guardamos el Feature entero
+            source_id=feature_source_id(feat, id_property),
+            content_hash=feature_hash(feat),
+        )
+        # bulk_create no llama a save(): la bbox se calcula aquí
+        zone.update_bbox()
+        return zone
+
+    def _create_zones(self, features, batch_size):
         created_count = 0
+        batch = []
+        t0 = time.perf_counter()
 
         for feat in features:
             if not isinstance(feat, dict):
                 continue
 
-            props = feat.get("properties") or {}
+            batch.append(self._zone_from_feature(feat))
+            if len(batch) >= batch_size:
+                Zone.objects.bulk_create(batch)
+                created_count += len(batch)
+                batch = []
+                elapsed = time.perf_counter() - t0
+                self.stdout.write(
+                    f"  {created_count} zonas insertadas ({created_count / elapsed:.0f}/s)"
+                )
 
-            name = props.get("name") or "Zona UAS"
-            zone_type = props.get("zone_type") or "Zona de ejemplo"
+        if batch:
+            Zone.objects.bulk_create(batch)
+            created_count += len(batch)
 
-            Zone.objects.create(
-                name=name,
-                zone_type=zone_type,
-                geometry=feat,        # guardamos el Feature entero
-                # Si prefieres solo la geometría:
-                # geometry=feat.get("geometry")
-            )
-            created_count += 1
+        return created_count
 
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"Importación completada. Creadas {created_count} zonas (eliminadas previamente: {deleted_count})."
-            )
+    def _sync_zones(self, features, batch_size, id_property):
+        """
+        Compara el fichero con las zonas ya importadas (por source_id y
+        content_hash) y aplica solo los cambios. Las zonas sin source_id
+        (creadas a mano) no se tocan.
+
+        Devuelve (contadores, bbox de las zonas cambiadas antes y después).
+        """
+        # source_id -> (pk, hash, bbox); solo columnas pequeñas, sin geometry
+        existing = {}
+        duplicated = []
+        rows = (
+            Zone.objects.exclude(source_id=None)
+            .order_by("id")
+            .values_list("id", "source_id", "content_hash",
+                         "min_lon", "min_lat", "max_lon", "max_lat")
         )
+        for pk, sid, content_hash, *bbox in rows.iterator():
+            if sid in existing:
+                duplicated.append((pk, tuple(bbox)))
+            else:
+                existing[sid] = (pk, content_hash, tuple(bbox))
+
+        stats = {"created": 0, "updated": 0, "deleted": 0, "unchanged": 0, "errors": 0}
+        changed_bboxes = []
+        seen = set()
+        to_create = []
+        to_update = []
+
+        def _flush():
+            if to_create:
+                Zone.objects.bulk_create(to_create)
+                stats["created"] += len(to_create)
+                to_create.clear()
+            if to_update:
+                Zone.objects.bulk_update(to_update, SYNC_UPDATE_FIELDS)
+                stats["updated"] += len(to_update)
+                to_update.clear()
+
+        for feat in features:
+            if not isinstance(feat, dict):
+                continue
+
+            sid = feature_source_id(feat, id_property)
+            if sid is None:
+                self.stderr.write("Feature sin identificador ni geometría: se ignora.")
+                stats["errors"] += 1
+                continue
+            if sid in seen:
+                self.stderr.write(f"Identificador repetido en el fichero: {sid} (se ignora).")
+                stats["errors"] += 1
+                continue
+            seen.add(sid)
+
+            current = existing.get(sid)
+            content_hash = feature_hash(feat)
+            if current and current[1] == content_hash:
+                stats["unchanged"] += 1
+                continue
+
+            zone = self._zone_from_feature(feat, id_property)
+            changed_bboxes.append((zone.min_lon, zone.min_lat, zone.max_lon, zone.max_lat))
+            if current:
+                zone.pk = current[0]
+                changed_bboxes.append(current[2])
+                to_update.append(zone)
+            else:
+                to_create.append(zone)
+
+            if len(to_create) + len(to_update) >= batch_size:
+                _flush()
+
+        _flush()
+
+        # Zonas que ya no están en el fichero (y duplicados antiguos)
+        gone = [(pk, bbox) for sid, (pk, _h, bbox) in existing.items() if sid not in seen]
+        gone.extend(duplicated)
+        changed_bboxes.extend(bbox for _pk, bbox in gone)
+        stale_pks = [pk for pk, _bbox in gone]
+        for start in range(0, len(stale_pks), batch_size):
+            chunk = stale_pks[start:start + batch_size]
+            deleted, _ = Zone.objects.filter(pk__in=chunk).only("id").delete()
+            stats["deleted"] += deleted
+
+        return stats, changed_bboxes
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.response_cache import cache_stats, reset_cache_stats, stats_shared
+
+
+class Command(BaseCommand):
+    help = (
+        "Muestra los aciertos/fallos de la caché de respuestas "
+        "(colecciones de la API y exportaciones). Los contadores se guardan "
+        "en la caché, así que solo funciona con una caché compartida "
+        "(CACHE_BACKEND=file o redis): con locmem están en la memoria de "
+        "cada proceso del servidor."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Pone los contadores a cero después de mostrarlos.",
+        )
+
+    def handle(self, *args, **options):
+        if not stats_shared():
+            raise CommandError(
+                "La caché configurada no es compartida entre procesos (locmem): "
+                "los contadores del servidor no son visibles desde este comando. "
+                "Usa CACHE_BACKEND=file o redis."
+            )
+        stats = cache_stats()
+        self.stdout.write(
+            f"Aciertos: {stats['hits']}  Fallos: {stats['misses']}  "
+            f"Tasa de acierto: {stats['hit_ratio']:.1%}"
+        )
+        if options["reset"]:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Contadores reiniciados."))
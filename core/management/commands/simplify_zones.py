@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.tiles import invalidate_layer
+from core.zone_simplify import ZONE_LOD_TOLERANCES, rebuild_zone_lods
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula las versiones simplificadas de todas las zonas UAS "
+        "(respetando los bordes compartidos entre zonas vecinas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Zonas por cada bulk_update (por defecto 500).",
+        )
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        with transaction.atomic():
+            count = rebuild_zone_lods(batch_size=max(1, options["batch_size"]))
+        invalidate_layer("zones")
+
+        levels = ", ".join(f"{t:g}" for t in ZONE_LOD_TOLERANCES)
+        self.stdout.write(self.style.SUCCESS(
+            f"Simplificadas {count} zonas (tolerancias: {levels}) en {time.perf_counter() - t0:.2f} s."
+        ))
@@ -0,0 +1,283 @@
+# core/middleware.py
+
+"""
+Instrumentación de rendimiento por petición (opcional).
+
+Con PERF_INSTRUMENTATION activado, PerformanceMiddleware mide cada petición:
+  - tiempo total, tiempo de la vista y del renderizado (serialización
+    del cuerpo: renderer de DRF o plantilla),
+  - nº de consultas SQL y tiempo total en la BD,
+  - tamaño de la respuesta,
+y lo devuelve en la cabecera Server-Timing (visible en las herramientas de
+desarrollo del navegador) y en una línea JSON del logger "core.performance".
+
+Además puede perfilar con cProfile una muestra de las peticiones cuya ruta
+cumpla PERF_PROFILE_PATTERN; los .prof se abren con pstats o snakeviz.
+
+Funciona con WSGI y con ASGI sin forzar las vistas async a síncronas.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+logger = logging.getLogger("core.performance")
+
+# Medidas de la petición en curso. Es una ContextVar y no un atributo de
+# la conexión porque con ASGI las consultas se ejecutan en otros hilos
+# (sync_to_async copia el contexto, pero cada hilo tiene su conexión).
+_current_stats: ContextVar = ContextVar("performance_stats", default=None)
+
+
+def _time_sql(execute, sql, params, many, context):
+    """
+    execute_wrapper instalado una vez por conexión: solo mide si hay una
+    petición instrumentada en el contexto actual.
+    """
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - t0
+        stats.sql_count += 1
+
+
+def _install_sql_timer(sender=None, connection=None, **kwargs):
+    if _time_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_sql)
+
+
+class _RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.view_start = None
+        self.view_seconds = None
+        self.render_start = None
+        self.render_seconds = None
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+
+class _MeasuredStream:
+    """
+    Cuerpo de una respuesta en streaming: cuenta los bytes y las consultas
+    hechas mientras se genera, y escribe el log en close(), que Django
+    llama al cerrar la respuesta aunque el cuerpo no se llegue a leer.
+    """
+
+    def __init__(self, middleware, request, response, stats, content):
+        self._middleware = middleware
+        self._request = request
+        self._response = response
+        self._stats = stats
+        self._content = content
+        self._iterator = None
+        self._closed = False
+        self.size = 0
+
+    def __iter__(self):
+        self._iterator = iter(self._content)
+        return self
+
+    def __next__(self):
+        token = _current_stats.set(self._stats)
+        try:
+            chunk = next(self._iterator)
+        finally:
+            _current_stats.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._middleware._log(self._request, self._response, self._stats, self.size)
+
+
+class _AsyncMeasuredStream(_MeasuredStream):
+
+    def __aiter__(self):
+        self._iterator = aiter(self._content)
+        return self
+
+    async def __anext__(self):
+        token = _current_stats.set(self._stats)
+        try:
+            chunk = await anext(self._iterator)
+        finally:
+            _current_stats.reset(token)
+        self.size += len(chunk)
+        return chunk
+
+
+class PerformanceMiddleware:
+    """
+    Ver la documentación del módulo. Se desactiva sola (MiddlewareNotUsed)
+    si PERF_INSTRUMENTATION es False, así que puede quedarse en MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERF_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        pattern = getattr(settings, "PERF_PROFILE_PATTERN", "")
+        self.profile_pattern = re.compile(pattern) if pattern else None
+        self.profile_rate = float(getattr(settings, "PERF_PROFILE_SAMPLE_RATE", 0.05))
+        self.profile_dir = str(getattr(settings, "PERF_PROFILE_DIR", "profiles"))
+
+        # Conexiones nuevas (de cualquier hilo) y las ya abiertas en este
+        connection_created.connect(_install_sql_timer, dispatch_uid="core.performance.sql_timer")
+        for conn in connections.all(initialized_only=True):
+            _install_sql_timer(connection=conn)
+
+    # ---------- Hooks de Django ----------
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        stats = _RequestStats()
+        request._perf_stats = stats
+        token = _current_stats.set(stats)
+        profiler = self._start_profile(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._stop_profile(profiler, request)
+            _current_stats.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = _RequestStats()
+        request._perf_stats = stats
+        token = _current_stats.set(stats)
+        # Con ASGI el perfil incluye también lo que el bucle de eventos
+        # ejecute mientras esta petición espera
+        profiler = self._start_profile(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._stop_profile(profiler, request)
+            _current_stats.reset(token)
+        return self._finish(request, response, stats)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = getattr(request, "_perf_stats", None)
+        if stats is not None:
+            stats.view_start = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # Se llama justo después de la vista y antes de renderizar
+        stats = getattr(request, "_perf_stats", None)
+        if stats is None:
+            return response
+        now = time.perf_counter()
+        if stats.view_start is not None:
+            stats.view_seconds = now - stats.view_start
+        stats.render_start = now
+
+        def _rendered(_response):
+            stats.render_seconds = time.perf_counter() - stats.render_start
+
+        response.add_post_render_callback(_rendered)
+        return response
+
+    # ---------- Salida ----------
+
+    def _finish(self, request, response, stats):
+        if stats.view_start is not None and stats.view_seconds is None:
+            # Respuesta normal (sin render diferido): la vista acaba aquí
+            stats.view_seconds = time.perf_counter() - stats.view_start
+
+        response["Server-Timing"] = self._server_timing(stats)
+        if response.streaming:
+            # El cuerpo se genera al enviarlo: la cabecera solo puede llevar
+            # lo medido hasta ahora; el log se escribe al cerrar la respuesta
+            stream = _AsyncMeasuredStream if response.is_async else _MeasuredStream
+            response.streaming_content = stream(self, request, response, stats, response.streaming_content)
+        else:
+            self._log(request, response, stats, len(response.content))
+        return response
+
+    def _server_timing(self, stats) -> str:
+        parts = [
+            f"total;dur={stats.elapsed_ms():.1f}",
+            f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_count} queries"',
+        ]
+        if stats.view_seconds is not None:
+            parts.append(f"view;dur={stats.view_seconds * 1000:.1f}")
+        if stats.render_seconds is not None:
+            parts.append(f"render;dur={stats.render_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def _log(self, request, response, stats, size):
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(stats.elapsed_ms(), 2),
+            "db_queries": stats.sql_count,
+            "db_ms": round(stats.sql_seconds * 1000, 2),
+            "view_ms": round(stats.view_seconds * 1000, 2) if stats.view_seconds is not None else None,
+            "render_ms": round(stats.render_seconds * 1000, 2) if stats.render_seconds is not None else None,
+            "bytes": size,
+            "streaming": response.streaming,
+        }
+        logger.info(json.dumps(record), extra={"performance": record})
+
+    # ---------- Perfiles ----------
+
+    def _start_profile(self, request):
+        if not (self.profile_pattern and self.profile_pattern.search(request.path)):
+            return None
+        if random.random() >= self.profile_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Ya hay otro perfil activo (otra petición en paralelo)
+            return None
+        return profiler
+
+    def _stop_profile(self, profiler, request):
+        if profiler is None:
+            return
+        profiler.disable()
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            slug = re.sub(r"[^\w]+", "_", request.path).strip("_")[:80] or "root"
+            stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+            path = os.path.join(self.profile_dir, f"{stamp}_{request.method}_{slug}.prof")
+            profiler.dump_stats(path)
+        except OSError as exc:
+            logger.warning("No se pudo guardar el perfil: %s", exc)
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+def fill_zone_bbox(apps, schema_editor):
+    """Calcula el bbox de las zonas que ya existían."""
+    from core.geometry import bbox_of
+
+    Zone = apps.get_model('core', 'Zone')
+    batch = []
+    for zone in Zone.objects.all().iterator(chunk_size=500):
+        bbox = bbox_of(zone.geometry)
+        if bbox is None:
+            continue
+        zone.min_lon, zone.min_lat, zone.max_lon, zone.max_lat = bbox
+        batch.append(zone)
+        if len(batch) >= 500:
+            Zone.objects.bulk_update(batch, ['min_lon', 'min_lat', 'max_lon', 'max_lat'])
+            batch = []
+    if batch:
+        Zone.objects.bulk_update(batch, ['min_lon', 'min_lat', 'max_lon', 'max_lat'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zone',
+            name='max_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='max_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='min_lat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='min_lon',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=models.Index(fields=['min_lon', 'max_lon'], name='zone_bbox_lon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zone',
+            index=models.Index(fields=['min_lat', 'max_lat'], name='zone_bbox_lat_idx'),
+        ),
+        migrations.RunPython(fill_zone_bbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_flight_path_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='derivatives_source',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zone',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='zone',
+            name='source_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, null=True),
+        ),
+    ]
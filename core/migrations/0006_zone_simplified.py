@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:48
+
+from django.db import migrations, models
+
+
+def fill_zone_simplified(apps, schema_editor):
+    """Calcula las versiones simplificadas de las zonas que ya existían."""
+    from core.zone_simplify import build_zone_lods
+
+    Zone = apps.get_model('core', 'Zone')
+    rows = Zone.objects.order_by('id').values_list('id', 'geometry')
+    lods = build_zone_lods(rows.iterator(chunk_size=500))
+
+    batch = []
+    for pk, levels in lods.items():
+        batch.append(Zone(pk=pk, simplified=levels))
+        if len(batch) >= 500:
+            Zone.objects.bulk_update(batch, ['simplified'])
+            batch = []
+    if batch:
+        Zone.objects.bulk_update(batch, ['simplified'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_zone_source_identity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zone',
+            name='simplified',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(fill_zone_simplified, migrations.RunPython.noop),
+    ]
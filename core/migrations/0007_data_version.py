@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    """Una fila por modelo versionado."""
+    DataVersion = apps.get_model('core', 'DataVersion')
+    for name in ('flight', 'photo', 'zone'):
+        DataVersion.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_zone_simplified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('name', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
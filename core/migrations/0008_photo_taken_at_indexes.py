@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['taken_at'], name='photo_taken_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['flight', 'taken_at'], name='photo_flight_taken_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:00
+
+from django.db import migrations, models
+
+
+def fill_photo_geohash(apps, schema_editor):
+    """Calcula el geohash de las fotos que ya existían."""
+    from core.geohash import encode
+
+    Photo = apps.get_model('core', 'Photo')
+    batch = []
+    for photo in Photo.objects.only('id', 'lat', 'lon').iterator(chunk_size=2000):
+        photo.geohash = encode(photo.lat, photo.lon)
+        batch.append(photo)
+        if len(batch) >= 2000:
+            Photo.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Photo.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_photo_taken_at_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_photo_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['geohash'], name='photo_geohash_idx'),
+        ),
+    ]
@@ -1,7 +1,31 @@
 from django.db import models
+from django.utils import timezone
+import logging
 import math
 import json
 
+from .geodesy import as_lat_lon, path_length_km
+from .geohash import bbox_ranges, encode as encode_geohash
+from .geometry import bbox_of
+
+logger = logging.getLogger(__name__)
+
+
+class BBoxQuerySet(models.QuerySet):
+    """
+    Consultas sobre modelos con columnas min_lon/min_lat/max_lon/max_lat.
+    """
+
+    def intersecting_bbox(self, bbox):
+        """
+        Objetos cuyo bounding box intersecta con (min_lon, min_lat, max_lon, max_lat).
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        return self.filter(
+            min_lon__lte=max_lon, max_lon__gte=min_lon,
+            min_lat__lte=max_lat, max_lat__gte=min_lat,
+        )
+
 
 class Flight(models.Model):
     name = models.CharField(max_length=120)
@@ -10,9 +34,79 @@ class Flight(models.Model):
     # MVP: almacenamos la ruta como GeoJSON (LineString)
     path_geojson = models.JSONField(null=True, blank=True)
 
+    # Métricas derivadas de la ruta: se recalculan solo cuando cambia
+    # path_geojson (ver save()) para poder listar y ordenar sin parsear.
+    distance_km = models.FloatField(default=0.0, editable=False, db_index=True)
+    point_count = models.PositiveIntegerField(default=0, editable=False)
+    min_lon = models.FloatField(null=True, blank=True, editable=False)
+    min_lat = models.FloatField(null=True, blank=True, editable=False)
+    max_lon = models.FloatField(null=True, blank=True, editable=False)
+    max_lat = models.FloatField(null=True, blank=True, editable=False)
+    start_lat = models.FloatField(null=True, blank=True, editable=False)
+    start_lon = models.FloatField(null=True, blank=True, editable=False)
+    end_lat = models.FloatField(null=True, blank=True, editable=False)
+    end_lon = models.FloatField(null=True, blank=True, editable=False)
+
+    objects = BBoxQuerySet.as_manager()
+
+    METRIC_FIELDS = (
+        'distance_km', 'point_count',
+        'min_lon', 'min_lat', 'max_lon', 'max_lat',
+        'start_lat', 'start_lon', 'end_lat', 'end_lon',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['min_lon', 'max_lon'], name='flight_bbox_lon_idx'),
+            models.Index(fields=['min_lat', 'max_lat'], name='flight_bbox_lat_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
+    def path_changed(self) -> bool:
+        """
+        True si path_geojson es distinto del guardado en la BD (o si el
+        objeto es nuevo). Se consulta solo al guardar: así cargar vuelos
+        (listas, exportaciones, select_related) no cuesta nada extra.
+        """
+        if self._state.adding or self.pk is None:
+            return True
+        stored = list(Flight.objects.filter(pk=self.pk).values_list('path_geojson', flat=True)[:1])
+        if not stored:
+            return True
+        return stored[0] != self.path_geojson
+
+    def update_path_metrics(self):
+        """
+        Recalcula distancia, bbox, puntos inicial/final y nº de vértices.
+        """
+        pts = self._extract_line_coordinates()
+
+        self.point_count = len(pts)
+        if not pts:
+            self.distance_km = 0.0
+            self.min_lon = self.min_lat = self.max_lon = self.max_lat = None
+            self.start_lat = self.start_lon = self.end_lat = self.end_lon = None
+            return
+
+        lats = [p[0] for p in pts]
+        lons = [p[1] for p in pts]
+        self.min_lon, self.max_lon = min(lons), max(lons)
+        self.min_lat, self.max_lat = min(lats), max(lats)
+        self.start_lat, self.start_lon = pts[0]
+        self.end_lat, self.end_lon = pts[-1]
+        self.distance_km = self.compute_distance_km(pts)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'path_geojson' in update_fields:
+            if self.path_changed():
+                self.update_path_metrics()
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | set(self.METRIC_FIELDS)
+        super().save(*args, **kwargs)
+
     # ---------- Helpers internos para trabajar con la ruta ----------
 
     def _extract_line_coordinates(self):
@@ -66,6 +160,7 @@ class Flight(models.Model):
     def _haversine_km(p1, p2):
         """
         Distancia en km entre dos puntos (lat, lon) usando fórmula de Haversine.
+        Para rutas completas usar core.geodesy (vectorizado).
         """
         lat1, lon1 = p1
         lat2, lon2 = p2
@@ -82,22 +177,55 @@ class Flight(models.Model):
 
         return R * c
 
-    # ---------- Propiedad de distancia para la plantilla ----------
+    # ---------- Cálculo de distancia ----------
 
-    @property
-    def distance_km(self) -> float:
+    def compute_distance_km(self, pts=None) -> float:
         """
-        Distancia total estimada de la ruta en kilómetros.
+        Distancia total de la ruta en kilómetros (a partir de path_geojson).
         Si no hay ruta o solo hay un punto, devuelve 0.0.
+        El valor persistido está en el campo distance_km.
         """
-        pts = self._extract_line_coordinates()
+        if pts is None:
+            pts = self._extract_line_coordinates()
         if len(pts) < 2:
             return 0.0
 
-        total = 0.0
-        for i in range(1, len(pts)):
-            total += self._haversine_km(pts[i - 1], pts[i])
-        return total
+        lats, lons = as_lat_lon(pts)
+        return path_length_km(lats, lons)
+
+
+class PhotoQuerySet(models.QuerySet):
+    """
+    Consultas espaciales sobre Photo usando la columna geohash indexada.
+    """
+
+    def within_bbox(self, bbox):
+        """
+        Fotos dentro de (min_lon, min_lat, max_lon, max_lat). Los rangos
+        de geohash acotan la búsqueda con el índice; lat/lon recortan
+        lo que sobra de las celdas en los bordes.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        qs = self
+        ranges = bbox_ranges(bbox)
+        if ranges:
+            cells = models.Q()
+            for low, high in ranges:
+                cells |= models.Q(geohash__gte=low, geohash__lte=high)
+            qs = qs.filter(cells)
+        return qs.filter(
+            lon__gte=min_lon, lon__lte=max_lon,
+            lat__gte=min_lat, lat__lte=max_lat,
+        )
+
+    def near(self, lat, lon, radius_m):
+        """
+        Candidatas a estar a menos de radius_m de (lat, lon): las del bbox
+        que rodea el círculo. La distancia exacta se calcula después.
+        """
+        dlat = radius_m / 111_320.0
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        return self.within_bbox((lon - dlon, lat - dlat, lon + dlon, lat + dlat))
 
 
 class Photo(models.Model):
@@ -114,14 +242,223 @@ class Photo(models.Model):
     taken_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
+    # Derivados generados (miniatura, popup; JPEG y WebP): clave -> nombre
+    # en el storage. derivatives_source guarda la imagen de la que salieron.
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    derivatives_source = models.CharField(max_length=255, blank=True, editable=False)
+
+    # Geohash de (lat, lon), mantenido en save() y en las importaciones;
+    # las consultas por bbox lo usan como índice espacial (ver PhotoQuerySet)
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
+
+    objects = PhotoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Rangos de fechas y línea temporal (global y por vuelo)
+            models.Index(fields=['taken_at'], name='photo_taken_at_idx'),
+            models.Index(fields=['flight', 'taken_at'], name='photo_flight_taken_idx'),
+            models.Index(fields=['geohash'], name='photo_geohash_idx'),
+        ]
+
     def __str__(self):
         return f'Photo #{self.id}'
 
+    def update_geohash(self):
+        self.geohash = encode_geohash(self.lat, self.lon) if self.lat is not None and self.lon is not None else ''
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'lat', 'lon'} & set(update_fields):
+            self.update_geohash()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+        # Solo se regeneran si la imagen ha cambiado
+        if self.image and self.image.name != self.derivatives_source:
+            self.refresh_derivatives()
+
+    def refresh_derivatives(self, force=False):
+        """
+        (Re)genera los derivados de la imagen y borra los anteriores.
+        Si la imagen no se puede procesar, la foto queda sin derivados
+        y se siguen usando la imagen original.
+        """
+        from .thumbnails import delete_derivatives, generate_derivatives
+
+        old = dict(self.derivatives or {})
+        storage = self.image.storage
+
+        if force:
+            delete_derivatives(storage, old.values())
+
+        try:
+            names = generate_derivatives(self.image)
+        except Exception as exc:
+            logger.warning("No se pudieron generar los derivados de la foto #%s: %s", self.pk, exc)
+            names = {}
+
+        stale = set(old.values()) - set(names.values())
+        if stale and not force:
+            delete_derivatives(storage, stale)
+
+        self.derivatives = names
+        self.derivatives_source = self.image.name
+        Photo.objects.filter(pk=self.pk).update(
+            derivatives=self.derivatives,
+            derivatives_source=self.derivatives_source,
+        )
+        # Las URLs de las miniaturas cambian: invalidar ETags de fotos
+        from .versioning import bump
+        bump('photo')
+
+    def delete_derivatives(self):
+        from .thumbnails import delete_derivatives
+
+        delete_derivatives(self.image.storage, (self.derivatives or {}).values())
+
+    def derivative_url(self, key):
+        """
+        URL de un derivado ("thumb_jpg", "popup_webp"...) o, si no existe,
+        la de la imagen original.
+        """
+        name = (self.derivatives or {}).get(key)
+        if name:
+            return self.image.storage.url(name)
+        return self.image.url if self.image else None
+
+    @property
+    def thumbnail_url(self):
+        return self.derivative_url('thumb_jpg')
+
+    @property
+    def thumbnail_webp_url(self):
+        return self.derivative_url('thumb_webp')
+
+    @property
+    def popup_url(self):
+        return self.derivative_url('popup_jpg')
+
+    @property
+    def popup_webp_url(self):
+        return self.derivative_url('popup_webp')
+
+
+class ZoneQuerySet(BBoxQuerySet):
+
+    def containing_point(self, lon, lat):
+        """
+        Zonas cuyo bounding box contiene el punto (filtro previo en SQL;
+        el test exacto punto-en-polígono se hace después en Python).
+        """
+        return self.filter(
+            min_lon__lte=lon, max_lon__gte=lon,
+            min_lat__lte=lat, max_lat__gte=lat,
+        )
+
 
 class Zone(models.Model):
     name = models.CharField(max_length=120)
     zone_type = models.CharField(max_length=80)  # Prohibida/Restringida/Permitida…
     geometry = models.JSONField()                # GeoJSON Feature/FeatureCollection
 
+    # Identidad del Feature en el fichero de origen y hash de su contenido,
+    # para sincronizar solo lo que cambia (import_uas_zones --sync)
+    source_id = models.CharField(max_length=255, null=True, blank=True, db_index=True, editable=False)
+    content_hash = models.CharField(max_length=40, blank=True, editable=False)
+
+    # Versiones simplificadas para zooms bajos: tolerancia -> Feature
+    # (ver core.zone_simplify)
+    simplified = models.JSONField(default=dict, blank=True, editable=False)
+
+    # Bounding box de la geometría, recalculado en cada save()
+    min_lon = models.FloatField(null=True, blank=True, editable=False)
+    min_lat = models.FloatField(null=True, blank=True, editable=False)
+    max_lon = models.FloatField(null=True, blank=True, editable=False)
+    max_lat = models.FloatField(null=True, blank=True, editable=False)
+
+    objects = ZoneQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['min_lon', 'max_lon'], name='zone_bbox_lon_idx'),
+            models.Index(fields=['min_lat', 'max_lat'], name='zone_bbox_lat_idx'),
+        ]
+
     def __str__(self):
         return self.name
+
+    def update_bbox(self):
+        """
+        Recalcula las columnas de bounding box a partir de geometry.
+        """
+        bbox = bbox_of(self.geometry)
+        if bbox is None:
+            self.min_lon = self.min_lat = self.max_lon = self.max_lat = None
+        else:
+            self.min_lon, self.min_lat, self.max_lon, self.max_lat = bbox
+
+    def _stored_geometry(self):
+        """
+        (geometry, min_lon, min_lat, max_lon, max_lat) guardados en la BD,
+        o None si la zona aún no existe.
+        """
+        if self.pk is None:
+            return None
+        return (
+            Zone.objects.filter(pk=self.pk)
+            .values_list("geometry", "min_lon", "min_lat", "max_lon", "max_lat")
+            .first()
+        )
+
+    def update_simplified(self, old_bbox=None):
+        """
+        Recalcula las versiones simplificadas de esta zona y de las que
+        tocan su bbox (actual y anterior), cuyas uniones pueden cambiar.
+        """
+        from .zone_simplify import rebuild_zone_lods, zone_ids_touching
+
+        bbox = (self.min_lon, self.min_lat, self.max_lon, self.max_lat)
+        ids = zone_ids_touching([bbox, old_bbox]) | {self.pk}
+        rebuild_zone_lods(Zone.objects.filter(pk__in=ids))
+        self.simplified = Zone.objects.values_list("simplified", flat=True).get(pk=self.pk)
+
+    def simplified_geometry(self, level):
+        """
+        Feature simplificado de un nivel, o la geometría original si
+        ese nivel no existe.
+        """
+        if level:
+            return (self.simplified or {}).get(level) or self.geometry
+        return self.geometry
+
+    def save(self, *args, **kwargs):
+        # bbox y niveles simplificados solo cuando cambia la geometría
+        # (no al editar el nombre o el tipo desde el admin)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "geometry" not in update_fields:
+            return super().save(*args, **kwargs)
+
+        stored = self._stored_geometry()
+        if stored is not None and stored[0] == self.geometry:
+            return super().save(*args, **kwargs)
+
+        self.update_bbox()
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | {"min_lon", "min_lat", "max_lon", "max_lat"}
+        super().save(*args, **kwargs)
+        self.update_simplified(old_bbox=tuple(stored[1:]) if stored else None)
+
+
+class DataVersion(models.Model):
+    """
+    Contador de cambios por modelo ("flight", "photo", "zone").
+    Lo incrementan las señales de save/delete y los comandos de carga
+    masiva (ver core.versioning); sirve para ETag/Last-Modified.
+    """
+    name = models.CharField(max_length=40, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
@@ -0,0 +1,421 @@
+# core/mvt.py
+
+"""
+Codificador mínimo de Mapbox Vector Tiles (especificación 2.1).
+
+No depende de librerías externas: hace la proyección Web Mercator,
+el recorte contra los bordes de la tesela, la cuantización a enteros
+y la serialización protobuf a mano.
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .geometry import simplify_dp
+
+EXTENT = 4096   # resolución interna de cada tesela
+BUFFER = 64     # margen (en unidades de tesela) para evitar cortes visibles
+
+# Tipos de geometría del protobuf
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+# Comandos de geometría
+CMD_MOVE_TO = 1
+CMD_LINE_TO = 2
+CMD_CLOSE_PATH = 7
+
+MAX_LAT = 85.0511287798066
+
+TilePoint = Tuple[float, float]
+
+
+# ---------- Matemática de teselas ----------
+
+def tile_bounds(z: int, x: int, y: int, buffer: int = 0, extent: int = EXTENT):
+    """
+    Devuelve (min_lon, min_lat, max_lon, max_lat) de la tesela z/x/y,
+    ampliada opcionalmente con un margen expresado en unidades de tesela.
+    """
+    n = 2 ** z
+    pad = buffer / extent
+
+    def _lon(tx):
+        return tx / n * 360.0 - 180.0
+
+    def _lat(ty):
+        ty = min(max(ty, 0.0), float(n))
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return (
+        _lon(x - pad),
+        _lat(y + 1 + pad),
+        _lon(x + 1 + pad),
+        _lat(y - pad),
+    )
+
+
+def tile_range(bbox, z: int, buffer: int = BUFFER, extent: int = EXTENT):
+    """
+    Rango inclusivo (x0, y0, x1, y1) de las teselas de zoom z cuya área,
+    ampliada con el margen, toca la bbox (min_lon, min_lat, max_lon, max_lat).
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    n = 2 ** z
+    pad = buffer / extent
+    fx0, fy1 = lonlat_to_tile(min_lon, min_lat, z, 0, 0, extent=1)
+    fx1, fy0 = lonlat_to_tile(max_lon, max_lat, z, 0, 0, extent=1)
+
+    def _clamp(v):
+        return min(max(int(math.floor(v)), 0), n - 1)
+
+    return (_clamp(fx0 - pad), _clamp(fy0 - pad), _clamp(fx1 + pad), _clamp(fy1 + pad))
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int, x: int, y: int,
+                   extent: int = EXTENT) -> TilePoint:
+    """
+    Proyecta (lon, lat) a coordenadas internas (float) de la tesela z/x/y.
+    """
+    lat = max(min(lat, MAX_LAT), -MAX_LAT)
+    n = 2 ** z
+    fx = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    fy = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return ((fx * n - x) * extent, (fy * n - y) * extent)
+
+
+# ---------- Recorte ----------
+
+def _clip_segment(p0: TilePoint, p1: TilePoint, lo: float, hi: float):
+    """
+    Recorte Liang–Barsky de un segmento contra el cuadrado [lo, hi]².
+    Devuelve el segmento recortado o None si queda fuera.
+    """
+    x0, y0 = p0
+    dx = p1[0] - x0
+    dy = p1[1] - y0
+    t0, t1 = 0.0, 1.0
+
+    for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - lo), (dy, hi - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1:
+                return None
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return None
+            t1 = min(t1, r)
+
+    return (
+        (x0 + t0 * dx, y0 + t0 * dy),
+        (x0 + t1 * dx, y0 + t1 * dy),
+    )
+
+
+def clip_line(points: Sequence[TilePoint], lo: float, hi: float) -> List[List[TilePoint]]:
+    """
+    Recorta una polilínea contra el cuadrado [lo, hi]².
+    Puede devolver varios tramos si la línea sale y vuelve a entrar.
+    """
+    parts: List[List[TilePoint]] = []
+    current: List[TilePoint] = []
+
+    for a, b in zip(points, points[1:]):
+        seg = _clip_segment(a, b, lo, hi)
+        if seg is None:
+            if len(current) >= 2:
+                parts.append(current)
+            current = []
+            continue
+        s0, s1 = seg
+        if current and current[-1] == s0:
+            current.append(s1)
+        else:
+            if len(current) >= 2:
+                parts.append(current)
+            current = [s0, s1]
+        # Si el final del segmento se ha recortado, el tramo termina aquí
+        if s1 != b:
+            parts.append(current)
+            current = []
+
+    if len(current) >= 2:
+        parts.append(current)
+    return parts
+
+
+def clip_ring(ring: Sequence[TilePoint], lo: float, hi: float) -> List[TilePoint]:
+    """
+    Recorte Sutherland–Hodgman de un anillo contra el cuadrado [lo, hi]².
+    """
+    def _edge(pts, inside, intersect):
+        out: List[TilePoint] = []
+        if not pts:
+            return out
+        prev = pts[-1]
+        for cur in pts:
+            if inside(cur):
+                if not inside(prev):
+                    out.append(intersect(prev, cur))
+                out.append(cur)
+            elif inside(prev):
+                out.append(intersect(prev, cur))
+            prev = cur
+        return out
+
+    def _at_x(xv):
+        def f(a, b):
+            t = (xv - a[0]) / (b[0] - a[0])
+            return (xv, a[1] + t * (b[1] - a[1]))
+        return f
+
+    def _at_y(yv):
+        def f(a, b):
+            t = (yv - a[1]) / (b[1] - a[1])
+            return (a[0] + t * (b[0] - a[0]), yv)
+        return f
+
+    pts = list(ring)
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts = pts[:-1]
+
+    pts = _edge(pts, lambda p: p[0] >= lo, _at_x(lo))
+    pts = _edge(pts, lambda p: p[0] <= hi, _at_x(hi))
+    pts = _edge(pts, lambda p: p[1] >= lo, _at_y(lo))
+    pts = _edge(pts, lambda p: p[1] <= hi, _at_y(hi))
+    return pts
+
+
+# ---------- Cuantización ----------
+
+def _quantize(points: Sequence[TilePoint]) -> List[Tuple[int, int]]:
+    """
+    Redondea a enteros y elimina puntos consecutivos repetidos.
+    """
+    out: List[Tuple[int, int]] = []
+    for px, py in points:
+        q = (int(round(px)), int(round(py)))
+        if not out or out[-1] != q:
+            out.append(q)
+    return out
+
+
+def _ring_area(ring: Sequence[Tuple[int, int]]) -> float:
+    """
+    Área con signo (fórmula del zapato) en coordenadas de tesela.
+    Positiva = sentido horario en pantalla (eje Y hacia abajo).
+    """
+    area = 0
+    n = len(ring)
+    for i in range(n):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % n]
+        area += x1 * y2 - x2 * y1
+    return area / 2.0
+
+
+# ---------- Protobuf ----------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= (1 << 64) - 1
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _len_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Sequence[int]) -> bytes:
+    return _len_field(field, b"".join(_varint(v) for v in values))
+
+
+def _command(cmd: int, count: int) -> int:
+    return (cmd & 0x7) | (count << 3)
+
+
+def _encode_value(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value < 0:
+            return _key(6, 0) + _varint(_zigzag(value))
+        return _key(5, 0) + _varint(value)
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _len_field(1, str(value).encode("utf-8"))
+
+
+# ---------- Capa ----------
+
+class TileLayer:
+    """
+    Capa de una tesela vectorial. Las coordenadas de entrada son
+    (lon, lat) y se proyectan, recortan y cuantizan al añadirlas.
+    """
+
+    def __init__(self, name: str, z: int, x: int, y: int,
+                 extent: int = EXTENT, buffer: int = BUFFER,
+                 tolerance: float = 1.0):
+        self.name = name
+        self.z, self.x, self.y = z, x, y
+        self.extent = extent
+        self.buffer = buffer
+        self.tolerance = tolerance
+        self._features: List[bytes] = []
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+
+    def __len__(self):
+        return len(self._features)
+
+    def _project(self, coords) -> List[TilePoint]:
+        return [lonlat_to_tile(lon, lat, self.z, self.x, self.y, self.extent)
+                for lon, lat in coords]
+
+    def _tags(self, properties: Optional[dict]) -> List[int]:
+        tags: List[int] = []
+        for key, value in (properties or {}).items():
+            if value is None:
+                continue
+            if not isinstance(value, (bool, int, float, str)):
+                value = str(value)
+            k = self._keys.setdefault(key, len(self._keys))
+            v = self._values.setdefault((type(value), value), len(self._values))
+            tags.extend((k, v))
+        return tags
+
+    def _add(self, geom_type: int, geometry: List[int], properties, feature_id):
+        parts = []
+        if feature_id is not None:
+            parts.append(_key(1, 0) + _varint(int(feature_id)))
+        tags = self._tags(properties)
+        if tags:
+            parts.append(_packed(2, tags))
+        parts.append(_key(3, 0) + _varint(geom_type))
+        parts.append(_packed(4, geometry))
+        self._features.append(b"".join(parts))
+
+    # -- API pública --
+
+    def add_points(self, coords, properties=None, feature_id=None) -> bool:
+        lo, hi = -self.buffer, self.extent + self.buffer
+        pts = [p for p in _quantize(self._project(coords))
+               if lo <= p[0] <= hi and lo <= p[1] <= hi]
+        if not pts:
+            return False
+
+        geometry = [_command(CMD_MOVE_TO, len(pts))]
+        cx = cy = 0
+        for px, py in pts:
+            geometry.extend((_zigzag(px - cx), _zigzag(py - cy)))
+            cx, cy = px, py
+        self._add(GEOM_POINT, geometry, properties, feature_id)
+        return True
+
+    def add_lines(self, lines, properties=None, feature_id=None) -> bool:
+        lo, hi = -self.buffer, self.extent + self.buffer
+        geometry: List[int] = []
+        cx = cy = 0
+
+        for line in lines:
+            for part in clip_line(self._project(line), lo, hi):
+                pts = _quantize(simplify_dp(part, self.tolerance))
+                if len(pts) < 2:
+                    continue
+                geometry.append(_command(CMD_MOVE_TO, 1))
+                geometry.extend((_zigzag(pts[0][0] - cx), _zigzag(pts[0][1] - cy)))
+                cx, cy = pts[0]
+                geometry.append(_command(CMD_LINE_TO, len(pts) - 1))
+                for px, py in pts[1:]:
+                    geometry.extend((_zigzag(px - cx), _zigzag(py - cy)))
+                    cx, cy = px, py
+
+        if not geometry:
+            return False
+        self._add(GEOM_LINESTRING, geometry, properties, feature_id)
+        return True
+
+    def add_polygons(self, polygons, properties=None, feature_id=None) -> bool:
+        lo, hi = -self.buffer, self.extent + self.buffer
+        geometry: List[int] = []
+        cx = cy = 0
+
+        for rings in polygons:
+            encoded_rings = []
+            for i, ring in enumerate(rings):
+                clipped = clip_ring(self._project(ring), lo, hi)
+                if len(clipped) < 3:
+                    if i == 0:
+                        break   # sin exterior no hay polígono
+                    continue
+                clipped.append(clipped[0])
+                pts = _quantize(simplify_dp(clipped, self.tolerance))
+                if len(pts) > 1 and pts[0] == pts[-1]:
+                    pts = pts[:-1]
+                area = _ring_area(pts) if len(pts) >= 3 else 0
+                if area == 0:
+                    if i == 0:
+                        break
+                    continue
+                # Exterior en sentido horario (área > 0), huecos al revés
+                if (i == 0 and area < 0) or (i > 0 and area > 0):
+                    pts.reverse()
+                encoded_rings.append(pts)
+
+            for pts in encoded_rings:
+                geometry.append(_command(CMD_MOVE_TO, 1))
+                geometry.extend((_zigzag(pts[0][0] - cx), _zigzag(pts[0][1] - cy)))
+                cx, cy = pts[0]
+                geometry.append(_command(CMD_LINE_TO, len(pts) - 1))
+                for px, py in pts[1:]:
+                    geometry.extend((_zigzag(px - cx), _zigzag(py - cy)))
+                    cx, cy = px, py
+                geometry.append(_command(CMD_CLOSE_PATH, 1))
+
+        if not geometry:
+            return False
+        self._add(GEOM_POLYGON, geometry, properties, feature_id)
+        return True
+
+    def encode(self) -> bytes:
+        # Se reúnen las partes y se unen al final: concatenar bytes con +=
+        # copia todo lo anterior en cada paso (coste cuadrático)
+        parts = [_key(15, 0) + _varint(2), _len_field(1, self.name.encode("utf-8"))]
+        parts.extend(_len_field(2, feature) for feature in self._features)
+        parts.extend(_len_field(3, key.encode("utf-8")) for key in self._keys)
+        parts.extend(_len_field(4, _encode_value(value)) for (_type, value) in self._values)
+        parts.append(_key(5, 0) + _varint(self.extent))
+        return b"".join(parts)
+
+
+def encode_tile(layers: Sequence[TileLayer]) -> bytes:
+    """
+    Serializa una tesela completa. Las capas vacías se omiten.
+    """
+    return b"".join(_len_field(3, layer.encode()) for layer in layers if len(layer))
@@ -0,0 +1,149 @@
+# core/pagination.py
+
+"""
+Paginación por cursor (keyset) para la API.
+
+Es opcional: solo se activa si la petición trae ?cursor= o ?page_size=,
+así que los clientes que esperan la lista completa (los visores) siguen
+funcionando igual. El cursor guarda los valores de las columnas de
+ordenación de la última fila servida y la página siguiente se pide con
+un WHERE sobre esas columnas, de modo que el coste no crece con la
+profundidad (a diferencia de OFFSET). Admite columnas con NULL en la
+ordenación (p. ej. Photo.taken_at): los NULL van siempre al final.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación keyset sobre el ordering del queryset de la vista.
+    La última columna de la ordenación debe ser única (normalmente id).
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def _ordering(self, queryset):
+        fields = []
+        for item in queryset.query.order_by or ("pk",):
+            desc = item.startswith("-")
+            name = item.lstrip("-")
+            if name == "pk":
+                name = queryset.model._meta.pk.name
+            fields.append((name, desc))
+        if fields[-1][0] != queryset.model._meta.pk.name:
+            fields.append((queryset.model._meta.pk.name, False))
+        return fields
+
+    def _page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value in (None, ""):
+            return DEFAULT_PAGE_SIZE
+        try:
+            return max(1, min(int(value), MAX_PAGE_SIZE))
+        except ValueError:
+            return DEFAULT_PAGE_SIZE
+
+    def _decode_cursor(self, request, model, ordering):
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(raw.encode("ascii")))
+            if len(values) != len(ordering):
+                raise ValueError
+            return [
+                None if v is None else model._meta.get_field(name).to_python(v)
+                for (name, _desc), v in zip(ordering, values)
+            ]
+        except Exception:
+            raise NotFound("Cursor no válido")
+
+    def _encode_cursor(self, row, ordering) -> str:
+        meta = row._meta
+        values = [_encode_value(getattr(row, meta.get_field(name).attname)) for name, _desc in ordering]
+        data = json.dumps(values, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii")
+
+    @staticmethod
+    def _after(ordering, values) -> Q:
+        """
+        Filas que van después de la posición indicada, con NULLS LAST
+        en todas las columnas:
+          (a > va) OR (a = va AND b > vb) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (name, desc), value in zip(ordering, values):
+            if value is None:
+                # Ya estamos en los NULL de esta columna: nada va detrás
+                after = Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if desc else "gt"
+                after = Q(**{f"{name}__{lookup}": value}) | Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        ordering = self._ordering(queryset)
+        page_size = self._page_size(request)
+
+        queryset = queryset.order_by(*[
+            F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True)
+            for name, desc in ordering
+        ])
+        position = self._decode_cursor(request, queryset.model, ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self._encode_cursor(rows[-1], ordering) if self.has_next else None
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
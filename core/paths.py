@@ -0,0 +1,98 @@
+# core/paths.py
+
+"""
+Nivel de detalle y codificaciones compactas para rutas de vuelo.
+
+- La simplificación (Douglas–Peucker) es core.geometry.simplify_dp.
+- encode_polyline / decode_polyline: formato "encoded polyline" de
+  Google (orden lat, lon), que entienden la mayoría de clientes.
+- encode_delta / decode_delta: enteros cuantizados con diferencias
+  entre puntos consecutivos, en orden lon, lat como GeoJSON.
+"""
+
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+PATH_ENCODINGS = ("polyline", "delta")
+
+# Decimales por defecto de cada codificación (1e-5 grados ≈ 1 m)
+DEFAULT_PRECISION = {"polyline": 5, "delta": 6}
+MAX_PRECISION = 7
+
+Coord = Tuple[float, float]
+
+
+def _quantize(points: Sequence[Coord], precision: int) -> np.ndarray:
+    return np.rint(np.asarray(points, dtype=float).reshape(-1, 2) * 10 ** precision).astype(np.int64)
+
+
+def _deltas(points: Sequence[Coord], precision: int) -> np.ndarray:
+    q = _quantize(points, precision)
+    if len(q):
+        q[1:] = np.diff(q, axis=0)
+    return q
+
+
+def encode_polyline(points: Sequence[Coord], precision: int = 5) -> str:
+    """
+    Codifica una línea de (lon, lat) como "encoded polyline" (lat, lon).
+    """
+    deltas = _deltas(points, precision)[:, ::-1].ravel()
+    out = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            out.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        out.append(chr(value + 63))
+    return "".join(out)
+
+
+def decode_polyline(text: str, precision: int = 5) -> List[Coord]:
+    """
+    Inverso de encode_polyline: devuelve una lista de (lon, lat).
+    """
+    values = []
+    shift = result = 0
+    for ch in text:
+        b = ord(ch) - 63
+        result |= (b & 0x1F) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift = result = 0
+
+    arr = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return [(lon, lat) for lat, lon in (arr / 10 ** precision).tolist()]
+
+
+def encode_delta(points: Sequence[Coord], precision: int = 6) -> List[int]:
+    """
+    Codifica una línea de (lon, lat) como lista plana de enteros:
+    [lon0, lat0, dlon1, dlat1, ...] con coordenadas multiplicadas por
+    10^precision; cada par después del primero es la diferencia con
+    el anterior.
+    """
+    return _deltas(points, precision).ravel().tolist()
+
+
+def decode_delta(values: Sequence[int], precision: int = 6) -> List[Coord]:
+    """
+    Inverso de encode_delta: devuelve una lista de (lon, lat).
+    """
+    arr = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0)
+    return [tuple(p) for p in (arr / 10 ** precision).tolist()]
+
+
+def encode_lines(lines: Sequence[Sequence[Coord]], encoding: str, precision: int):
+    """
+    Codifica varias líneas con la codificación indicada.
+    """
+    if encoding == "polyline":
+        return [encode_polyline(line, precision) for line in lines]
+    if encoding == "delta":
+        return [encode_delta(line, precision) for line in lines]
+    raise ValueError(f"Codificación desconocida: {encoding}")
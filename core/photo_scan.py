@@ -0,0 +1,84 @@
+# core/photo_scan.py
+
+"""
+Trabajo de los procesos de import_photos.
+
+Está separado del comando porque los procesos se crean con "spawn":
+cada uno importa este módulo desde cero, antes de que Django esté
+configurado, así que aquí no se puede importar core.models (ni nada
+que lo importe).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+
+from .utils_exif import extract_exif_metadata
+
+# Carpeta (dentro de MEDIA_ROOT) donde se copian las fotos importadas
+IMPORT_DIR = "photos"
+
+
+def init_worker(settings_module: str) -> None:
+    """
+    initializer del pool: configura Django en el proceso hijo con los
+    mismos settings que el comando.
+    """
+    import django
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = settings_module
+    django.setup()
+
+
+def storage_name(digest: str, filename: str) -> str:
+    """
+    Nombre determinista en el storage: el mismo fichero siempre acaba
+    en el mismo sitio, lo que permite reanudar una importación.
+    """
+    stem = re.sub(r"[^\w.-]+", "_", Path(filename).stem)[:80] or "foto"
+    return f"{IMPORT_DIR}/{digest}_{stem}{Path(filename).suffix.lower()}"
+
+
+def scan_file(task):
+    """
+    Trabajo de cada proceso: lee el fichero una vez, calcula su hash,
+    extrae el EXIF de la cabecera y lo copia a MEDIA_ROOT si no estaba.
+    """
+    path, media_root, copy = task
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except OSError as exc:
+        return {"path": path, "error": str(exc)}
+
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    name = storage_name(digest, path)
+    meta = extract_exif_metadata(io.BytesIO(data)) or {}
+
+    result = {
+        "path": path,
+        "name": name,
+        "bytes": len(data),
+        "lat": meta.get("lat"),
+        "lon": meta.get("lon"),
+        "taken_at": meta.get("taken_at"),
+        "error": None,
+    }
+
+    if copy and result["lat"] is not None:
+        dest = os.path.join(media_root, name)
+        if not os.path.exists(dest):
+            try:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                tmp = f"{dest}.part"
+                with open(tmp, "wb") as out:
+                    out.write(data)
+                os.replace(tmp, dest)
+            except OSError as exc:
+                result["error"] = str(exc)
+
+    return result
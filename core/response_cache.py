@@ -0,0 +1,227 @@
+# core/response_cache.py
+
+"""
+Caché de respuestas ya renderizadas (colecciones de la API y exportaciones).
+
+Se guardan los bytes finales de la respuesta, así que en un acierto no se
+consulta la BD ni se serializa nada. La clave incluye el ETag de los datos
+(core.versioning), que cambia con cada save/delete y con las cargas
+masivas: una respuesta antigua nunca se vuelve a servir, simplemente deja
+de pedirse y caduca sola.
+
+Los aciertos y fallos se cuentan en la propia caché (ver cache_stats()),
+así que solo se pueden consultar desde otro proceso (el comando
+response_cache_stats) si la caché es compartida: file o redis, no locmem.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.response import SimpleTemplateResponse
+
+from .versioning import aload_versions, data_etag
+
+KEY_PREFIX = "resp"
+STATS_KEYS = {"hits": f"{KEY_PREFIX}:stats:hits", "misses": f"{KEY_PREFIX}:stats:misses"}
+
+# Cabeceras de la respuesta original que se guardan junto al contenido
+STORED_HEADERS = ("Content-Type", "Content-Disposition")
+
+
+def _enabled() -> bool:
+    return getattr(settings, "RESPONSE_CACHE_ENABLED", True)
+
+
+def _timeout() -> int:
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 3600)
+
+
+def _max_bytes() -> int:
+    return getattr(settings, "RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+
+
+def response_key(request, names) -> str:
+    """
+    Clave de una respuesta: ETag de los datos (versiones + URL + Accept)
+    más el host, porque algunas respuestas llevan URLs absolutas.
+    """
+    raw = f"{data_etag(request, names)}|{request.get_host()}"
+    return f"{KEY_PREFIX}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+
+def _count(event: str) -> None:
+    key = STATS_KEYS[event]
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Primera vez (o la caché se ha vaciado)
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(event: str) -> None:
+    key = STATS_KEYS[event]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def stats_shared() -> bool:
+    """
+    Si los contadores son visibles desde otros procesos. Con locmem cada
+    proceso tiene su propia caché (y sus propios contadores).
+    """
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def cache_stats() -> dict:
+    values = cache.get_many(list(STATS_KEYS.values()))
+    stats = {event: values.get(key, 0) for event, key in STATS_KEYS.items()}
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / total if total else 0.0
+    return stats
+
+
+def reset_cache_stats() -> None:
+    cache.delete_many(list(STATS_KEYS.values()))
+
+
+def _cacheable(response) -> bool:
+    if response.status_code != 200:
+        return False
+    # El API navegable (HTML) lleva token CSRF y datos de la sesión
+    return not response.get("Content-Type", "").startswith("text/html")
+
+
+def _headers(response) -> dict:
+    return {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+
+
+def _store(key, content: bytes, headers: dict) -> None:
+    if len(content) <= _max_bytes():
+        cache.set(key, {"content": content, "headers": headers}, _timeout())
+
+
+def _tee(chunks, key, headers):
+    """
+    Reenvía los bloques de una respuesta en streaming y, si se ha
+    enviado completa y no es demasiado grande, la guarda al terminar.
+    """
+    parts = []
+    size = 0
+    limit = _max_bytes()
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > limit:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    if parts is not None:
+        _store(key, b"".join(parts), headers)
+
+
+async def _atee(chunks, key, headers):
+    """
+    _tee para respuestas en streaming asíncronas (vistas ASGI).
+    """
+    parts = []
+    size = 0
+    limit = _max_bytes()
+    async for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > limit:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    if parts is not None:
+        await cache.aset(key, {"content": b"".join(parts), "headers": headers}, _timeout())
+
+
+def _remember(key, response) -> None:
+    if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+        # Respuestas DRF: el contenido y su Content-Type existen al renderizarlas
+        def _after_render(rendered):
+            if _cacheable(rendered):
+                _store(key, rendered.content, _headers(rendered))
+
+        response.add_post_render_callback(_after_render)
+    elif not _cacheable(response):
+        return
+    elif isinstance(response, StreamingHttpResponse):
+        tee = _atee if response.is_async else _tee
+        response.streaming_content = tee(response.streaming_content, key, _headers(response))
+    else:
+        _store(key, response.content, _headers(response))
+
+
+def _from_entry(entry) -> HttpResponse:
+    response = HttpResponse(entry["content"])
+    for name, value in entry["headers"].items():
+        response[name] = value
+    return response
+
+
+def cached_response(*names: str):
+    """
+    Decorador de vistas de lectura cuyo resultado solo depende de la URL
+    y de los modelos indicados ("flight", "photo", "zone"). Añade la
+    cabecera X-Cache: HIT/MISS. Admite vistas async (caché con aget/aset).
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def ainner(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD") or not _enabled():
+                    return await view(request, *args, **kwargs)
+
+                await aload_versions(request, names)
+                key = response_key(request, names)
+                entry = await cache.aget(key)
+                if entry is not None:
+                    await _acount("hits")
+                    response = _from_entry(entry)
+                    response["X-Cache"] = "HIT"
+                    return response
+
+                await _acount("misses")
+                response = await view(request, *args, **kwargs)
+                _remember(key, response)
+                response["X-Cache"] = "MISS"
+                return response
+            return ainner
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or not _enabled():
+                return view(request, *args, **kwargs)
+
+            key = response_key(request, names)
+            entry = cache.get(key)
+            if entry is not None:
+                _count("hits")
+                response = _from_entry(entry)
+                response["X-Cache"] = "HIT"
+                return response
+
+            _count("misses")
+            response = view(request, *args, **kwargs)
+            _remember(key, response)
+            response["X-Cache"] = "MISS"
+            return response
+        return inner
+    return decorator
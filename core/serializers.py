@@ -1,22 +1,77 @@
 from rest_framework import serializers
+from .geometry import extract_lines, simplify_dp
 from .models import Photo, Flight, Zone
+from .paths import encode_lines
 
 
-class PhotoSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """
+    Campos pedidos con ?fields=a,b,c, o None si no se ha indicado.
+    """
+    if request is None:
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Permite pedir solo algunos campos con ?fields=id,name,...
+    (solo en lecturas; los nombres desconocidos se ignoran).
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            wanted = requested_fields(request)
+            if wanted:
+                for name in list(fields):
+                    if name not in wanted:
+                        fields.pop(name)
+        return fields
+
+
+class PhotoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Derivados ligeros de la imagen (caen a la original si no existen)
+    thumbnail = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
+
     class Meta:
         model = Photo
         fields = [
             'id',
             'flight',
             'image',
+            'thumbnail',
+            'preview',
             'lat',
             'lon',
             'taken_at',
             'notes',
         ]
 
+    def _absolute(self, url):
+        request = self.context.get('request')
+        if url and request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_thumbnail(self, obj):
+        return self._absolute(obj.thumbnail_url)
+
+    def get_preview(self, obj):
+        return self._absolute(obj.popup_url)
+
+
+class FlightSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Métricas persistidas de la ruta; los puntos van como [lon, lat]
+    bbox = serializers.SerializerMethodField()
+    start_point = serializers.SerializerMethodField()
+    end_point = serializers.SerializerMethodField()
 
-class FlightSerializer(serializers.ModelSerializer):
     class Meta:
         model = Flight
         fields = [
@@ -25,10 +80,80 @@ class FlightSerializer(serializers.ModelSerializer):
             'drone_model',
             'date',
             'path_geojson',
+            'distance_km',
+            'point_count',
+            'bbox',
+            'start_point',
+            'end_point',
         ]
+        read_only_fields = ['distance_km', 'point_count']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        # Opciones de la vista (?simplify=, ?zoom=, ?encoding=): ver
+        # FlightViewSet._path_options
+        options = self.context.get('path_options')
+        if options and data.get('path_geojson'):
+            lines = extract_lines(instance.path_geojson)
+            tolerance = options.get('tolerance')
+            if tolerance:
+                lines = [simplify_dp(line, tolerance) for line in lines]
+
+            encoding = options.get('encoding')
+            if encoding:
+                data['path_geojson'] = None
+                data['path'] = {
+                    'encoding': encoding,
+                    'precision': options['precision'],
+                    'lines': encode_lines(lines, encoding, options['precision']),
+                }
+            elif len(lines) == 1:
+                data['path_geojson'] = {'type': 'LineString', 'coordinates': lines[0]}
+            else:
+                data['path_geojson'] = {'type': 'MultiLineString', 'coordinates': lines}
+        return data
+
+    def get_bbox(self, obj):
+        if obj.min_lon is None:
+            return None
+        return [obj.min_lon, obj.min_lat, obj.max_lon, obj.max_lat]
+
+    def get_start_point(self, obj):
+        if obj.start_lat is None:
+            return None
+        return [obj.start_lon, obj.start_lat]
+
+    def get_end_point(self, obj):
+        if obj.end_lat is None:
+            return None
+        return [obj.end_lon, obj.end_lat]
+
+
+class ZoneLODGeometryField(serializers.Field):
+    """
+    Geometría de la zona en un nivel simplificado (solo lectura).
+    """
+
+    def __init__(self, level, **kwargs):
+        self.level = level
+        kwargs.setdefault('source', '*')
+        kwargs.setdefault('read_only', True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return instance.simplified_geometry(self.level)
+
 
+class ZoneSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    def get_fields(self):
+        fields = super().get_fields()
+        # ?zoom= / ?tolerance= en la vista: geometría simplificada
+        level = self.context.get('zone_lod')
+        if level and 'geometry' in fields:
+            fields['geometry'] = ZoneLODGeometryField(level)
+        return fields
 
-class ZoneSerializer(serializers.ModelSerializer):
     class Meta:
         model = Zone
         fields = [
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Flight, Photo, Zone
+from .versioning import bump
+
+
+@receiver([post_save, post_delete], sender=Flight)
+def flight_changed(sender, **kwargs):
+    # Al borrar un vuelo sus fotos quedan con flight=NULL (sin señales)
+    if kwargs.get("signal") is post_delete:
+        bump("flight", "photo")
+    else:
+        bump("flight")
+
+
+@receiver([post_save, post_delete], sender=Photo)
+def photo_changed(sender, **kwargs):
+    bump("photo")
+
+
+@receiver([post_save, post_delete], sender=Zone)
+def zone_changed(sender, **kwargs):
+    bump("zone")
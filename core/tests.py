@@ -1,3 +1,1572 @@
-from django.test import TestCase
+import datetime
+import glob
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import geohash
+from .conflicts import check_flight_conflicts
+from .geodesy import (
+    as_lat_lon, bearings_deg, haversine_km, path_length_km, path_lengths_km, resample_path, vincenty_km,
+)
+from .geojson_stream import RS, feature_collection_chunks, iter_feature_collection, iter_feature_sequence
+from .geometry import simplify_dp
+from .models import DataVersion, Flight, Photo, Zone
+from .mvt import EXTENT, TileLayer, encode_tile, lonlat_to_tile
+from .paths import decode_delta, decode_polyline, encode_delta, encode_polyline
+from .response_cache import cache_stats
+from .utils_exif import _build_metadata, _read_pillow, extract_exif_metadata
+from .versioning import bump
+from .zone_index import BBoxGridIndex
+from .zone_simplify import build_zone_lods, lod_for_tolerance, lod_key, rebuild_zone_lods, tolerance_for_zoom
+
+
+def _square(lon, lat, size):
+    return [[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]
+
+
+def _bulk_photos(photos):
+    """
+    bulk_create no llama a save(): el geohash (que usan los filtros
+    por bbox) se calcula aquí.
+    """
+    for photo in photos:
+        photo.update_geohash()
+    return Photo.objects.bulk_create(photos)
+
+
+def _zone_feature(ring, **properties):
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+    }
+
+
+# -----------------------
+# Lector protobuf mínimo para comprobar las teselas MVT
+# -----------------------
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _read_message(data):
+    """
+    [(campo, valor)] de un mensaje protobuf (varint, 64 bits y longitud).
+    """
+    fields = []
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire == 1:
+            value, pos = data[pos:pos + 8], pos + 8
+        elif wire == 2:
+            size, pos = _read_varint(data, pos)
+            value, pos = data[pos:pos + size], pos + size
+        else:
+            raise AssertionError(f"Tipo de campo inesperado: {wire}")
+        fields.append((field, value))
+    return fields
+
+
+def _read_packed(data):
+    values = []
+    pos = 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _decode_geometry(commands):
+    """
+    Lista de partes [(x, y), ...] en coordenadas absolutas de tesela.
+    """
+    parts = []
+    x = y = 0
+    i = 0
+    while i < len(commands):
+        cmd, count = commands[i] & 0x7, commands[i] >> 3
+        i += 1
+        if cmd == 7:
+            parts[-1].append(parts[-1][0])
+            continue
+        for _ in range(count):
+            x += _unzigzag(commands[i])
+            y += _unzigzag(commands[i + 1])
+            i += 2
+            if cmd == 1:
+                parts.append([])
+            parts[-1].append((x, y))
+    return parts
+
+
+def _decode_value(data):
+    field, value = _read_message(data)[0]
+    if field == 1:
+        return value.decode("utf-8")
+    if field == 3:
+        return struct.unpack("<d", value)[0]
+    if field == 6:
+        return _unzigzag(value)
+    if field == 7:
+        return bool(value)
+    return value
+
+
+def _decode_tile(data):
+    """
+    {nombre de capa: {"extent", "version", "features": [...]}}
+    """
+    layers = {}
+    for field, raw_layer in _read_message(data):
+        assert field == 3
+        layer = {"features": [], "keys": [], "values": []}
+        raw_features = []
+        for lfield, value in _read_message(raw_layer):
+            if lfield == 1:
+                layer["name"] = value.decode("utf-8")
+            elif lfield == 2:
+                raw_features.append(value)
+            elif lfield == 3:
+                layer["keys"].append(value.decode("utf-8"))
+            elif lfield == 4:
+                layer["values"].append(_decode_value(value))
+            elif lfield == 5:
+                layer["extent"] = value
+            elif lfield == 15:
+                layer["version"] = value
+        for raw in raw_features:
+            feature = {"id": None, "properties": {}}
+            for ffield, value in _read_message(raw):
+                if ffield == 1:
+                    feature["id"] = value
+                elif ffield == 2:
+                    tags = _read_packed(value)
+                    for k, v in zip(tags[::2], tags[1::2]):
+                        feature["properties"][layer["keys"][k]] = layer["values"][v]
+                elif ffield == 3:
+                    feature["type"] = value
+                elif ffield == 4:
+                    feature["geometry"] = _decode_geometry(_read_packed(value))
+            layer["features"].append(feature)
+        layers[layer["name"]] = layer
+    return layers
+
+
+def _tile_point(lon, lat, z=0, x=0, y=0):
+    px, py = lonlat_to_tile(lon, lat, z, x, y)
+    return (int(round(px)), int(round(py)))
+
+
+# -----------------------
+# Teselas vectoriales (user-001)
+# -----------------------
+
+class MVTEncoderTests(SimpleTestCase):
+
+    def test_points_lines_and_polygons_round_trip(self):
+        layer = TileLayer("test", 0, 0, 0)
+        layer.add_points([(0.0, 0.0)], {"name": "centro", "n": -3, "ok": True}, feature_id=7)
+        layer.add_lines([[(-90.0, 0.0), (0.0, 45.0), (90.0, 0.0)]], {"name": "ruta"}, feature_id=8)
+        ring = [(-10.0, -10.0), (10.0, -10.0), (10.0, 10.0), (-10.0, 10.0), (-10.0, -10.0)]
+        layer.add_polygons([[ring]], {"area": 1.5}, feature_id=9)
+
+        tile = _decode_tile(encode_tile([layer]))
+        decoded = tile["test"]
+        self.assertEqual(decoded["version"], 2)
+        self.assertEqual(decoded["extent"], EXTENT)
+
+        point, line, polygon = decoded["features"]
+        self.assertEqual((point["id"], point["type"]), (7, 1))
+        self.assertEqual(point["properties"], {"name": "centro", "n": -3, "ok": True})
+        self.assertEqual(point["geometry"], [[(EXTENT // 2, EXTENT // 2)]])
+
+        self.assertEqual((line["id"], line["type"]), (8, 2))
+        self.assertEqual(line["geometry"], [[
+            _tile_point(-90.0, 0.0), _tile_point(0.0, 45.0), _tile_point(90.0, 0.0),
+        ]])
+
+        self.assertEqual((polygon["id"], polygon["type"]), (9, 3))
+        self.assertEqual(polygon["properties"], {"area": 1.5})
+        decoded_ring = polygon["geometry"][0]
+        self.assertEqual(decoded_ring[0], decoded_ring[-1])
+        self.assertEqual(
+            set(decoded_ring),
+            {_tile_point(lon, lat) for lon, lat in ring},
+        )
+
+    def test_shared_keys_and_values_are_deduplicated(self):
+        layer = TileLayer("photos", 0, 0, 0)
+        for i in range(3):
+            layer.add_points([(i, i)], {"kind": "foto"}, feature_id=i + 1)
+
+        decoded = _decode_tile(encode_tile([layer]))["photos"]
+        self.assertEqual(decoded["keys"], ["kind"])
+        self.assertEqual(decoded["values"], ["foto"])
+        self.assertEqual([f["id"] for f in decoded["features"]], [1, 2, 3])
+
+    def test_empty_layers_are_omitted(self):
+        self.assertEqual(encode_tile([TileLayer("vacia", 0, 0, 0)]), b"")
+
+
+class VectorTileViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _features(self, layer, query=""):
+        response = self.client.get(f"/tiles/{layer}/0/0/0.mvt{query}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        tile = _decode_tile(response.content)
+        return tile[layer]["features"] if layer in tile else []
+
+    def test_saving_and_deleting_refresh_cached_tiles(self):
+        photo = Photo.objects.create(lat=40.4, lon=-3.7)
+        self.assertEqual([f["properties"]["count"] for f in self._features("photos")], [1])
+
+        # Sin invalidación explícita: la versión de datos cambia la clave
+        Photo.objects.create(lat=40.4001, lon=-3.7001)
+        self.assertEqual([f["properties"]["count"] for f in self._features("photos")], [2])
+
+        photo.delete()
+        self.assertEqual([f["properties"]["count"] for f in self._features("photos")], [1])
+
+    def test_flight_path_edit_refreshes_flights_layer(self):
+        flight = Flight.objects.create(
+            name="Vuelo", path_geojson={"type": "LineString", "coordinates": [[-3.7, 40.4], [-3.6, 40.5]]}
+        )
+        self.assertEqual([f["id"] for f in self._features("flights")], [flight.pk])
+
+        flight.path_geojson = {"type": "LineString", "coordinates": [[100.0, 10.0], [100.1, 10.1]]}
+        flight.save()
+        [feature] = self._features("flights")
+        self.assertEqual(feature["geometry"][0][0], _tile_point(100.0, 10.0))
+
+    def test_bulk_changes_refresh_after_bump(self):
+        self.assertEqual(self._features("photos"), [])
+        Photo.objects.bulk_create([Photo(lat=10.0, lon=10.0), Photo(lat=-10.0, lon=-10.0)])
+        bump("photo")
+        self.assertEqual(len(self._features("photos")), 2)
+
+    def test_flight_filter(self):
+        line = {"type": "LineString", "coordinates": [[-3.7, 40.4], [-3.6, 40.5]]}
+        first = Flight.objects.create(name="Uno", path_geojson=line)
+        second = Flight.objects.create(name="Dos", path_geojson=line)
+        Photo.objects.create(lat=40.4, lon=-3.7, flight=first)
+        Photo.objects.create(lat=-33.9, lon=151.2, flight=second)
+
+        self.assertEqual(len(self._features("flights")), 2)
+        self.assertEqual(len(self._features("photos")), 2)
+        [feature] = self._features("flights", query=f"?flight={second.pk}")
+        self.assertEqual(feature["id"], second.pk)
+        [feature] = self._features("photos", query=f"?flight={first.pk}")
+        self.assertEqual(feature["properties"]["count"], 1)
+        self.assertEqual(self.client.get("/tiles/photos/0/0/0.mvt?flight=abc").status_code, 404)
+
+    def test_unknown_layer_is_404(self):
+        self.assertEqual(self.client.get("/tiles/otra/0/0/0.mvt").status_code, 404)
+        self.assertEqual(self.client.get("/tiles/photos/1/2/0.mvt").status_code, 404)
+
+
+# -----------------------
+# Agrupación de fotos en el servidor (user-002)
+# -----------------------
+
+class PhotoClustersTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.flight = Flight.objects.create(name="Vuelo")
+        photos = [Photo(lat=40.40 + i * 1e-4, lon=-3.70, flight=cls.flight) for i in range(5)]
+        photos += [Photo(lat=41.39, lon=2.17) for _ in range(3)]
+        photos.append(Photo(lat=20.0, lon=20.0))
+        _bulk_photos(photos)
+
+    def _get(self, query):
+        return self.client.get(f"/api/photos/clusters/{query}", HTTP_ACCEPT="application/json")
+
+    def test_cells_inside_bbox(self):
+        data = self._get("?bbox=-10,35,5,45&zoom=6").json()
+        self.assertEqual(sorted(c["count"] for c in data["results"]), [3, 5])
+        madrid = max(data["results"], key=lambda c: c["count"])
+        self.assertAlmostEqual(madrid["lat"], 40.4002, places=4)
+        self.assertEqual(madrid["photo_id"], Photo.objects.filter(lon=-3.70).order_by("-id")[0].pk)
+
+    def test_filters(self):
+        data = self._get(f"?bbox=-10,35,5,45&zoom=6&flight={self.flight.pk}").json()
+        self.assertEqual([c["count"] for c in data["results"]], [5])
+
+    def test_invalid_parameters_are_400(self):
+        response = self._get("?bbox=-10,35,5,45&zoom=6&flight=abc")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("flight", response.json())
+        self.assertEqual(self._get("?zoom=6").status_code, 400)
+        self.assertEqual(self._get("?bbox=-10,35,5,45&zoom=99").status_code, 400)
+
+
+# -----------------------
+# Zonas que contienen un punto (user-003)
+# -----------------------
+
+class ZonesAtTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Cuadrado de 0 a 4 con un hueco de 1 a 2, y otro que lo solapa
+        feature = _zone_feature(_square(0, 0, 4))
+        feature["geometry"]["coordinates"].append(_square(1, 1, 1))
+        cls.big = Zone.objects.create(name="Con hueco", zone_type="Restringida", geometry=feature)
+        cls.small = Zone.objects.create(name="Esquina", zone_type="Prohibida", geometry=_zone_feature(_square(3, 3, 2)))
+
+    def _at(self, lon, lat):
+        response = self.client.get(f"/api/zones/at/?lat={lat}&lon={lon}", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        return sorted(z["id"] for z in response.json())
+
+    def test_bbox_columns(self):
+        self.assertEqual((self.big.min_lon, self.big.min_lat, self.big.max_lon, self.big.max_lat), (0, 0, 4, 4))
+
+    def test_point_lookup(self):
+        self.assertEqual(self._at(0.5, 0.5), [self.big.pk])
+        self.assertEqual(self._at(1.5, 1.5), [])  # en el hueco
+        self.assertEqual(self._at(3.5, 3.5), [self.big.pk, self.small.pk])
+        self.assertEqual(self._at(10, 10), [])
+        response = self.client.get("/api/zones/at/?lat=x", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_lookup(self):
+        response = self.client.post(
+            "/api/zones/at/batch/",
+            {"points": [[0.5, 0.5], {"lon": 1.5, "lat": 1.5}, [4.5, 4.5], [20, 20]]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["results"], [[self.big.pk], [], [self.small.pk], []])
+        self.assertEqual(data["zones"][str(self.small.pk)], {"name": "Esquina", "zone_type": "Prohibida"})
+
+        response = self.client.post("/api/zones/at/batch/", {"points": [["a", 1]]}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# -----------------------
+# Conflictos ruta / zona (user-004)
+# -----------------------
+
+class _CountingCells(dict):
+    """
+    Dict de celdas que cuenta las consultas, para medir cuántas celdas
+    recorre query_bbox.
+    """
+
+    lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+
+class BBoxGridIndexTests(SimpleTestCase):
+
+    def _count_lookups(self, index, bbox):
+        index._cells = _CountingCells(index._cells)
+        result = index.query_bbox(bbox)
+        return result, index._cells.lookups
+
+    def test_large_query_only_walks_grid_cells(self):
+        index = BBoxGridIndex([("a", (-3.7, 40.4, -3.6999, 40.4001))])
+        result, lookups = self._count_lookups(index, (-4.0, 40.0, -3.5, 40.5))
+        self.assertEqual(result, ["a"])
+        self.assertLessEqual(lookups, index.cells_per_axis ** 2)
+
+    def test_degenerate_extent(self):
+        # Zona de anchura cero: antes la celda medía 1e-9 grados
+        index = BBoxGridIndex([("p", (-3.7, 40.4, -3.7, 40.4)), ("q", (-3.7, 40.5, -3.7, 40.5))])
+        result, lookups = self._count_lookups(index, (-4.0, 40.0, -3.5, 40.6))
+        self.assertEqual(sorted(result), ["p", "q"])
+        self.assertLessEqual(lookups, index.cells_per_axis ** 2)
+        self.assertEqual(index.query_point(-3.7, 40.5), ["q"])
+
+    def test_queries_outside_the_extent(self):
+        items = [(i, (i, i, i + 0.5, i + 0.5)) for i in range(9)]
+        index = BBoxGridIndex(items)
+        self.assertEqual(index.query_bbox((20, 20, 30, 30)), [])
+        self.assertEqual(index.query_point(-5, -5), [])
+        self.assertEqual(sorted(index.query_bbox((-100, -100, 100, 100))), list(range(9)))
+        self.assertEqual(index.query_point(8.25, 8.25), [8])
+
+
+class FlightConflictTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.prohibited = Zone.objects.create(
+            name="Aeropuerto", zone_type="Prohibida", geometry=_zone_feature(_square(0, 0, 1))
+        )
+        Zone.objects.create(name="Parque", zone_type="Permitida", geometry=_zone_feature(_square(2, 0, 1)))
+
+    def test_path_crossing_prohibited_zone(self):
+        path = {"type": "LineString", "coordinates": [[-1, 0.5], [1.5, 0.5], [2.5, 0.5]]}
+        conflicts = check_flight_conflicts(path)
+        self.assertEqual(len(conflicts), 1)
+        conflict = conflicts[0]
+        self.assertEqual(conflict["zone_id"], self.prohibited.pk)
+        [segment] = conflict["segments"]
+        self.assertEqual(segment["entry"], [0.0, 0.5])
+        self.assertEqual(segment["exit"], [1.0, 0.5])
+
+        self.assertEqual(len(check_flight_conflicts(path, all_zones=True)), 2)
+
+    def test_path_starting_inside_and_path_outside(self):
+        inside = {"type": "LineString", "coordinates": [[0.5, 0.5], [0.5, 2.0]]}
+        [conflict] = check_flight_conflicts(inside)
+        [segment] = conflict["segments"]
+        self.assertIsNone(segment["entry"])
+        self.assertAlmostEqual(segment["exit"][0], 0.5)
+        self.assertAlmostEqual(segment["exit"][1], 1.0)
+
+        outside = {"type": "LineString", "coordinates": [[-1, 2], [3, 2]]}
+        self.assertEqual(check_flight_conflicts(outside), [])
+
+
+# -----------------------
+# Métricas persistidas de la ruta (user-005)
+# -----------------------
+
+def _line(*coords):
+    return {"type": "LineString", "coordinates": [list(c) for c in coords]}
+
+
+class FlightMetricsTests(TestCase):
+
+    def test_metrics_computed_on_create(self):
+        flight = Flight.objects.create(name="Vuelo", path_geojson=_line((0, 0), (1, 0), (1, 2)))
+        flight.refresh_from_db()
+        self.assertEqual(flight.point_count, 3)
+        self.assertEqual((flight.min_lon, flight.min_lat, flight.max_lon, flight.max_lat), (0, 0, 1, 2))
+        self.assertEqual((flight.start_lon, flight.start_lat, flight.end_lon, flight.end_lat), (0, 0, 1, 2))
+        self.assertAlmostEqual(flight.distance_km, 3 * 111.195, places=1)
+
+        empty = Flight.objects.create(name="Sin ruta")
+        self.assertEqual((empty.point_count, empty.distance_km, empty.min_lon), (0, 0.0, None))
+
+    def test_path_changed_only_on_real_changes(self):
+        flight = Flight.objects.create(name="Vuelo", path_geojson=_line((0, 0), (1, 0)))
+        flight = Flight.objects.get(pk=flight.pk)
+        self.assertFalse(flight.path_changed())
+
+        flight.path_geojson["coordinates"].append([2, 0])
+        self.assertTrue(flight.path_changed())
+        flight.save()
+        self.assertEqual(Flight.objects.get(pk=flight.pk).point_count, 3)
+
+        # Con update_fields sin la ruta no se recalcula nada
+        Flight.objects.filter(pk=flight.pk).update(point_count=0)
+        flight.name = "Renombrado"
+        flight.save(update_fields=["name"])
+        self.assertEqual(Flight.objects.get(pk=flight.pk).point_count, 0)
+
+    def test_backfill_command(self):
+        flight = Flight.objects.create(name="Vuelo", path_geojson=_line((0, 0), (0, 1)))
+        Flight.objects.filter(pk=flight.pk).update(distance_km=0, point_count=0, min_lon=None)
+        version = DataVersion.objects.get(name="flight").version
+
+        out = io.StringIO()
+        call_command("backfill_flight_metrics", "--batch-size", "1", stdout=out)
+        self.assertIn("1 vuelos", out.getvalue())
+        flight.refresh_from_db()
+        self.assertEqual((flight.point_count, flight.min_lon), (2, 0))
+        self.assertGreater(flight.distance_km, 111)
+        self.assertEqual(DataVersion.objects.get(name="flight").version, version + 1)
+
+    def test_flight_list_sorts_by_distance(self):
+        short = Flight.objects.create(name="Corto", path_geojson=_line((0, 0), (0, 0.1)))
+        long = Flight.objects.create(name="Largo", path_geojson=_line((0, 0), (0, 2)))
+        response = self.client.get("/flights/?sort=-distance")
+        self.assertEqual([f.pk for f in response.context["flights"]], [long.pk, short.pk])
+        response = self.client.get("/flights/?sort=distance")
+        self.assertEqual([f.pk for f in response.context["flights"]], [short.pk, long.pk])
+
+
+# -----------------------
+# Geodesia vectorizada (user-006)
+# -----------------------
+
+class GeodesyTests(SimpleTestCase):
+
+    def test_haversine_one_degree_at_equator(self):
+        self.assertAlmostEqual(float(haversine_km(0, 0, 0, 1)), 111.195, places=3)
+
+    def test_haversine_madrid_barcelona(self):
+        # Puerta del Sol - Plaça de Catalunya, ~505 km en línea recta
+        d = float(haversine_km(40.4168, -3.7038, 41.3874, 2.1686))
+        self.assertAlmostEqual(d, 505.0, delta=2.0)
+
+    def test_vincenty_flinders_peak_buninyong(self):
+        # Ejemplo clásico de Vincenty (1975): 54 972,271 m
+        lat1 = -(37 + 57 / 60 + 3.72030 / 3600)
+        lon1 = 144 + 25 / 60 + 29.52440 / 3600
+        lat2 = -(37 + 39 / 60 + 10.15610 / 3600)
+        lon2 = 143 + 55 / 60 + 35.38390 / 3600
+        self.assertAlmostEqual(float(vincenty_km(lat1, lon1, lat2, lon2)), 54.972271, places=5)
+
+    def test_vincenty_one_degree_at_equator(self):
+        # En el ecuador: semieje mayor de WGS84 * pi / 180
+        self.assertAlmostEqual(float(vincenty_km(0, 0, 0, 1)), 111.319491, places=5)
+
+    def test_path_length_sums_segments(self):
+        lats = [0.0, 0.0, 1.0]
+        lons = [0.0, 1.0, 1.0]
+        expected = float(haversine_km(0, 0, 0, 1) + haversine_km(0, 1, 1, 1))
+        self.assertAlmostEqual(path_length_km(lats, lons), expected, places=9)
+        self.assertEqual(path_length_km([0.0], [0.0]), 0.0)
+
+    def test_vectorized_matches_scalar(self):
+        lats = np.array([40.4, 41.4, 37.4, 43.3])
+        lons = np.array([-3.7, 2.2, -6.0, -8.4])
+        segments = haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:])
+        for i in range(3):
+            self.assertAlmostEqual(segments[i], float(haversine_km(lats[i], lons[i], lats[i + 1], lons[i + 1])))
+        self.assertAlmostEqual(path_length_km(lats, lons, method="vincenty"),
+                               float(vincenty_km(lats[:-1], lons[:-1], lats[1:], lons[1:]).sum()))
+
+    def test_many_paths_at_once(self):
+        paths = [[(0, 0), (0, 1)], [(10, 10)], [], [(0, 0), (1, 0), (1, 1)]]
+        expected = [path_length_km(*as_lat_lon(p)) if p else 0.0 for p in paths]
+        np.testing.assert_allclose(path_lengths_km(paths), expected)
+
+    def test_bearings(self):
+        np.testing.assert_allclose(bearings_deg([0, 0, 1, 1], [0, 1, 1, 0]), [90, 0, 270], atol=0.01)
+
+
+# -----------------------
+# Exportaciones GeoJSON en streaming (user-007)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class GeoJSONExportTests(TestCase):
+
+    def _export(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            body = b"".join(response.streaming_content)
+        return body, len(ctx.captured_queries)
+
+    def test_photo_export_query_count_does_not_grow(self):
+        flight = Flight.objects.create(name="Vuelo")
+        _bulk_photos([Photo(lat=40.0, lon=-3.0, flight=flight)])
+        _body, few = self._export("/export/photos.geojson")
+
+        _bulk_photos([Photo(lat=40.0 + i * 0.01, lon=-3.0, flight=flight) for i in range(20)])
+        body, many = self._export("/export/photos.geojson")
+        self.assertEqual(few, many)
+
+        data = json.loads(body)
+        self.assertEqual(data["type"], "FeatureCollection")
+        self.assertEqual(len(data["features"]), 21)
+        self.assertEqual(data["features"][0]["properties"]["flight_name"], "Vuelo")
+
+    def test_flight_export(self):
+        Flight.objects.create(name="Uno", path_geojson={"type": "LineString", "coordinates": [[0, 0], [1, 1]]})
+        Flight.objects.create(name="Sin ruta")
+        body, _queries = self._export("/export/flights.geojson")
+        data = json.loads(body)
+        self.assertEqual([f["properties"]["name"] for f in data["features"]], ["Uno"])
+        self.assertEqual(data["features"][0]["geometry"]["type"], "LineString")
+
+
+# -----------------------
+# Secuencias GeoJSON / NDJSON (user-008)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class GeoJSONSequenceTests(TestCase):
+
+    def test_export_sequences(self):
+        _bulk_photos([Photo(lat=40.0 + i, lon=-3.0) for i in range(3)])
+        for fmt, content_type, prefix in (("geojsonseq", "application/geo+json-seq", RS),
+                                          ("ndjson", "application/x-ndjson", "")):
+            with self.subTest(fmt=fmt):
+                response = self.client.get(f"/export/photos.geojson?format={fmt}")
+                self.assertEqual(response["Content-Type"], content_type)
+                self.assertIn("attachment", response["Content-Disposition"])
+                # splitlines() también corta en RS
+                lines = b"".join(response.streaming_content).decode("utf-8").rstrip("\n").split("\n")
+                self.assertEqual(len(lines), 3)
+                self.assertTrue(all(line.startswith(prefix + "{") for line in lines))
+                features = list(iter_feature_sequence(io.StringIO("\n".join(lines))))
+                self.assertEqual([f["geometry"]["coordinates"] for f in features],
+                                 [[-3.0, 40.0], [-3.0, 41.0], [-3.0, 42.0]])
+
+    def test_read_sequence(self):
+        feature = _zone_feature(_square(0, 0, 1), name="A")
+        text = f"{RS}{json.dumps(feature)}\n\n{json.dumps({'type': 'FeatureCollection', 'features': [feature]})}\n"
+        self.assertEqual(list(iter_feature_sequence(io.StringIO(text))), [feature, feature])
+        with self.assertRaises(ValueError):
+            list(iter_feature_sequence(io.StringIO('{"type": "Feature"\n')))
+
+    def test_import_ndjson_zones(self):
+        features = [_zone_feature(_square(i, 0, 1), name=f"Zona {i}", zone_type="Restringida") for i in range(3)]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "zonas.ndjson")
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.writelines(json.dumps(f) + "\n" for f in features)
+            call_command("import_uas_zones", "--file", path, stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(sorted(Zone.objects.values_list("name", flat=True)), ["Zona 0", "Zona 1", "Zona 2"])
+        self.assertEqual(set(Zone.objects.values_list("zone_type", flat=True)), {"Restringida"})
+
+
+# -----------------------
+# Miniaturas y derivados WebP (user-009)
+# -----------------------
+
+def _image_upload(name, size=(1200, 800), color=(200, 40, 40)):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "JPEG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/jpeg")
+
+
+class PhotoDerivativesTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_generated_on_save_and_replaced_with_image(self):
+        from PIL import Image
+
+        photo = Photo.objects.create(image=_image_upload("a.jpg"), lat=40.0, lon=-3.0)
+        self.assertEqual(set(photo.derivatives), {"thumb_jpg", "thumb_webp", "popup_jpg", "popup_webp"})
+        storage = photo.image.storage
+        with storage.open(photo.derivatives["thumb_webp"]) as fh, Image.open(fh) as img:
+            self.assertEqual((img.format, img.size), ("WEBP", (320, 213)))
+        with storage.open(photo.derivatives["popup_jpg"]) as fh, Image.open(fh) as img:
+            self.assertEqual(img.size, (640, 427))
+        self.assertTrue(photo.thumbnail_url.endswith("_thumb.jpg"))
+        self.assertEqual(Photo.objects.get(pk=photo.pk).derivatives, photo.derivatives)
+
+        old = list(photo.derivatives.values())
+        photo.image = _image_upload("b.jpg", color=(10, 10, 200))
+        photo.save()
+        self.assertTrue(set(photo.derivatives.values()).isdisjoint(old))
+        self.assertFalse(any(storage.exists(name) for name in old))
+
+        response = self.client.get(f"/api/photos/{photo.pk}/")
+        self.assertTrue(response.json()["thumbnail"].endswith(photo.derivatives["thumb_jpg"]))
+
+    def test_command_fills_missing_derivatives(self):
+        photo = Photo.objects.create(image=_image_upload("c.jpg"), lat=40.0, lon=-3.0)
+        Photo.objects.filter(pk=photo.pk).update(derivatives={}, derivatives_source="")
+        # Sin derivados se sirve la imagen original
+        self.assertEqual(Photo.objects.get(pk=photo.pk).thumbnail_url, photo.image.url)
+
+        out = io.StringIO()
+        call_command("generate_photo_derivatives", stdout=out)
+        self.assertIn("Derivados generados para 1 fotos (fallidas: 0)", out.getvalue())
+        self.assertEqual(Photo.objects.get(pk=photo.pk).derivatives, photo.derivatives)
+
+
+# -----------------------
+# Lectura rápida de EXIF (user-010)
+# -----------------------
+
+class ExifParserTests(SimpleTestCase):
+
+    def _sample_images(self):
+        pattern = os.path.join(settings.BASE_DIR, "Fotos_pruebas", "*.jpg")
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            self.skipTest("No hay fotos de prueba en Fotos_pruebas/")
+        return paths
+
+    def test_header_parser_matches_pillow(self):
+        with_gps = 0
+        for path in self._sample_images():
+            with self.subTest(path=os.path.basename(path)):
+                with open(path, "rb") as fh:
+                    fast = extract_exif_metadata(fh)
+                    fh.seek(0)
+                    parsed = _read_pillow(fh)
+                reference = _build_metadata(*parsed) if parsed else None
+                self.assertEqual(fast, reference)
+                if fast and fast["lat"] is not None:
+                    with_gps += 1
+        self.assertGreater(with_gps, 0)
+
+    def test_non_jpeg_falls_back_to_pillow(self):
+        self.assertIsNone(extract_exif_metadata(io.BytesIO(b"no es una imagen")))
+
+
+# -----------------------
+# Importación de fotos en paralelo (user-011)
+# -----------------------
+
+class ImportPhotosTests(TestCase):
+
+    def setUp(self):
+        samples = sorted(glob.glob(os.path.join(settings.BASE_DIR, "Fotos_pruebas", "dron0*.jpg")))[:3]
+        if len(samples) < 3:
+            self.skipTest("No hay fotos de prueba en Fotos_pruebas/")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = os.path.join(tmp.name, "origen")
+        self.media = os.path.join(tmp.name, "media")
+        os.makedirs(os.path.join(self.source, "sub"))
+        for i, sample in enumerate(samples):
+            shutil.copy(sample, os.path.join(self.source, "sub" if i else "", f"foto{i}.jpg"))
+        with open(os.path.join(self.source, "notas.txt"), "w") as fh:
+            fh.write("no es una imagen")
+
+    def _import(self, *args):
+        out = io.StringIO()
+        with override_settings(MEDIA_ROOT=self.media):
+            call_command("import_photos", self.source, "--workers", "2", *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_parallel_import_and_resume(self):
+        flight = Flight.objects.create(name="Vuelo")
+        out = self._import("--flight", str(flight.pk))
+        self.assertIn("3 fotos importadas, 0 ya existían", out)
+
+        photos = list(Photo.objects.order_by("image"))
+        self.assertEqual(len(photos), 3)
+        for photo in photos:
+            self.assertEqual(photo.flight_id, flight.pk)
+            self.assertTrue(photo.geohash)
+            self.assertTrue(os.path.exists(os.path.join(self.media, photo.image.name)))
+
+        # Reanudar: los mismos ficheros no se duplican
+        self.assertIn("0 fotos importadas, 3 ya existían", self._import())
+        self.assertEqual(Photo.objects.count(), 3)
+
+    def test_dry_run_writes_nothing(self):
+        self.assertIn("3 fotos importables", self._import("--dry-run"))
+        self.assertEqual(Photo.objects.count(), 0)
+        self.assertFalse(os.path.exists(self.media))
+
+
+# -----------------------
+# Importación de zonas UAS (user-012)
+# -----------------------
+
+class FeatureCollectionReaderTests(SimpleTestCase):
+
+    def _collection(self):
+        features = [
+            {"type": "Feature", "id": i,
+             "properties": {"name": f"Zona \"{i}\" ñ", "value": i * 1.25, "tags": [1, None, True]},
+             "geometry": {"type": "Point", "coordinates": [-3.70379 + i, 40.41678 - i]}}
+            for i in range(25)
+        ]
+        text = json.dumps({
+            "type": "FeatureCollection",
+            "name": "pruebas",
+            "crs": {"type": "name", "properties": {"name": "EPSG:4326"}},
+            "features": features,
+            "bbox": [0, 0, 1, 1],
+        }, ensure_ascii=False, indent=1)
+        return text, features
+
+    def test_features_survive_any_chunk_boundary(self):
+        text, features = self._collection()
+        for chunk_size in (1, 2, 3, 5, 7, 64, 4096):
+            with self.subTest(chunk_size=chunk_size):
+                got = list(iter_feature_collection(io.StringIO(text), chunk_size=chunk_size))
+                self.assertEqual(got, features)
+
+    def test_round_trip_with_chunked_writer(self):
+        _text, features = self._collection()
+        written = b"".join(feature_collection_chunks(iter(features), chunk_size=100)).decode("utf-8")
+        self.assertEqual(list(iter_feature_collection(io.StringIO(written), chunk_size=3)), features)
+
+    def test_empty_and_invalid_collections(self):
+        self.assertEqual(list(iter_feature_collection(io.StringIO('{"type":"FeatureCollection","features":[]}'))), [])
+        with self.assertRaises(ValueError):
+            list(iter_feature_collection(io.StringIO('{"features":[{"type":"Feature"'), chunk_size=4))
+
+
+
+
+def _zone_features(count, start=0, **extra):
+    return [
+        {"type": "Feature", "id": f"Z{i}",
+         "properties": {"name": f"Zona {i}", "zone_type": "Prohibida", **extra},
+         "geometry": {"type": "Polygon", "coordinates": [_square(i * 2.0, 0.0, 1.0)]}}
+        for i in range(start, start + count)
+    ]
+
+
+class _ZoneFileMixin:
+    """
+    Ficheros GeoJSON temporales y llamada a import_uas_zones.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        return path
+
+    def _collection_file(self, features, name="zonas.geojson"):
+        return self._write(name, json.dumps({"type": "FeatureCollection", "features": features}))
+
+    def _import(self, path, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_uas_zones", "--file", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+
+class ZoneImportTests(_ZoneFileMixin, TestCase):
+
+    def test_replace_import_in_batches(self):
+        self._import(self._collection_file(_zone_features(5)), "--batch-size", "2")
+        self.assertEqual(Zone.objects.count(), 5)
+        zone = Zone.objects.get(source_id="Z3")
+        self.assertEqual((zone.zone_type, zone.min_lon, zone.max_lon), ("Prohibida", 6.0, 7.0))
+        self.assertTrue(zone.simplified)
+
+        version = DataVersion.objects.get(name="zone").version
+        with CaptureQueriesContext(connection) as ctx:
+            out, _err = self._import(self._collection_file(_zone_features(3, start=10)), "--batch-size", "2")
+        self.assertIn("Zonas anteriores eliminadas: 5", out)
+        self.assertEqual(sorted(Zone.objects.values_list("source_id", flat=True)), ["Z10", "Z11", "Z12"])
+        self.assertGreater(DataVersion.objects.get(name="zone").version, version)
+
+        # Un único DELETE de la tabla, sin leer antes las zonas por id
+        deletes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('DELETE FROM "core_zone"')]
+        self.assertEqual(len(deletes), 1)
+        self.assertNotIn(" IN (", deletes[0])
+
+    def test_keep_existing_and_geojsonseq(self):
+        self._import(self._collection_file(_zone_features(2)))
+        lines = "".join(json.dumps(f) + "\n" for f in _zone_features(2, start=5))
+        self._import(self._write("zonas.ndjson", lines), "--keep-existing")
+        self.assertEqual(Zone.objects.count(), 4)
+
+    def test_invalid_file_leaves_zones_untouched(self):
+        self._import(self._collection_file(_zone_features(3)))
+        text = json.dumps({"type": "FeatureCollection", "features": _zone_features(2, start=7)})
+        path = self._write("roto.geojson", text[:-40])
+        with self.assertRaises(CommandError):
+            self._import(path)
+        self.assertEqual(sorted(Zone.objects.values_list("source_id", flat=True)), ["Z0", "Z1", "Z2"])
+
+
+# -----------------------
+# Sincronización incremental de zonas (user-013)
+# -----------------------
+
+class ZoneSyncTests(_ZoneFileMixin, TestCase):
+
+    def _sync(self, features):
+        return self._import(self._collection_file(features), "--sync")
+
+    def test_sync_applies_only_changes(self):
+        self._sync(_zone_features(4))
+        before = dict(Zone.objects.values_list("source_id", "id"))
+
+        features = _zone_features(4)
+        features[1]["properties"]["zone_type"] = "Restringida"
+        del features[3]
+        features += _zone_features(1, start=9)
+        out, _err = self._sync(features)
+
+        self.assertIn("Creadas 1, actualizadas 1, eliminadas 1, sin cambios 2.", out)
+        after = dict(Zone.objects.values_list("source_id", "id"))
+        self.assertEqual(sorted(after), ["Z0", "Z1", "Z2", "Z9"])
+        self.assertEqual(after["Z1"], before["Z1"])
+        self.assertEqual(Zone.objects.get(source_id="Z1").zone_type, "Restringida")
+
+    def test_features_without_id_use_geometry_not_name(self):
+        features = _zone_features(3)
+        for feat in features:
+            del feat["id"]
+            feat["properties"]["name"] = "Zona sin nombre propio"
+        out, err = self._sync(features)
+        self.assertIn("Creadas 3", out)
+        self.assertEqual(err, "")
+        self.assertTrue(all(sid.startswith("geom:") for sid in Zone.objects.values_list("source_id", flat=True)))
+
+        out, _err = self._sync(features)
+        self.assertIn("sin cambios 3", out)
+
+    def test_repeated_ids_are_reported(self):
+        features = _zone_features(2) + _zone_features(1)
+        features.append({"type": "Feature", "properties": {"name": "Sin geometría"}, "geometry": None})
+        out, err = self._sync(features)
+        self.assertIn("Creadas 2", out)
+        self.assertIn("Identificador repetido en el fichero: Z0", err)
+        self.assertIn("Features ignorados por errores: 2.", err)
+
+
+# -----------------------
+# Niveles simplificados de zonas con topología (user-014)
+# -----------------------
+
+def _wiggly_edge(x, steps=40, amplitude=0.001):
+    # Borde vertical en x de (x, 0) a (x, 1) con dientes menores que la tolerancia
+    return [[x + (amplitude if i % 2 else 0.0), i / steps] for i in range(steps + 1)]
+
+
+def _neighbour_zones():
+    edge = _wiggly_edge(1.0)
+    left = [[0.0, 0.0]] + edge + [[0.0, 1.0], [0.0, 0.0]]
+    right = edge[::-1] + [[2.0, 0.0], [2.0, 1.0], [1.0, 1.0]]
+    return _zone_feature(left, name="Oeste"), _zone_feature(right, name="Este")
+
+
+def _edge_points(ring, x=1.0):
+    return {tuple(p) for p in ring if abs(p[0] - x) < 0.01}
+
+
+class ZoneLODTests(TestCase):
+
+    def test_shared_edge_is_identical_in_every_level(self):
+        left, right = _neighbour_zones()
+        lods = build_zone_lods([(1, left), (2, right)])
+        for key in lods[1]:
+            with self.subTest(level=key):
+                a = lods[1][key]["geometry"]["coordinates"][0]
+                b = lods[2][key]["geometry"]["coordinates"][0]
+                self.assertEqual(_edge_points(a), _edge_points(b))
+                self.assertEqual((a[0], b[0]), (a[-1], b[-1]))
+
+        coarse = lods[1][lod_key(0.005)]["geometry"]["coordinates"][0]
+        self.assertLess(len(coarse), len(left["geometry"]["coordinates"][0]))
+        self.assertEqual(_edge_points(coarse), {(1.0, 0.0), (1.0, 1.0)})
+
+    def test_lod_for_tolerance(self):
+        self.assertIsNone(lod_for_tolerance(None))
+        self.assertIsNone(lod_for_tolerance(0.0001))
+        self.assertEqual(lod_for_tolerance(0.004), lod_key(0.001))
+        self.assertEqual(lod_for_tolerance(tolerance_for_zoom(8)), lod_key(0.005))
+
+    def test_saved_zones_and_api_zoom(self):
+        left, right = _neighbour_zones()
+        west = Zone.objects.create(name="Oeste", geometry=left)
+        east = Zone.objects.create(name="Este", geometry=right)
+
+        # Se recalculan en lotes de una zona: cada una con su vecina como contexto
+        Zone.objects.update(simplified={})
+        self.assertEqual(rebuild_zone_lods(batch_size=1), 2)
+        west.refresh_from_db()
+        east.refresh_from_db()
+        level = lod_key(0.005)
+        self.assertEqual(
+            _edge_points(west.simplified_geometry(level)["geometry"]["coordinates"][0]),
+            _edge_points(east.simplified_geometry(level)["geometry"]["coordinates"][0]),
+        )
+
+        data = self.client.get("/api/zones/?zoom=8").json()
+        zones = {z["name"]: z for z in (data["results"] if isinstance(data, dict) else data)}
+        self.assertEqual(zones["Oeste"]["geometry"], west.simplified[level])
+        data = self.client.get("/api/zones/").json()
+        zones = {z["name"]: z for z in (data["results"] if isinstance(data, dict) else data)}
+        self.assertEqual(zones["Oeste"]["geometry"], left)
+
+
+# -----------------------
+# Nivel de detalle y codificación de rutas (user-015)
+# -----------------------
+
+class PathEncodingTests(SimpleTestCase):
+
+    def test_simplify_drops_collinear_points(self):
+        line = [(0.0, 0.0), (1.0, 0.0001), (2.0, 0.0), (3.0, 1.0)]
+        self.assertEqual(simplify_dp(line, 0.01), [(0.0, 0.0), (2.0, 0.0), (3.0, 1.0)])
+        self.assertEqual(simplify_dp(line, 0), line)
+
+    def test_simplify_long_line(self):
+        # Más de 48 puntos por tramo: pasa por la rama de NumPy
+        line = [(i * 0.001, 0.0) for i in range(2000)]
+        line[1234] = (1.234, 0.5)
+        self.assertEqual(
+            simplify_dp(line, 0.01),
+            [line[0], line[1233], line[1234], line[1235], line[-1]],
+        )
+        self.assertEqual(simplify_dp(line, 1.0), [line[0], line[-1]])
+
+    def test_polyline_reference_example(self):
+        # Ejemplo de la documentación de Google (lat, lon)
+        points = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+        self.assertEqual(encode_polyline(points), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        for (lon, lat), (dlon, dlat) in zip(points, decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")):
+            self.assertAlmostEqual(lon, dlon)
+            self.assertAlmostEqual(lat, dlat)
+
+    def test_delta_round_trip(self):
+        points = [(-3.703791, 40.416775), (-3.703701, 40.416801), (-3.7, 40.42)]
+        values = encode_delta(points, 6)
+        self.assertEqual(values[:2], [-3703791, 40416775])
+        self.assertEqual(values[2:4], [90, 26])
+        for expected, got in zip(points, decode_delta(values, 6)):
+            self.assertAlmostEqual(expected[0], got[0], places=6)
+            self.assertAlmostEqual(expected[1], got[1], places=6)
+
+
+class FlightPathApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        coords = [[-3.7 + i * 1e-4, 40.4 + (i % 2) * 1e-7] for i in range(200)]
+        cls.flight = Flight.objects.create(
+            name="Vuelo", path_geojson={"type": "LineString", "coordinates": coords}
+        )
+
+    def _get(self, query):
+        response = self.client.get(f"/api/flights/{self.flight.pk}/{query}", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_zoom_simplifies_path(self):
+        data = self._get("?zoom=10")
+        self.assertEqual(len(data["path_geojson"]["coordinates"]), 2)
+        self.assertEqual(len(self._get("")["path_geojson"]["coordinates"]), 200)
+
+    def test_encoded_path(self):
+        data = self._get("?encoding=polyline&precision=6")
+        self.assertIsNone(data["path_geojson"])
+        self.assertEqual((data["path"]["encoding"], data["path"]["precision"]), ("polyline", 6))
+        [line] = data["path"]["lines"]
+        decoded = decode_polyline(line, 6)
+        self.assertEqual(len(decoded), 200)
+        self.assertAlmostEqual(decoded[-1][0], -3.7 + 199 * 1e-4, places=6)
+
+    def test_invalid_encoding_is_400(self):
+        response = self.client.get(f"/api/flights/{self.flight.pk}/?encoding=zip", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# -----------------------
+# Paginación por cursor, campos y filtros de la API (user-016)
+# -----------------------
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.make_aware(datetime.datetime(2024, 5, 1, 12, 0))
+        # Fechas repetidas y fotos sin fecha: el cursor tiene que
+        # desempatar por id y pasar de las fechas a los NULL
+        offsets = [0, None, 2, 2, None, 1, 0, None, 3, 2]
+        cls.flight = Flight.objects.create(name="Vuelo")
+        _bulk_photos([
+            Photo(
+                lat=40.0 + i * 0.01,
+                lon=-3.0,
+                flight=cls.flight if i % 2 else None,
+                taken_at=None if offset is None else base + datetime.timedelta(hours=offset),
+            )
+            for i, offset in enumerate(offsets)
+        ])
+
+    def test_cursor_walks_every_photo_once_with_nulls_last(self):
+        photos = list(Photo.objects.values_list("id", "taken_at"))
+        # Orden esperado con NULLS LAST, independiente de la BD
+        dated = sorted((p for p in photos if p[1] is not None), key=lambda p: (p[1], p[0]), reverse=True)
+        undated = sorted((p for p in photos if p[1] is None), key=lambda p: p[0], reverse=True)
+        expected_ids = [pk for pk, _taken in dated + undated]
+
+        seen = []
+        url = "/api/photos/?page_size=3"
+        pages = 0
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT="application/json")
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data["results"]), 3)
+            seen.extend(item["id"] for item in data["results"])
+            url = data["next"]
+            pages += 1
+            self.assertLess(pages, 10)
+
+        self.assertEqual(seen, expected_ids)
+        self.assertGreater(pages, 3)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get("/api/photos/?cursor=no-es-un-cursor", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fields_and_filters(self):
+        response = self.client.get(f"/api/photos/?fields=id,lat,nope&flight={self.flight.pk}",
+                                   HTTP_ACCEPT="application/json")
+        data = response.json()
+        self.assertEqual(len(data), 5)
+        self.assertTrue(all(set(item) == {"id", "lat"} for item in data))
+
+        response = self.client.get("/api/photos/?bbox=-3.1,40.015,-2.9,40.055&page_size=2&fields=id",
+                                   HTTP_ACCEPT="application/json")
+        first = response.json()
+        second = self.client.get(first["next"], HTTP_ACCEPT="application/json").json()
+        ids = [item["id"] for item in first["results"] + second["results"]]
+        expected = Photo.objects.filter(lat__gte=40.015, lat__lte=40.055).values_list("id", flat=True)
+        self.assertEqual(sorted(ids), sorted(expected))
+        self.assertIsNone(second["next"])
+
+        self.assertEqual(self.client.get("/api/photos/?flight=abc", HTTP_ACCEPT="application/json").status_code, 400)
+        flights = self.client.get("/api/flights/?fields=id,name", HTTP_ACCEPT="application/json").json()
+        self.assertEqual(flights, [{"id": self.flight.pk, "name": "Vuelo"}])
+
+
+# -----------------------
+# Respuestas condicionales con ETag / Last-Modified (user-017)
+# -----------------------
+
+class ConditionalResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Flight.objects.create(
+            name="Vuelo 1",
+            path_geojson={"type": "LineString", "coordinates": [[-3.7, 40.4], [-3.6, 40.5]]},
+        )
+
+    def _get(self, **headers):
+        return self.client.get("/api/flights/", HTTP_ACCEPT="application/json", **headers)
+
+    def test_matching_etag_returns_304(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        second = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second["ETag"], etag)
+
+    def test_etag_changes_when_data_changes(self):
+        etag = self._get()["ETag"]
+
+        Flight.objects.create(name="Vuelo 2")
+
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_etag_depends_on_query_string(self):
+        self.assertNotEqual(
+            self._get()["ETag"],
+            self.client.get("/api/flights/?ordering=name", HTTP_ACCEPT="application/json")["ETag"],
+        )
+
+    def test_export_revalidation(self):
+        first = self.client.get("/export/flights.geojson")
+        b"".join(first.streaming_content)
+        self.assertIn("Last-Modified", first)
+
+        self.assertEqual(self.client.get("/export/flights.geojson", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(
+            self.client.get("/export/flights.geojson", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304
+        )
+
+        # Las zonas no forman parte de la exportación de vuelos; las fotos sí
+        Zone.objects.create(name="Zona", geometry=_zone_feature(_square(0, 0, 1)))
+        self.assertEqual(self.client.get("/export/flights.geojson", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        Photo.objects.create(lat=40.0, lon=-3.0)
+        self.assertEqual(self.client.get("/export/flights.geojson", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+
+# -----------------------
+# Caché de respuestas (user-018)
+# -----------------------
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _get(self, url="/api/flights/"):
+        return self.client.get(url, HTTP_ACCEPT="application/json")
+
+    def test_hit_until_data_changes(self):
+        Flight.objects.create(name="Uno")
+        first = self._get()
+        self.assertEqual(first["X-Cache"], "MISS")
+        second = self._get()
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+        # Las señales cambian la versión de datos y con ella la clave
+        Flight.objects.create(name="Dos")
+        third = self._get()
+        self.assertEqual(third["X-Cache"], "MISS")
+        self.assertEqual(len(third.json()), 2)
+
+        stats = cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_query_string_is_part_of_the_key(self):
+        self.assertEqual(self._get()["X-Cache"], "MISS")
+        self.assertEqual(self._get("/api/flights/?fields=id")["X-Cache"], "MISS")
+
+    @override_settings(RESPONSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self._get()
+        self.assertNotIn("X-Cache", self._get())
+
+    def test_stats_command_needs_a_shared_cache(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            with self.assertRaises(CommandError):
+                call_command("response_cache_stats", stdout=io.StringIO())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_cache = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                      "LOCATION": tmpdir}}
+            with override_settings(CACHES=file_cache):
+                self._get()
+                self._get()
+                out = io.StringIO()
+                call_command("response_cache_stats", "--reset", stdout=out)
+                self.assertIn("Aciertos: 1  Fallos: 1", out.getvalue())
+                self.assertEqual(cache_stats()["hits"], 0)
+
+
+# -----------------------
+# Mapa de calor agregado (user-019)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PhotoHeatmapTests(TestCase):
+
+    def _heatmap(self, query):
+        response = self.client.get(f"/api/photos/heatmap/?{query}", HTTP_ACCEPT="application/json")
+        return response.status_code, response.json()
+
+    def test_density_cells(self):
+        flight = Flight.objects.create(name="Vuelo")
+        _bulk_photos(
+            [Photo(lat=40.0001 + i * 1e-4, lon=-3.0001, flight=flight) for i in range(3)]
+            + [Photo(lat=40.5, lon=-3.5), Photo(lat=10.0, lon=10.0)]
+        )
+
+        status, data = self._heatmap("zoom=10&bbox=-4,39,-2,41")
+        self.assertEqual(status, 200)
+        self.assertEqual((data["max"], data["total"]), (3, 4))
+        self.assertAlmostEqual(data["cell_size"], 360.0 / 2 ** 10 * 4 / 256)
+        by_count = {count: (lat, lon) for lat, lon, count in data["cells"]}
+        self.assertEqual(sorted(by_count), [1, 3])
+        for count, (lat, lon) in ((3, (40.0002, -3.0001)), (1, (40.5, -3.5))):
+            self.assertLessEqual(abs(by_count[count][0] - lat), data["cell_size"] / 2)
+            self.assertLessEqual(abs(by_count[count][1] - lon), data["cell_size"] / 2)
+
+        _status, data = self._heatmap(f"zoom=2&flight={flight.pk}")
+        self.assertEqual([cell[2] for cell in data["cells"]], [3])
+
+    def test_zoom_is_required(self):
+        status, data = self._heatmap("bbox=-4,39,-2,41")
+        self.assertEqual(status, 400)
+        self.assertIn("zoom", data)
+
+
+# -----------------------
+# Ruta remuestreada para animaciones (user-020)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class FlightTrackTests(TestCase):
+
+    def setUp(self):
+        # Sobre el ecuador la distancia es proporcional a la longitud;
+        # el vértice intermedio deja dos tramos de longitudes distintas
+        self.flight = Flight.objects.create(name="Vuelo", path_geojson=_line([0.0, 0.0], [0.2, 0.0], [1.0, 0.0]))
+
+    def _track(self, query="", flight=None):
+        flight_id = flight.pk if flight else self.flight.pk
+        return self.client.get(f"/api/flights/{flight_id}/track/?{query}", HTTP_ACCEPT="application/json")
+
+    def test_resample_path(self):
+        lats, lons, total = resample_path([0.0, 0.0, 0.0], [0.0, 0.2, 1.0], 6)
+        np.testing.assert_allclose(lons, [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], atol=1e-9)
+        np.testing.assert_allclose(lats, 0.0)
+        self.assertAlmostEqual(total, float(haversine_km(0, 0, 0, 1)))
+
+    def test_frames(self):
+        data = self._track("frames=6").json()
+        self.assertEqual(data["frames"], 6)
+        self.assertEqual(data["coordinates"][0], [0.0, 0.0])
+        self.assertEqual(data["coordinates"][-1], [1.0, 0.0])
+        np.testing.assert_allclose([c[0] for c in data["coordinates"]], [0.0, 0.2, 0.4, 0.6, 0.8, 1.0], atol=1e-7)
+        self.assertAlmostEqual(data["step_m"], data["distance_km"] * 1000 / 5, places=2)
+
+        # Se acota a un mínimo de 2 puntos
+        self.assertEqual(self._track("frames=1").json()["frames"], 2)
+        self.assertEqual(self._track("frames=x").status_code, 400)
+
+    def test_step_and_encoding(self):
+        data = self._track("step=20000&encoding=polyline").json()
+        # 111,19 km / 20 km -> 6 puntos
+        self.assertEqual(data["frames"], 6)
+        self.assertNotIn("coordinates", data)
+        decoded = decode_polyline(data["path"]["lines"][0], data["path"]["precision"])
+        self.assertEqual(len(decoded), 6)
+        self.assertEqual(self._track("step=0").status_code, 400)
+
+    def test_flight_without_path_is_404(self):
+        self.assertEqual(self._track(flight=Flight.objects.create(name="Sin ruta")).status_code, 404)
+
+
+# -----------------------
+# Consultas por fechas e histograma temporal (user-021)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class PhotoTimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        def at(day, hour):
+            return timezone.make_aware(datetime.datetime(2024, 5, day, hour, 0))
+
+        _bulk_photos([
+            Photo(lat=40.0, lon=-3.0, taken_at=at(1, 10)),
+            Photo(lat=40.0, lon=-3.0, taken_at=at(1, 23)),
+            Photo(lat=40.0, lon=-3.0, taken_at=at(3, 8)),
+            Photo(lat=40.0, lon=-3.0),
+        ])
+
+    def _get(self, url):
+        return self.client.get(url, HTTP_ACCEPT="application/json")
+
+    def test_daily_histogram(self):
+        data = self._get("/api/photos/timeline/?bucket=day").json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(
+            [(r["start"][:10], r["count"]) for r in data["results"]],
+            [("2024-05-01", 2), ("2024-05-03", 1)],
+        )
+        month = self._get("/api/photos/timeline/?bucket=month").json()
+        self.assertEqual([r["count"] for r in month["results"]], [3])
+        self.assertEqual(self._get("/api/photos/timeline/?bucket=year").status_code, 400)
+
+    def test_time_range_filters(self):
+        # Una fecha sola en taken_before incluye todo ese día
+        data = self._get("/api/photos/timeline/?taken_before=2024-05-01").json()
+        self.assertEqual(data["total"], 2)
+        photos = self._get("/api/photos/?taken_after=2024-05-01T12:00&taken_before=2024-05-03").json()
+        self.assertEqual(len(photos), 2)
+        self.assertEqual(self._get("/api/photos/?taken_after=ayer").status_code, 400)
+
+
+# -----------------------
+# Geohash de las fotos para consultas por rangos (user-022)
+# -----------------------
+
+class GeohashTests(TestCase):
+
+    def test_encode_and_cells(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(geohash.encode(-25.382708, -49.265506, 8), "6gkzwgjz")
+        min_lon, min_lat, max_lon, max_lat = geohash.decode_bbox("u4pruydqqvj")
+        self.assertTrue(min_lon <= 10.40744 <= max_lon and min_lat <= 57.64911 <= max_lat)
+
+        cells = geohash.cover_bbox((-3.8, 40.3, -3.6, 40.5))
+        self.assertLessEqual(len(cells), geohash.MAX_COVER_CELLS)
+        self.assertEqual(len({len(c) for c in cells}), 1)
+        self.assertIn(geohash.encode(40.4, -3.7, len(cells[0])), cells)
+        self.assertEqual(geohash.bbox_ranges((-180, -90, 180, 90)), [])
+
+    def test_within_bbox_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        lats = rng.uniform(-60, 60, 400)
+        lons = rng.uniform(-20, 20, 400)
+        _bulk_photos([Photo(lat=float(lat), lon=float(lon)) for lat, lon in zip(lats, lons)])
+
+        # Bboxes que cruzan el meridiano 0 y el ecuador (cambian los prefijos)
+        for bbox in ((-1.5, -2.0, 2.5, 3.0), (-15.0, 10.0, -5.0, 45.0), (0.1, 0.1, 0.2, 0.2)):
+            with self.subTest(bbox=bbox):
+                min_lon, min_lat, max_lon, max_lat = bbox
+                expected = Photo.objects.filter(
+                    lon__gte=min_lon, lon__lte=max_lon, lat__gte=min_lat, lat__lte=max_lat,
+                )
+                self.assertEqual(
+                    sorted(Photo.objects.within_bbox(bbox).values_list("id", flat=True)),
+                    sorted(expected.values_list("id", flat=True)),
+                )
+
+    def test_near_and_backfill(self):
+        Photo.objects.bulk_create([Photo(lat=lat, lon=-3.0) for lat in (40.0, 40.003, 40.1)])
+        # Sin geohash las consultas por bbox no las encuentran
+        self.assertFalse(Photo.objects.near(40.0, -3.0, 500).exists())
+
+        out = io.StringIO()
+        call_command("backfill_photo_geohash", stdout=out)
+        self.assertIn("Geohash actualizado en 3 fotos", out.getvalue())
+        self.assertEqual(Photo.objects.near(40.0, -3.0, 500).count(), 2)
+
+        data = self.client.get("/api/photos/nearby/?lat=40.0&lon=-3.0&radius=500",
+                               HTTP_ACCEPT="application/json").json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["results"][0]["distance_m"], 0.0)
+        self.assertAlmostEqual(data["results"][1]["distance_m"], 333.6, delta=1)
+
+
+# -----------------------
+# Benchmark con datos sintéticos (user-023)
+# -----------------------
+
+class BenchmarkStackTests(TestCase):
+
+    def test_small_run_writes_report_and_typed_zones(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report_path = os.path.join(tmpdir, "bench.json")
+            call_command(
+                "benchmark_stack", "--photos", "30", "--flights", "2", "--zones", "8",
+                "--path-points", "20", "--repeat", "1", "--only", "api_zones",
+                "--keep", "--output", report_path, stdout=io.StringIO(),
+            )
+            with open(report_path, encoding="utf-8") as fh:
+                report = json.load(fh)
+
+        names = [r["name"] for r in report["results"]]
+        self.assertIn("api_zones", names)
+        # Las zonas sintéticas llevan zone_type, como las de ENAIRE
+        self.assertEqual(Zone.objects.count(), 8)
+        self.assertEqual(Zone.objects.values("zone_type").distinct().count(), 4)
+
+
+# -----------------------
+# Instrumentación de rendimiento por petición (user-024)
+# -----------------------
+
+@override_settings(PERF_INSTRUMENTATION=True, RESPONSE_CACHE_ENABLED=False)
+class PerformanceMiddlewareTests(TestCase):
+
+    def setUp(self):
+        Flight.objects.create(name="Vuelo", path_geojson=_line([0, 0], [1, 1]))
+
+    def _record(self, logs):
+        self.assertEqual(len(logs.records), 1)
+        return logs.records[0].performance
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs("core.performance", "INFO") as logs:
+            response = self.client.get("/api/flights/", HTTP_ACCEPT="application/json")
+        timing = response["Server-Timing"]
+        for metric in ("total;dur=", "db;dur=", "view;dur=", "render;dur="):
+            self.assertIn(metric, timing)
+
+        record = self._record(logs)
+        self.assertEqual((record["path"], record["status"], record["streaming"]), ("/api/flights/", 200, False))
+        self.assertEqual(record["bytes"], len(response.content))
+        self.assertGreater(record["db_queries"], 0)
+        self.assertIn(f'desc="{record["db_queries"]} queries"', timing)
+        self.assertIsNotNone(record["render_ms"])
+
+    def test_streaming_response_is_logged_on_close(self):
+        with self.assertLogs("core.performance", "INFO") as logs:
+            response = self.client.get("/export/flights.geojson")
+            body = b"".join(response.streaming_content)
+            response.close()
+        record = self._record(logs)
+        self.assertTrue(record["streaming"])
+        self.assertEqual(record["bytes"], len(body))
+        self.assertGreater(record["db_queries"], 0)
+
+    def test_profile_sample(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with override_settings(PERF_PROFILE_PATTERN=r"^/api/flights/", PERF_PROFILE_SAMPLE_RATE=1.0,
+                                   PERF_PROFILE_DIR=tmpdir), self.assertLogs("core.performance", "INFO"):
+                self.client.get("/api/flights/", HTTP_ACCEPT="application/json")
+                self.client.get("/api/zones/", HTTP_ACCEPT="application/json")
+            profiles = os.listdir(tmpdir)
+        self.assertEqual(len(profiles), 1)
+        self.assertIn("_GET_api_flights.prof", profiles[0])
+
+    @override_settings(PERF_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.client.get("/api/flights/", HTTP_ACCEPT="application/json")
+        self.assertNotIn("Server-Timing", response)
+
+
+# -----------------------
+# Camino ASGI asíncrono para las vistas de lectura (user-025)
+# -----------------------
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class AsyncViewsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.flight = Flight.objects.create(name="Vuelo", path_geojson=_line([-3.7, 40.4], [-3.6, 40.5]))
+        _bulk_photos([Photo(lat=40.4 + i * 0.01, lon=-3.7, flight=cls.flight) for i in range(5)])
+
+    def setUp(self):
+        cache.clear()
+
+    async def _async_body(self, url):
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if not response.streaming:
+            return response, response.content
+        chunks = [chunk async for chunk in response.streaming_content]
+        return response, b"".join(chunks)
+
+    def _sync_body(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content) if response.streaming else response.content
+
+    async def test_exports_stream_asynchronously(self):
+        for url in ("/export/photos.geojson", "/export/photos.geojson?format=ndjson",
+                    "/export/flights.geojson", f"/flight/{self.flight.pk}/export/?format=geojsonseq"):
+            with self.subTest(url=url):
+                response, body = await self._async_body(url)
+                self.assertTrue(response.is_async)
+                self.assertEqual(body, await sync_to_async(self._sync_body)(url))
+
+        _response, body = await self._async_body("/export/photos.geojson")
+        self.assertEqual(len(json.loads(body)["features"]), 5)
+
+    async def test_tiles_match_sync_view(self):
+        for layer in ("photos", "flights"):
+            with self.subTest(layer=layer):
+                _response, body = await self._async_body(f"/tiles/{layer}/0/0/0.mvt")
+                self.assertIn(layer, _decode_tile(body))
+                await cache.aclear()
+                self.assertEqual(body, await sync_to_async(self._sync_body)(f"/tiles/{layer}/0/0/0.mvt"))
@@ -0,0 +1,113 @@
+# core/thumbnails.py
+
+"""
+Derivados de las fotos (miniatura de galería y tamaño popup del mapa),
+en JPEG y WebP.
+
+Se generan una sola vez tras subir o cambiar la imagen y se guardan en
+MEDIA_ROOT/photos/derivatives/ con nombres deterministas: el nombre
+incluye un hash del fichero original, así que una imagen nueva produce
+nombres nuevos y nunca se sirve un derivado antiguo desde caché.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from io import BytesIO
+from pathlib import PurePosixPath
+from typing import Dict
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# nombre -> tamaño máximo (ancho, alto) en píxeles
+DERIVATIVE_SIZES = {
+    "thumb": (320, 320),
+    "popup": (640, 640),
+}
+
+# extensión -> (formato Pillow, opciones de guardado)
+DERIVATIVE_FORMATS = {
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+}
+
+DERIVATIVES_DIR = "photos/derivatives"
+
+
+def _source_hash(field_file) -> str:
+    """
+    Hash corto del contenido del fichero original.
+    """
+    h = hashlib.sha1()
+    field_file.open("rb")
+    try:
+        field_file.seek(0)
+        for chunk in iter(lambda: field_file.read(1024 * 1024), b""):
+            h.update(chunk)
+    finally:
+        field_file.seek(0)
+    return h.hexdigest()[:12]
+
+
+def derivative_name(source_name: str, digest: str, size_key: str, ext: str) -> str:
+    """
+    Nombre determinista del derivado dentro del storage.
+    """
+    stem = PurePosixPath(source_name).stem
+    return f"{DERIVATIVES_DIR}/{stem}_{digest}_{size_key}.{ext}"
+
+
+def generate_derivatives(field_file) -> Dict[str, str]:
+    """
+    Genera todos los derivados de una imagen y devuelve un dict
+    "<tamaño>_<ext>" -> nombre en el storage (p. ej. "thumb_webp").
+    Si un derivado ya existe con ese nombre no se vuelve a generar.
+    """
+    storage = field_file.storage
+    digest = _source_hash(field_file)
+
+    names = {
+        f"{size_key}_{ext}": derivative_name(field_file.name, digest, size_key, ext)
+        for size_key in DERIVATIVE_SIZES
+        for ext in DERIVATIVE_FORMATS
+    }
+    if all(storage.exists(name) for name in names.values()):
+        return names
+
+    field_file.open("rb")
+    try:
+        field_file.seek(0)
+        with Image.open(field_file) as img:
+            # Respetar la orientación EXIF y trabajar siempre en RGB
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+            for size_key, max_size in DERIVATIVE_SIZES.items():
+                resized = img.copy()
+                resized.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+                for ext, (pil_format, save_opts) in DERIVATIVE_FORMATS.items():
+                    name = names[f"{size_key}_{ext}"]
+                    if storage.exists(name):
+                        continue
+                    buf = BytesIO()
+                    resized.save(buf, pil_format, **save_opts)
+                    storage.save(name, ContentFile(buf.getvalue()))
+    finally:
+        field_file.seek(0)
+
+    return names
+
+
+def delete_derivatives(storage, names) -> None:
+    """
+    Borra del storage los derivados indicados (ignora los que no existan).
+    """
+    for name in names:
+        try:
+            if storage.exists(name):
+                storage.delete(name)
+        except Exception:
+            pass
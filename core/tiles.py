@@ -0,0 +1,260 @@
+# core/tiles.py
+
+"""
+Construcción de teselas vectoriales (MVT) a partir de los modelos.
+
+Cada capa (photos, flights, zones) se genera solo con los objetos
+que caen dentro de la tesela pedida, y el resultado binario se
+guarda en la caché de Django. La clave incluye la versión de datos del
+modelo (core.versioning), así que cualquier cambio (API, admin,
+comandos de carga) deja de servir las teselas anteriores.
+"""
+
+from __future__ import annotations
+
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Min
+from django.db.models.functions import Floor, Ln, Radians, Sin
+
+from .geometry import extract_lines, extract_polygons
+from .models import DataVersion, Flight, Photo, Zone
+from .zone_simplify import lod_for_tolerance
+from .mvt import BUFFER, EXTENT, TileLayer, encode_tile, tile_bounds, tile_range
+
+TILE_LAYERS = ("photos", "flights", "zones")
+
+# Nombre en DataVersion del modelo del que sale cada capa
+LAYER_DATA_VERSIONS = {
+    "photos": "photo",
+    "flights": "flight",
+    "zones": "zone",
+}
+
+# Zoom a partir del cual se envían todas las fotos sin agrupar
+PHOTO_FULL_DETAIL_ZOOM = 14
+
+MAX_TILE_ZOOM = 22
+
+# Por encima de este nº de teselas afectadas en un zoom no se borran
+# una a una: se invalida ese nivel entero cambiando su generación
+MAX_INVALIDATED_TILES = 5000
+
+
+def _cache_timeout() -> int:
+    return getattr(settings, "MVT_CACHE_TIMEOUT", 300)
+
+
+def _build_photos(layer: TileLayer, bounds, flight=None):
+    qs = Photo.objects.within_bbox(bounds)
+    if flight is not None:
+        qs = qs.filter(flight_id=flight)
+    qs = (
+        qs
+        .order_by("-taken_at", "-id")
+        .values_list("id", "lon", "lat", "flight_id", "taken_at")
+    )
+
+    if layer.z >= PHOTO_FULL_DETAIL_ZOOM:
+        for pk, lon, lat, flight_id, taken_at in qs.iterator():
+            layer.add_points(
+                [(lon, lat)],
+                {"id": pk, "flight_id": flight_id,
+                 "taken_at": taken_at.isoformat() if taken_at else None},
+                feature_id=pk,
+            )
+        return
+
+    # A zoom bajo agrupamos las fotos por celdas de ~1 píxel de pantalla
+    # (16 unidades de tesela) y enviamos una sola por celda con su cuenta.
+    # La agregación se hace en SQL (celda en Web Mercator, igual que
+    # lonlat_to_tile): el trabajo en Python depende del nº de celdas, no
+    # del de fotos.
+    cell = EXTENT // 256
+    scale = (2 ** layer.z) * (layer.extent // cell)
+    sin_lat = Sin(Radians("lat"))
+    cells = (
+        qs.order_by()
+        .annotate(
+            cell_x=Floor((F("lon") + 180.0) / 360.0 * scale),
+            cell_y=Floor((0.5 - Ln((1.0 + sin_lat) / (1.0 - sin_lat)) / (4 * math.pi)) * scale),
+        )
+        .values("cell_x", "cell_y")
+        .annotate(rep_id=Min("id"), cell_lon=Avg("lon"), cell_lat=Avg("lat"), count=Count("id"))
+        .order_by("rep_id")
+        .values_list("rep_id", "cell_lon", "cell_lat", "count")
+    )
+
+    for pk, lon, lat, count in cells:
+        layer.add_points([(lon, lat)], {"id": pk, "count": count}, feature_id=pk)
+
+
+def _build_flights(layer: TileLayer, bounds, flight=None):
+    qs = Flight.objects.intersecting_bbox(bounds)
+    if flight is not None:
+        qs = qs.filter(pk=flight)
+    qs = (
+        qs
+        .values_list("id", "name", "drone_model", "date", "path_geojson")
+    )
+    for pk, name, drone_model, date, path in qs.iterator():
+        layer.add_lines(
+            extract_lines(path),
+            {"id": pk, "name": name, "drone_model": drone_model,
+             "date": date.isoformat() if date else None},
+            feature_id=pk,
+        )
+
+
+def _build_zones(layer: TileLayer, bounds, flight=None):
+    # A zoom bajo se parte de la versión simplificada de la zona (si la
+    # tolerancia de la tesela lo permite), que tiene muchos menos vértices
+    tolerance_deg = 360.0 / (2 ** layer.z) / layer.extent * layer.tolerance
+    level = lod_for_tolerance(tolerance_deg)
+
+    qs = Zone.objects.intersecting_bbox(bounds)
+    geometry_field = f"simplified__{level}" if level else "geometry"
+    rows = qs.values_list("id", "name", "zone_type", geometry_field)
+
+    missing = []
+    for pk, name, zone_type, geometry in rows.iterator():
+        if not geometry:
+            missing.append(pk)
+            continue
+        layer.add_polygons(
+            extract_polygons(geometry),
+            {"id": pk, "name": name, "zone_type": zone_type},
+            feature_id=pk,
+        )
+
+    # Zonas aún sin versión simplificada: geometría original
+    if missing:
+        rows = Zone.objects.filter(pk__in=missing).values_list("id", "name", "zone_type", "geometry")
+        for pk, name, zone_type, geometry in rows.iterator():
+            layer.add_polygons(
+                extract_polygons(geometry),
+                {"id": pk, "name": name, "zone_type": zone_type},
+                feature_id=pk,
+            )
+
+
+_BUILDERS = {
+    "photos": _build_photos,
+    "flights": _build_flights,
+    "zones": _build_zones,
+}
+
+
+def build_tile(layer_name: str, z: int, x: int, y: int, flight=None) -> bytes:
+    """
+    Genera la tesela MVT (bytes) de una capa, sin pasar por la caché.
+    Con flight, las capas de fotos y vuelos se limitan a ese vuelo.
+    """
+    # A zoom bajo toleramos más simplificación (en unidades de tesela)
+    tolerance = 4.0 if z < 10 else 1.0
+    layer = TileLayer(layer_name, z, x, y, tolerance=tolerance)
+    bounds = tile_bounds(z, x, y, buffer=BUFFER)
+    _BUILDERS[layer_name](layer, bounds, flight)
+    return encode_tile([layer])
+
+
+def _generation_key(layer_name: str, z: int) -> str:
+    return f"mvt:{layer_name}:{z}:generation"
+
+
+def _generation(layer_name: str, z: int) -> int:
+    return cache.get(_generation_key(layer_name, z)) or 0
+
+
+def _bump_generation(layer_name: str, z: int) -> None:
+    key = _generation_key(layer_name, z)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _data_version_rows(layer_name: str):
+    return DataVersion.objects.filter(name=LAYER_DATA_VERSIONS[layer_name]).values_list("version", flat=True)
+
+
+def _data_version(layer_name: str) -> int:
+    return _data_version_rows(layer_name).first() or 0
+
+
+def tile_cache_key(layer_name: str, z: int, x: int, y: int, generation=None, version=None,
+                   flight=None) -> str:
+    if generation is None:
+        generation = _generation(layer_name, z)
+    if version is None:
+        version = _data_version(layer_name)
+    key = f"mvt:{layer_name}:{z}:{generation}:{version}:{x}:{y}"
+    if flight is not None:
+        key += f":flight={flight}"
+    return key
+
+
+def invalidate_layer(layer_name: str) -> None:
+    """
+    Invalida todas las teselas cacheadas de una capa. Las claves incluyen
+    una generación por nivel de zoom: al incrementarla dejan de usarse.
+    """
+    for z in range(MAX_TILE_ZOOM + 1):
+        _bump_generation(layer_name, z)
+
+
+def invalidate_tiles(layer_name: str, bboxes) -> None:
+    """
+    Invalida solo las teselas de la capa que tocan alguna de las bbox.
+    En cada zoom se borran las claves una a una si son pocas; si no
+    (zooms altos), se cambia la generación de ese nivel.
+    """
+    bboxes = [b for b in bboxes if b is not None and None not in b]
+    if not bboxes:
+        return
+
+    version = _data_version(layer_name)
+    for z in range(MAX_TILE_ZOOM + 1):
+        ranges = [tile_range(bbox, z) for bbox in bboxes]
+        total = sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in ranges)
+        if total > MAX_INVALIDATED_TILES:
+            _bump_generation(layer_name, z)
+            continue
+
+        generation = _generation(layer_name, z)
+        cache.delete_many(list({
+            tile_cache_key(layer_name, z, x, y, generation, version)
+            for x0, y0, x1, y1 in ranges
+            for x in range(x0, x1 + 1)
+            for y in range(y0, y1 + 1)
+        }))
+
+
+def get_tile(layer_name: str, z: int, x: int, y: int, flight=None) -> bytes:
+    """
+    Devuelve la tesela desde la caché, generándola si no existe.
+    """
+    key = tile_cache_key(layer_name, z, x, y, flight=flight)
+    data = cache.get(key)
+    if data is None:
+        data = build_tile(layer_name, z, x, y, flight)
+        cache.set(key, data, _cache_timeout())
+    return data
+
+
+async def aget_tile(layer_name: str, z: int, x: int, y: int, flight=None) -> bytes:
+    """
+    get_tile para vistas async: la caché se consulta sin bloquear y solo
+    la generación de la tesela (consultas + codificación) va a un hilo.
+    """
+    generation = await cache.aget(_generation_key(layer_name, z)) or 0
+    version = await _data_version_rows(layer_name).afirst() or 0
+    key = tile_cache_key(layer_name, z, x, y, generation, version, flight)
+    data = await cache.aget(key)
+    if data is None:
+        data = await sync_to_async(build_tile)(layer_name, z, x, y, flight)
+        await cache.aset(key, data, _cache_timeout())
+    return data
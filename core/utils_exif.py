@@ -2,8 +2,40 @@
 
 from __future__ import annotations
 
+import struct
+from datetime import datetime, timedelta, timezone
+from os import PathLike
 from typing import Optional, Dict, Any
-from PIL import Image, ExifTags
+
+from PIL import Image
+
+# Bytes máximos que se leen de la cabecera de un JPEG buscando el EXIF.
+# El segmento APP1 mide como mucho 64 KB y suele ir justo tras el SOI.
+MAX_HEADER_BYTES = 256 * 1024
+
+# Tags TIFF/EXIF que usamos
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+GPS_ALTITUDE_REF = 5
+GPS_ALTITUDE = 6
+GPS_TIMESTAMP = 7
+GPS_TRACK = 15
+GPS_IMG_DIRECTION = 17
+GPS_DATESTAMP = 29
+
+# Tamaño en bytes de cada tipo TIFF
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+# Marca para "no es un JPEG": en ese caso se recurre a Pillow
+_NOT_JPEG = object()
 
 
 def _to_float(value: Any) -> float:
@@ -47,78 +79,324 @@ def _dms_to_dd(dms, ref: str) -> float:
     return value
 
 
-def extract_gps_from_image(image_file) -> Optional[Dict[str, float]]:
+# ---------- Lectura directa de la cabecera JPEG ----------
+
+def _read_jpeg_exif(f) -> Any:
     """
-    Extrae lat/lon en decimal a partir de los metadatos EXIF GPS
-    de una imagen subida (Django) o de un fichero normal.
+    Recorre los marcadores del JPEG hasta encontrar el segmento APP1 "Exif"
+    y devuelve los bytes TIFF que contiene. Nunca lee datos de imagen:
+    se detiene en el marcador SOS o al superar MAX_HEADER_BYTES.
 
-    Devuelve:
-      {"lat": <float>, "lon": <float>}  si tiene GPS válido
-      None                              si no encuentra datos útiles
+    Devuelve _NOT_JPEG si el fichero no es un JPEG, o None si es un JPEG
+    sin EXIF.
     """
-    # Si viene de Django (ImageFieldFile, InMemoryUploadedFile, etc.)
-    f = getattr(image_file, "file", image_file)
+    if f.read(2) != b"\xff\xd8":
+        return _NOT_JPEG
 
-    try:
-        f.seek(0)
-    except Exception:
-        pass
+    consumed = 2
+    while consumed < MAX_HEADER_BYTES:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            return None  # cabecera corrupta
+
+        # Puede haber bytes 0xFF de relleno antes del marcador
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        consumed += 2
+
+        if code in (0xD9, 0xDA):        # EOI / SOS: ya no hay metadatos
+            return None
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue                    # marcadores sin longitud
+
+        raw_len = f.read(2)
+        if len(raw_len) < 2:
+            return None
+        length = struct.unpack(">H", raw_len)[0] - 2
+        consumed += 2 + length
+
+        if code == 0xE1:
+            data = f.read(length)
+            if data.startswith(b"Exif\x00\x00"):
+                return data[6:]
+            continue                    # APP1 de XMP u otro: seguimos
+
+        try:
+            f.seek(length, 1)
+        except Exception:
+            f.read(length)
 
+    return None
+
+
+class _TiffReader:
+    """
+    Lector mínimo de estructuras TIFF (IFDs) sobre un bloque de bytes.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        order = data[:2]
+        if order == b"II":
+            self.endian = "<"
+        elif order == b"MM":
+            self.endian = ">"
+        else:
+            raise ValueError("Cabecera TIFF no válida")
+        if self._unpack("H", 2) != 42:
+            raise ValueError("Cabecera TIFF no válida")
+        self.first_ifd = self._unpack("I", 4)
+
+    def _unpack(self, fmt: str, offset: int):
+        return struct.unpack_from(self.endian + fmt, self.data, offset)[0]
+
+    def ifd(self, offset: int) -> Dict[int, Any]:
+        """
+        Lee un IFD y devuelve {tag: valor} ya decodificado.
+        """
+        values: Dict[int, Any] = {}
+        if not offset or offset + 2 > len(self.data):
+            return values
+
+        count = self._unpack("H", offset)
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            if entry + 12 > len(self.data):
+                break
+            tag = self._unpack("H", entry)
+            typ = self._unpack("H", entry + 2)
+            n = self._unpack("I", entry + 4)
+            size = _TIFF_TYPE_SIZES.get(typ)
+            if size is None:
+                continue
+            total = size * n
+            pos = entry + 8 if total <= 4 else self._unpack("I", entry + 8)
+            if pos + total > len(self.data):
+                continue
+            try:
+                values[tag] = self._decode(typ, n, pos)
+            except struct.error:
+                continue
+        return values
+
+    def _decode(self, typ: int, n: int, pos: int):
+        e = self.endian
+        if typ == 2:        # ASCII
+            return self.data[pos:pos + n].split(b"\x00", 1)[0].decode("latin-1")
+        if typ in (1, 7):   # BYTE / UNDEFINED
+            return self.data[pos:pos + n]
+        if typ in (5, 10):  # RATIONAL / SRATIONAL
+            fmt = "I" if typ == 5 else "i"
+            nums = struct.unpack_from(f"{e}{2 * n}{fmt}", self.data, pos)
+            vals = tuple(
+                (nums[i] / nums[i + 1]) if nums[i + 1] else 0.0
+                for i in range(0, 2 * n, 2)
+            )
+        else:
+            fmt = {3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 11: "f", 12: "d"}[typ]
+            vals = struct.unpack_from(f"{e}{n}{fmt}", self.data, pos)
+        return vals[0] if n == 1 else vals
+
+
+def _parse_tiff(data: bytes):
+    """
+    Devuelve (ifd0, exif_ifd, gps_ifd) a partir de los bytes TIFF del EXIF.
+    """
+    tiff = _TiffReader(data)
+    ifd0 = tiff.ifd(tiff.first_ifd)
+    exif_ifd = tiff.ifd(ifd0.get(TAG_EXIF_IFD)) if isinstance(ifd0.get(TAG_EXIF_IFD), int) else {}
+    gps_ifd = tiff.ifd(ifd0.get(TAG_GPS_IFD)) if isinstance(ifd0.get(TAG_GPS_IFD), int) else {}
+    return ifd0, exif_ifd, gps_ifd
+
+
+def _read_pillow(f):
+    """
+    Alternativa con Pillow para formatos que no son JPEG (PNG, TIFF, WebP...).
+    """
     try:
         img = Image.open(f)
+        exif = img.getexif()
     except Exception:
         # No se puede abrir la imagen
         return None
 
-    exif = None
-    # Pillow clásico
+    if not exif:
+        return None
+
     try:
-        exif = img._getexif()
+        exif_ifd = dict(exif.get_ifd(TAG_EXIF_IFD))
     except Exception:
-        pass
+        exif_ifd = {}
+    try:
+        gps_ifd = dict(exif.get_ifd(TAG_GPS_IFD))
+    except Exception:
+        gps_ifd = {}
+    return dict(exif), exif_ifd, gps_ifd
 
-    # Pillow moderno
-    if not exif:
+
+# ---------- Interpretación de los tags ----------
+
+def _text(value) -> str:
+    if isinstance(value, bytes):
+        value = value.decode("latin-1", "ignore")
+    return str(value or "").strip("\x00 ").upper()
+
+
+def _parse_exif_datetime(value, offset=None) -> Optional[datetime]:
+    """
+    "YYYY:MM:DD HH:MM:SS" (+ offset "+01:00" opcional) -> datetime.
+    Sin offset se devuelve un datetime naive (hora local de la cámara).
+    """
+    try:
+        dt = datetime.strptime(str(value).strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+    if offset:
         try:
-            exif = img.getexif()
-        except Exception:
+            sign = -1 if str(offset)[0] == "-" else 1
+            hours, minutes = str(offset).strip("+-\x00 ").split(":")
+            delta = timedelta(hours=int(hours), minutes=int(minutes))
+            dt = dt.replace(tzinfo=timezone(sign * delta))
+        except (ValueError, IndexError):
             pass
+    return dt
 
-    if not exif:
+
+def _gps_datetime(gps_ifd) -> Optional[datetime]:
+    """
+    Fecha/hora UTC a partir de GPSDateStamp + GPSTimeStamp.
+    """
+    date = gps_ifd.get(GPS_DATESTAMP)
+    time = gps_ifd.get(GPS_TIMESTAMP)
+    if not date or not time or len(time) != 3:
+        return None
+    try:
+        day = datetime.strptime(str(date).strip("\x00 "), "%Y:%m:%d")
+        seconds = _to_float(time[0]) * 3600 + _to_float(time[1]) * 60 + _to_float(time[2])
+    except (TypeError, ValueError):
         return None
+    return (day + timedelta(seconds=seconds)).replace(tzinfo=timezone.utc)
 
-    # Buscar tag GPSInfo
-    gps_tag_id = None
-    for tag_id, tag_name in ExifTags.TAGS.items():
-        if tag_name == "GPSInfo":
-            gps_tag_id = tag_id
-            break
 
-    if gps_tag_id is None:
-        return None
+def _build_metadata(ifd0, exif_ifd, gps_ifd) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {
+        "lat": None,
+        "lon": None,
+        "altitude": None,
+        "taken_at": None,
+        "heading": None,
+    }
 
-    gps_ifd = exif.get(gps_tag_id)
-    if not gps_ifd:
-        return None
+    lat_dms = gps_ifd.get(GPS_LATITUDE)
+    lat_ref = _text(gps_ifd.get(GPS_LATITUDE_REF))
+    lon_dms = gps_ifd.get(GPS_LONGITUDE)
+    lon_ref = _text(gps_ifd.get(GPS_LONGITUDE_REF))
 
-    # Traducir claves de GPS
-    gps_data: Dict[str, Any] = {}
-    for key, val in gps_ifd.items():
-        name = ExifTags.GPSTAGS.get(key, key)
-        gps_data[name] = val
+    if lat_dms and lat_ref and lon_dms and lon_ref:
+        try:
+            meta["lat"] = _dms_to_dd(lat_dms, lat_ref)
+            meta["lon"] = _dms_to_dd(lon_dms, lon_ref)
+        except Exception:
+            meta["lat"] = meta["lon"] = None
 
-    lat_dms = gps_data.get("GPSLatitude")
-    lat_ref = gps_data.get("GPSLatitudeRef")
-    lon_dms = gps_data.get("GPSLongitude")
-    lon_ref = gps_data.get("GPSLongitudeRef")
+    altitude = gps_ifd.get(GPS_ALTITUDE)
+    if altitude is not None:
+        try:
+            meta["altitude"] = _to_float(altitude)
+            ref = gps_ifd.get(GPS_ALTITUDE_REF)
+            if ref in (1, b"\x01"):
+                meta["altitude"] = -meta["altitude"]
+        except Exception:
+            pass
 
-    if not (lat_dms and lat_ref and lon_dms and lon_ref):
-        return None
+    # Rumbo: dirección de la imagen y, si no hay, dirección de movimiento
+    for tag in (GPS_IMG_DIRECTION, GPS_TRACK):
+        if gps_ifd.get(tag) is not None:
+            try:
+                meta["heading"] = _to_float(gps_ifd[tag]) % 360.0
+                break
+            except Exception:
+                pass
+
+    # Fecha: DateTimeOriginal con zona > hora GPS (UTC) > DateTimeOriginal > DateTime
+    original = exif_ifd.get(TAG_DATETIME_ORIGINAL)
+    offset = exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL)
+    taken_at = _parse_exif_datetime(original, offset) if original and offset else None
+    if taken_at is None:
+        taken_at = _gps_datetime(gps_ifd)
+    if taken_at is None and original:
+        taken_at = _parse_exif_datetime(original)
+    if taken_at is None and ifd0.get(TAG_DATETIME):
+        taken_at = _parse_exif_datetime(ifd0.get(TAG_DATETIME))
+    meta["taken_at"] = taken_at
+
+    return meta
+
+
+def extract_exif_metadata(image_file) -> Optional[Dict[str, Any]]:
+    """
+    Lee los metadatos EXIF útiles de una imagen sin decodificar los píxeles.
+
+    Acepta una subida de Django, un fichero abierto en binario o una ruta.
+    En JPEG solo se leen los bytes de cabecera (segmento APP1); para otros
+    formatos se recurre a Pillow.
+
+    Devuelve un dict con lat, lon, altitude (m), taken_at (datetime) y
+    heading (grados), con None en lo que no exista; o None si la imagen
+    no tiene EXIF legible.
+    """
+    if isinstance(image_file, (str, PathLike)):
+        with open(image_file, "rb") as fh:
+            return extract_exif_metadata(fh)
+
+    # Si viene de Django (ImageFieldFile, InMemoryUploadedFile, etc.)
+    f = getattr(image_file, "file", image_file)
 
     try:
-        lat = _dms_to_dd(lat_dms, lat_ref)
-        lon = _dms_to_dd(lon_dms, lon_ref)
+        f.seek(0)
     except Exception:
+        pass
+
+    try:
+        tiff = _read_jpeg_exif(f)
+        if tiff is _NOT_JPEG:
+            f.seek(0)
+            parsed = _read_pillow(f)
+        elif tiff is None:
+            parsed = None
+        else:
+            try:
+                parsed = _parse_tiff(tiff)
+            except (ValueError, struct.error):
+                parsed = None
+    finally:
+        try:
+            f.seek(0)
+        except Exception:
+            pass
+
+    if not parsed:
         return None
+    return _build_metadata(*parsed)
 
-    return {"lat": lat, "lon": lon}
+
+def extract_gps_from_image(image_file) -> Optional[Dict[str, float]]:
+    """
+    Extrae lat/lon en decimal a partir de los metadatos EXIF GPS
+    de una imagen subida (Django) o de un fichero normal.
+
+    Devuelve:
+      {"lat": <float>, "lon": <float>}  si tiene GPS válido
+      None                              si no encuentra datos útiles
+    """
+    meta = extract_exif_metadata(image_file)
+    if not meta or meta["lat"] is None or meta["lon"] is None:
+        return None
+    return {"lat": meta["lat"], "lon": meta["lon"]}
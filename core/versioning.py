@@ -0,0 +1,163 @@
+# core/versioning.py
+
+"""
+Versionado de datos para respuestas condicionales (ETag / Last-Modified).
+
+Cada modelo tiene una fila en DataVersion con un contador que se
+incrementa en cada cambio. Las vistas de lectura calculan el ETag a
+partir de esos contadores (una consulta pequeña), así que si el cliente
+ya tiene la versión actual se responde 304 sin consultar ni serializar
+los datos.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+# Nombres que se están acumulando dentro de deferred_bumps()
+_deferred: ContextVar = ContextVar("deferred_bumps", default=None)
+
+
+def bump(*names: str) -> None:
+    """
+    Incrementa la versión de los modelos indicados ("flight", "photo"...).
+    """
+    pending = _deferred.get()
+    if pending is not None:
+        pending.update(names)
+        return
+
+    now = timezone.now()
+    for name in names:
+        updated = DataVersion.objects.filter(name=name).update(
+            version=F("version") + 1, updated_at=now
+        )
+        if not updated:
+            DataVersion.objects.get_or_create(
+                name=name, defaults={"version": 1, "updated_at": now}
+            )
+
+
+@contextmanager
+def deferred_bumps():
+    """
+    Agrupa los incrementos de versión: dentro del bloque no se escribe
+    nada y al salir se hace un único incremento por modelo. Útil en
+    cargas masivas, donde las señales saltarían una vez por fila.
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+
+    pending = set()
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        if pending:
+            bump(*sorted(pending))
+
+
+def _version_cache(request):
+    cache = getattr(request, "_data_versions", None)
+    if cache is None:
+        cache = {}
+        request._data_versions = cache
+    return cache
+
+
+def _version_rows(key):
+    return DataVersion.objects.filter(name__in=key).values_list("name", "version", "updated_at")
+
+
+def _versions(request, names):
+    """
+    {name: (version, updated_at)}; se guarda en la petición para que
+    ETag y Last-Modified usen una sola consulta.
+    """
+    cache = _version_cache(request)
+    key = tuple(sorted(names))
+    if key not in cache:
+        cache[key] = {name: (version, updated_at) for name, version, updated_at in _version_rows(key)}
+    return cache[key]
+
+
+async def aload_versions(request, names) -> None:
+    """
+    Carga las versiones con el ORM asíncrono antes de llamar a data_etag()
+    o data_last_modified() desde una vista async (ahí no se puede
+    consultar la BD de forma síncrona).
+    """
+    cache = _version_cache(request)
+    key = tuple(sorted(names))
+    if key not in cache:
+        cache[key] = {name: (version, updated_at) async for name, version, updated_at in _version_rows(key)}
+
+
+def data_etag(request, names) -> str:
+    """
+    ETag de una respuesta: versiones de los modelos + URL completa
+    (los parámetros cambian el contenido) + Accept.
+    """
+    versions = _versions(request, names)
+    parts = [f"{name}:{versions.get(name, (0, None))[0]}" for name in sorted(names)]
+    parts.append(request.get_full_path())
+    parts.append(request.META.get("HTTP_ACCEPT", ""))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def data_last_modified(request, names):
+    dates = [updated_at for _version, updated_at in _versions(request, names).values()]
+    return max(dates) if dates else None
+
+
+def conditional_on(*names: str):
+    """
+    Decorador de vistas de lectura que dependen de los modelos indicados:
+    añade ETag y Last-Modified, responde 304 a If-None-Match /
+    If-Modified-Since sin ejecutar la vista y obliga al navegador a
+    revalidar (Cache-Control: no-cache) en lugar de reutilizar sin
+    preguntar. Sirve también para vistas async.
+    """
+    check = condition(
+        etag_func=lambda request, *args, **kwargs: data_etag(request, names),
+        last_modified_func=lambda request, *args, **kwargs: data_last_modified(request, names),
+    )
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @check
+            @wraps(view)
+            async def checked(request, *args, **kwargs):
+                response = await view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            @wraps(view)
+            async def ainner(request, *args, **kwargs):
+                # condition() llama a las funciones de ETag de forma síncrona
+                await aload_versions(request, names)
+                return await checked(request, *args, **kwargs)
+            return ainner
+
+        @check
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
@@ -1,16 +1,39 @@
+import datetime
 import json
 
+import numpy as np
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
 from .models import Flight, Photo, Zone
 from .serializers import FlightSerializer, PhotoSerializer, ZoneSerializer
 from .forms import PhotoUploadForm, FlightForm
-from django.db.models import Q, Count
+from .tiles import TILE_LAYERS, aget_tile
+from .zone_index import ZoneIndex
+from .conflicts import check_flight_conflicts
+from .geojson_stream import EXPORT_FORMATS, afeature_chunks, feature_chunks
+from .geometry import extract_polygons, point_in_polygons
+from .zone_simplify import lod_for_tolerance, tolerance_for_zoom
+from .paths import DEFAULT_PRECISION, MAX_PRECISION, PATH_ENCODINGS, encode_lines
+from .geodesy import as_lat_lon, haversine_km, path_length_km, resample_path
+from .pagination import KeysetPagination
+from .versioning import conditional_on
+from .response_cache import cached_response
+from .serializers import requested_fields
+from django.db.models import Q, F, Count, Avg, Max
+from django.db.models.functions import Floor, Trunc
+from django.core.handlers.asgi import ASGIRequest
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 
 # -----------------------
@@ -18,18 +41,600 @@ from django.urls import reverse
 # -----------------------
 
 class FlightViewSet(viewsets.ModelViewSet):
+    """
+    Filtros (en SQL): ?bbox=, ?date_after=, ?date_before=.
+    Paginación opcional con ?page_size= / ?cursor=; ?fields= para
+    elegir campos (sin path_geojson no se lee la ruta de la BD).
+    """
     queryset = Flight.objects.all().order_by('-date', 'id')
     serializer_class = FlightSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        wanted = requested_fields(self.request)
+        if wanted and 'path_geojson' not in wanted:
+            qs = qs.defer('path_geojson')
+        return qs
+
+    @method_decorator(conditional_on('flight'))
+    @method_decorator(cached_response('flight'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        if params.get('bbox'):
+            queryset = queryset.intersecting_bbox(_parse_bbox(params['bbox']))
+        date_after = _parse_date_param(params, 'date_after')
+        if date_after:
+            queryset = queryset.filter(date__gte=date_after)
+        date_before = _parse_date_param(params, 'date_before')
+        if date_before:
+            queryset = queryset.filter(date__lte=date_before)
+        return queryset
+
+    def _path_options(self):
+        """
+        Nivel de detalle y codificación de la ruta en las lecturas:
+          ?simplify=<grados> o ?zoom=<0-22>  → ruta simplificada (Douglas–Peucker)
+          ?encoding=polyline|delta[&precision=<0-7>] → ruta codificada en "path"
+        """
+        request = getattr(self, 'request', None)
+        if request is None or request.method != 'GET':
+            return None
+        params = request.query_params
+
+        tolerance = None
+        if params.get('simplify') not in (None, ''):
+            tolerance = _parse_tolerance(params.get('simplify'))
+        elif params.get('zoom') not in (None, ''):
+            tolerance = tolerance_for_zoom(_parse_zoom(params.get('zoom')))
+
+        encoding, precision = _parse_path_encoding(params)
+
+        if tolerance is None and encoding is None:
+            return None
+        return {'tolerance': tolerance, 'encoding': encoding, 'precision': precision}
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['path_options'] = self._path_options()
+        return context
+
+    @method_decorator(conditional_on('flight'))
+    @method_decorator(cached_response('flight'))
+    @action(detail=True, methods=['get'])
+    def track(self, request, pk=None):
+        """
+        Ruta remuestreada en puntos equiespaciados para animarla a
+        velocidad constante: ?frames=<2-5000> (por defecto 300) o
+        ?step=<metros> entre puntos; ?encoding=polyline|delta como en
+        el listado. Sin codificación devuelve "coordinates" [[lon, lat], ...].
+        """
+        flight = self.get_object()
+        params = request.query_params
+        encoding, precision = _parse_path_encoding(params)
+
+        pts = flight._extract_line_coordinates()
+        if len(pts) < 2:
+            raise NotFound('El vuelo no tiene ruta')
+        lats, lons = as_lat_lon(pts)
+
+        frames = TRACK_DEFAULT_FRAMES
+        if params.get('step') not in (None, ''):
+            try:
+                step_m = float(params['step'])
+            except ValueError:
+                raise ValidationError({'step': 'Debe ser un número'})
+            if step_m <= 0:
+                raise ValidationError({'step': 'Debe ser mayor que 0'})
+            length_m = path_length_km(lats, lons) * 1000.0
+            frames = min(int(length_m // step_m) + 1, TRACK_MAX_FRAMES)
+        elif params.get('frames') not in (None, ''):
+            try:
+                frames = int(params['frames'])
+            except ValueError:
+                raise ValidationError({'frames': 'Debe ser un entero'})
+        frames = max(2, min(frames, TRACK_MAX_FRAMES))
+
+        track_lats, track_lons, total_km = resample_path(lats, lons, frames)
+        coords = np.column_stack([track_lons, track_lats])
+
+        data = {
+            'flight_id': flight.id,
+            'distance_km': round(total_km, 4),
+            'frames': len(coords),
+            'step_m': round(total_km * 1000.0 / (len(coords) - 1), 3) if len(coords) > 1 else 0.0,
+        }
+        if encoding:
+            data['path'] = {
+                'encoding': encoding,
+                'precision': precision,
+                'lines': encode_lines([coords], encoding, precision),
+            }
+        else:
+            data['coordinates'] = np.round(coords, 7).tolist()
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def conflicts(self, request, pk=None):
+        """
+        Zonas prohibidas/restringidas que atraviesa la ruta del vuelo,
+        con los puntos de entrada y salida de cada tramo.
+        Con ?all=1 se comprueban todas las zonas, sea cual sea su tipo.
+        """
+        flight = self.get_object()
+        all_zones = request.query_params.get('all') in ('1', 'true')
+        return Response({
+            'flight_id': flight.id,
+            'conflicts': check_flight_conflicts(flight.path_geojson, all_zones=all_zones),
+        })
 
 
 class PhotoViewSet(viewsets.ModelViewSet):
+    """
+    Filtros (en SQL): ?bbox=, ?flight=, ?taken_after=, ?taken_before=.
+    Paginación opcional con ?page_size= / ?cursor=; ?fields= para
+    elegir campos.
+    """
     queryset = Photo.objects.all().order_by('-taken_at', '-id')
     serializer_class = PhotoSerializer
+    pagination_class = KeysetPagination
+
+    @method_decorator(conditional_on('photo'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'clusters', 'heatmap', 'timeline'):
+            return queryset
+        params = self.request.query_params
+        if params.get('bbox'):
+            queryset = queryset.within_bbox(_parse_bbox(params['bbox']))
+        if params.get('flight'):
+            try:
+                queryset = queryset.filter(flight_id=int(params['flight']))
+            except ValueError:
+                raise ValidationError({'flight': 'Debe ser un entero'})
+        taken_after = _parse_datetime_param(params, 'taken_after')
+        if taken_after:
+            queryset = queryset.filter(taken_at__gte=taken_after)
+        taken_before = _parse_datetime_param(params, 'taken_before', end_of_day=True)
+        if taken_before:
+            queryset = queryset.filter(taken_at__lte=taken_before)
+        return queryset
+
+    @method_decorator(conditional_on('photo'))
+    @action(detail=False, methods=['get'])
+    def clusters(self, request):
+        """
+        Agrupa las fotos de un bbox en celdas de rejilla según el zoom.
+        Parámetros: ?bbox=min_lon,min_lat,max_lon,max_lat&zoom=<0-22>
+        [&flight=<id>][&taken_after=][&taken_before=]
+
+        Cada celda devuelve nº de fotos, centroide y una foto representativa
+        (la de id más alto). La agregación se hace en SQL.
+        """
+        # El bbox es obligatorio aquí; filter_queryset lo aplica junto con
+        # el resto de filtros (y valida ?flight=)
+        _parse_bbox(request.query_params.get('bbox'))
+        zoom = _parse_zoom(request.query_params.get('zoom'))
+
+        photos = self.filter_queryset(self.get_queryset())
+
+        cell = _cluster_cell_size(zoom)
+        clusters = (
+            photos
+            .annotate(
+                cell_x=Floor((F('lon') + 180.0) / cell),
+                cell_y=Floor((F('lat') + 90.0) / cell),
+            )
+            .values('cell_x', 'cell_y')
+            .annotate(
+                count=Count('id'),
+                lat=Avg('lat'),
+                lon=Avg('lon'),
+                photo_id=Max('id'),
+            )
+            .order_by()
+        )
+
+        results = [
+            {
+                'lat': c['lat'],
+                'lon': c['lon'],
+                'count': c['count'],
+                'photo_id': c['photo_id'],
+            }
+            for c in clusters
+        ]
+        return Response({
+            'zoom': zoom,
+            'cell_size': cell,
+            'count': len(results),
+            'results': results,
+        })
+
+    @method_decorator(conditional_on('photo'))
+    @method_decorator(cached_response('photo'))
+    @action(detail=False, methods=['get'])
+    def heatmap(self, request):
+        """
+        Densidad de fotos para el mapa de calor, agregada en SQL.
+        Parámetros: ?zoom=<0-22>[&bbox=...][&flight=][&taken_after=][&taken_before=]
+
+        Devuelve una celda por cada grupo de fotos: [lat, lon, nº de fotos]
+        con el centro de la celda, más el máximo para normalizar en el
+        cliente. El tamaño de la respuesta depende del área visible, no
+        del número de fotos.
+        """
+        zoom = _parse_zoom(request.query_params.get('zoom'))
+        cell = _cluster_cell_size(zoom, HEATMAP_CELL_PX)
+
+        photos = self.filter_queryset(self.get_queryset()).filter(
+            lat__isnull=False, lon__isnull=False,
+        )
+        rows = (
+            photos
+            .annotate(
+                cell_x=Floor((F('lon') + 180.0) / cell),
+                cell_y=Floor((F('lat') + 90.0) / cell),
+            )
+            .values('cell_x', 'cell_y')
+            .annotate(count=Count('id'))
+            .values_list('cell_x', 'cell_y', 'count')
+            .order_by()
+        )
+
+        cells = [
+            [round((y + 0.5) * cell - 90.0, 6), round((x + 0.5) * cell - 180.0, 6), n]
+            for x, y, n in rows
+        ]
+        return Response({
+            'zoom': zoom,
+            'cell_size': cell,
+            'max': max((c[2] for c in cells), default=0),
+            'total': sum(c[2] for c in cells),
+            'cells': cells,
+        })
+
+
+    @method_decorator(conditional_on('photo'))
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Fotos a menos de ?radius=<metros> (por defecto 500) de ?lat=&lon=,
+        de la más cercana a la más lejana (máx. ?limit=, por defecto 50).
+        Las candidatas salen del índice de geohash; la distancia exacta
+        (haversine) se calcula con NumPy solo sobre ellas.
+        """
+        params = request.query_params
+        try:
+            lat = float(params['lat'])
+            lon = float(params['lon'])
+        except (KeyError, ValueError):
+            raise ValidationError({'detail': 'Parámetros obligatorios: lat y lon (números)'})
+        try:
+            radius = float(params.get('radius') or NEARBY_DEFAULT_RADIUS_M)
+            limit = int(params.get('limit') or NEARBY_DEFAULT_LIMIT)
+        except ValueError:
+            raise ValidationError({'detail': 'radius y limit deben ser números'})
+        radius = max(0.0, min(radius, NEARBY_MAX_RADIUS_M))
+        limit = max(1, min(limit, NEARBY_MAX_LIMIT))
+
+        candidates = list(Photo.objects.near(lat, lon, radius).values_list('id', 'lat', 'lon'))
+        if not candidates:
+            return Response({'count': 0, 'results': []})
+
+        ids, lats, lons = (np.asarray(col) for col in zip(*candidates))
+        dist_m = haversine_km(lat, lon, lats.astype(float), lons.astype(float)) * 1000.0
+        inside = np.flatnonzero(dist_m <= radius)
+        order = inside[np.argsort(dist_m[inside], kind='stable')][:limit]
+
+        photos = Photo.objects.in_bulk(ids[order].tolist())
+        results = []
+        for i in order.tolist():
+            item = self.get_serializer(photos[int(ids[i])]).data
+            item['distance_m'] = round(float(dist_m[i]), 2)
+            results.append(item)
+        return Response({'count': len(results), 'results': results})
+
+    @method_decorator(conditional_on('photo'))
+    @method_decorator(cached_response('photo'))
+    @action(detail=False, methods=['get'])
+    def timeline(self, request):
+        """
+        Nº de fotos por intervalo de tiempo, agrupado en SQL (usa el índice
+        de taken_at). ?bucket=hour|day|week|month (por defecto day) y los
+        mismos filtros que el listado: bbox, flight, taken_after, taken_before.
+        Las fotos sin fecha no se cuentan.
+        """
+        bucket = request.query_params.get('bucket') or 'day'
+        if bucket not in TIMELINE_BUCKETS:
+            raise ValidationError({'bucket': f"Debe ser uno de: {', '.join(TIMELINE_BUCKETS)}"})
+
+        photos = self.filter_queryset(self.get_queryset()).filter(taken_at__isnull=False)
+        rows = (
+            photos
+            .annotate(start=Trunc('taken_at', bucket, tzinfo=timezone.get_current_timezone()))
+            .values('start')
+            .annotate(count=Count('id'))
+            .values_list('start', 'count')
+            .order_by('start')
+        )
+
+        results = [{'start': start.isoformat(), 'count': count} for start, count in rows]
+        return Response({
+            'bucket': bucket,
+            'total': sum(r['count'] for r in results),
+            'results': results,
+        })
 
 
 class ZoneViewSet(viewsets.ModelViewSet):
-    queryset = Zone.objects.all()
+    """
+    Filtros (en SQL): ?bbox=, ?zone_type= (contiene, sin mayúsculas).
+    Paginación opcional con ?page_size= / ?cursor=; ?fields= para
+    elegir campos (sin geometry no se lee la geometría de la BD).
+    """
+    queryset = Zone.objects.all().order_by('id')
     serializer_class = ZoneSerializer
+    pagination_class = KeysetPagination
+
+    # Máximo de puntos aceptados en una consulta por lotes
+    MAX_BATCH_POINTS = 10000
+
+    def _zone_lod(self):
+        """
+        Nivel simplificado pedido con ?tolerance=<grados> o ?zoom=<0-22>
+        (solo en lecturas); None para la geometría original.
+        """
+        request = getattr(self, 'request', None)
+        if request is None or request.method != 'GET':
+            return None
+        params = request.query_params
+        if params.get('tolerance') not in (None, ''):
+            return lod_for_tolerance(_parse_tolerance(params.get('tolerance')))
+        if params.get('zoom') not in (None, ''):
+            return lod_for_tolerance(tolerance_for_zoom(_parse_zoom(params.get('zoom'))))
+        return None
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # No traer de la BD la versión que no se va a enviar
+            wanted = requested_fields(self.request)
+            if wanted and 'geometry' not in wanted:
+                qs = qs.defer('geometry', 'simplified')
+            elif self._zone_lod():
+                qs = qs.defer('geometry')
+            else:
+                qs = qs.defer('simplified')
+        return qs
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        if params.get('bbox'):
+            queryset = queryset.intersecting_bbox(_parse_bbox(params['bbox']))
+        if params.get('zone_type'):
+            queryset = queryset.filter(zone_type__icontains=params['zone_type'])
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['zone_lod'] = self._zone_lod()
+        return context
+
+    @method_decorator(conditional_on('zone'))
+    @method_decorator(cached_response('zone'))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'], url_path='at')
+    def at(self, request):
+        """
+        Zonas UAS que contienen un punto: ?lat=<float>&lon=<float>.
+        Primero se filtra por bbox en SQL y después se hace el test exacto.
+        """
+        try:
+            lat = float(request.query_params.get('lat'))
+            lon = float(request.query_params.get('lon'))
+        except (TypeError, ValueError):
+            raise ValidationError({'detail': 'Parámetros lat y lon obligatorios y numéricos'})
+
+        zones = [
+            z for z in Zone.objects.containing_point(lon, lat)
+            if point_in_polygons(lon, lat, extract_polygons(z.geometry))
+        ]
+        serializer = self.get_serializer(zones, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='at/batch')
+    def at_batch(self, request):
+        """
+        Versión por lotes: recibe {"points": [[lon, lat], ...]} y devuelve,
+        para cada punto, la lista de ids de zona que lo contienen.
+        """
+        raw_points = request.data.get('points') if isinstance(request.data, dict) else None
+        if not isinstance(raw_points, list):
+            raise ValidationError({'points': 'Se espera una lista [[lon, lat], ...]'})
+        if len(raw_points) > self.MAX_BATCH_POINTS:
+            raise ValidationError({'points': f'Máximo {self.MAX_BATCH_POINTS} puntos por petición'})
+
+        points = []
+        for p in raw_points:
+            try:
+                if isinstance(p, dict):
+                    points.append((float(p['lon']), float(p['lat'])))
+                else:
+                    points.append((float(p[0]), float(p[1])))
+            except (KeyError, IndexError, TypeError, ValueError):
+                raise ValidationError({'points': f'Punto no válido: {p!r}'})
+
+        if not points:
+            return Response({'results': [], 'zones': {}})
+
+        # Solo cargamos las zonas que pueden afectar al conjunto de puntos
+        bbox = (
+            min(p[0] for p in points), min(p[1] for p in points),
+            max(p[0] for p in points), max(p[1] for p in points),
+        )
+        index = ZoneIndex.for_bbox(bbox)
+        results = index.zones_at_many(points)
+
+        used = {pk for ids in results for pk in ids}
+        zones = {
+            pk: {'name': index.zones[pk].name, 'zone_type': index.zones[pk].zone_type}
+            for pk in used
+        }
+        return Response({'results': results, 'zones': zones})
+
+
+# Búsqueda por cercanía (PhotoViewSet.nearby)
+NEARBY_DEFAULT_RADIUS_M = 500
+NEARBY_MAX_RADIUS_M = 50_000
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 500
+
+# Intervalos admitidos por PhotoViewSet.timeline (nombres de Trunc)
+TIMELINE_BUCKETS = ('hour', 'day', 'week', 'month')
+
+# Puntos de la ruta remuestreada para animaciones (FlightViewSet.track)
+TRACK_DEFAULT_FRAMES = 300
+TRACK_MAX_FRAMES = 5000
+
+# Tamaño de celda (en píxeles de pantalla) usado para agrupar fotos
+CLUSTER_CELL_PX = 64
+
+# Celda del mapa de calor (px): bastante menor que el radio de difuminado
+# de Leaflet.heat, así que la agregación no se nota en pantalla
+HEATMAP_CELL_PX = 4
+
+
+def _parse_bbox(value):
+    """
+    Convierte "min_lon,min_lat,max_lon,max_lat" en una tupla de floats.
+    Lanza ValidationError (400) si el formato no es correcto.
+    """
+    if not value:
+        raise ValidationError({'bbox': 'Parámetro obligatorio: min_lon,min_lat,max_lon,max_lat'})
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(','))
+    except ValueError:
+        raise ValidationError({'bbox': 'Formato esperado: min_lon,min_lat,max_lon,max_lat'})
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValidationError({'bbox': 'El bbox tiene los mínimos mayores que los máximos'})
+    return (min_lon, min_lat, max_lon, max_lat)
+
+
+def _parse_path_encoding(params):
+    """
+    ?encoding=polyline|delta[&precision=<0-7>] → (encoding, precision),
+    o (None, None) si no se pide codificación.
+    """
+    encoding = params.get('encoding') or None
+    if encoding is None:
+        return None, None
+    if encoding not in PATH_ENCODINGS:
+        raise ValidationError({'encoding': f"Debe ser uno de: {', '.join(PATH_ENCODINGS)}"})
+
+    precision = DEFAULT_PRECISION[encoding]
+    if params.get('precision') not in (None, ''):
+        try:
+            precision = int(params.get('precision'))
+        except ValueError:
+            raise ValidationError({'precision': 'Debe ser un entero'})
+        if not 0 <= precision <= MAX_PRECISION:
+            raise ValidationError({'precision': f'Debe estar entre 0 y {MAX_PRECISION}'})
+    return encoding, precision
+
+
+def _parse_date_param(params, name):
+    """
+    Parámetro opcional de fecha (AAAA-MM-DD).
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Formato esperado: AAAA-MM-DD'})
+    return parsed
+
+
+def _parse_datetime_param(params, name, end_of_day=False):
+    """
+    Parámetro opcional de fecha u hora (AAAA-MM-DD o ISO 8601).
+    Una fecha sola se toma como el inicio del día, o como el final
+    si end_of_day=True. Sin zona horaria se usa la del proyecto.
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value) if len(value) == 10 else None
+        if day is not None:
+            parsed = datetime.datetime.combine(
+                day, datetime.time.max if end_of_day else datetime.time.min
+            )
+        else:
+            parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Formato esperado: AAAA-MM-DD o AAAA-MM-DDThh:mm'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_zoom(value, default=None):
+    """
+    Convierte el parámetro zoom en entero (0-22).
+    """
+    if value in (None, ''):
+        if default is not None:
+            return default
+        raise ValidationError({'zoom': 'Parámetro obligatorio'})
+    try:
+        zoom = int(value)
+    except ValueError:
+        raise ValidationError({'zoom': 'Debe ser un entero'})
+    if not 0 <= zoom <= 22:
+        raise ValidationError({'zoom': 'Debe estar entre 0 y 22'})
+    return zoom
+
+
+def _parse_tolerance(value):
+    """
+    Convierte el parámetro tolerance (grados) en float >= 0.
+    """
+    try:
+        tolerance = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError({'tolerance': 'Debe ser un número'})
+    if tolerance < 0:
+        raise ValidationError({'tolerance': 'No puede ser negativa'})
+    return tolerance
+
+
+def _cluster_cell_size(zoom, cell_px=CLUSTER_CELL_PX):
+    """
+    Tamaño de celda en grados para un zoom dado: una tesela de 256 px
+    abarca 360 / 2^zoom grados de longitud.
+    """
+    return 360.0 / (2 ** zoom) * (cell_px / 256.0)
 
 
 # -----------------------
@@ -90,6 +695,20 @@ def edit_photo(request, pk):
     })
 
 
+def _start_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _html_date(value):
+    """
+    Fecha AAAA-MM-DD de un formulario HTML, o None si falta o no es válida.
+    """
+    try:
+        return parse_date(value) if value else None
+    except ValueError:
+        return None
+
+
 def photo_list(request):
     """
     Galería de fotos con filtro por vuelo y búsqueda por texto.
@@ -110,6 +729,16 @@ def photo_list(request):
             Q(flight__name__icontains=search_text)
         )
 
+    # Rango de fechas de toma (AAAA-MM-DD, ambos días incluidos); se
+    # compara con taken_at directamente para aprovechar su índice.
+    # Las fechas mal escritas se ignoran.
+    taken_after = _html_date(request.GET.get('taken_after'))
+    if taken_after:
+        photos = photos.filter(taken_at__gte=_start_of_day(taken_after))
+    taken_before = _html_date(request.GET.get('taken_before'))
+    if taken_before:
+        photos = photos.filter(taken_at__lt=_start_of_day(taken_before + datetime.timedelta(days=1)))
+
     flights = Flight.objects.all().order_by('-date', 'id')
 
     context = {
@@ -117,6 +746,8 @@ def photo_list(request):
         "flights": flights,
         "selected_flight_id": selected_flight_id,
         "search_text": search_text,
+        "taken_after": taken_after.isoformat() if taken_after else "",
+        "taken_before": taken_before.isoformat() if taken_before else "",
     }
     return render(request, "photos_list.html", context)
 
@@ -126,8 +757,9 @@ def photo_list(request):
 def delete_photo(request, photo_id):
     photo = get_object_or_404(Photo, id=photo_id)
 
-    # Eliminar archivo físico del disco
+    # Eliminar archivo físico del disco (y sus miniaturas)
     if photo.image:
+        photo.delete_derivatives()
         photo.image.delete(save=False)
 
     # Eliminar entrada en base de datos
@@ -143,9 +775,11 @@ def flight_list(request):
     Además, añade el número de fotos asociadas a cada vuelo (photo_count).
     """
     q = (request.GET.get("q") or "").strip()
+    sort = request.GET.get("sort") or ""
 
-    # Base queryset
-    flights = Flight.objects.all()
+    # Base queryset (sin la ruta: la distancia y el nº de puntos ya están
+    # precalculados en columnas propias)
+    flights = Flight.objects.defer("path_geojson")
 
     # Filtro de búsqueda (muy sencillo)
     if q:
@@ -157,11 +791,22 @@ def flight_list(request):
     # Anotamos nº de fotos asociadas
     flights = flights.annotate(
         photo_count=Count("photos")
-    ).order_by("-date", "id")
+    )
+
+    # Orden: por fecha (por defecto) o por distancia recorrida
+    # (mismo convenio que ?ordering= de la API: "-" es descendente)
+    if sort == "-distance":
+        flights = flights.order_by("-distance_km", "id")
+    elif sort == "distance":
+        flights = flights.order_by("distance_km", "id")
+    else:
+        sort = ""
+        flights = flights.order_by("-date", "id")
 
     context = {
         "flights": flights,
         "q": q,
+        "sort": sort,
     }
     return render(request, "flights_list.html", context)
 
@@ -182,13 +827,68 @@ def flight_create(request):
         'form': form,
     })
 
-def export_single_flight_geojson(request, flight_id):
+# Filas que se leen de la BD en cada viaje durante las exportaciones
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _export_format(request):
+    """
+    Formato pedido con ?format=geojson|geojsonseq|ndjson (por defecto geojson).
+    """
+    fmt = (request.GET.get('format') or 'geojson').lower()
+    return fmt if fmt in EXPORT_FORMATS else 'geojson'
+
+
+def _export_features(request, rows, to_feature):
+    """
+    Features de un queryset .values(); to_feature(fila) devuelve el
+    Feature o None para saltarse la fila.
+
+    Con ASGI las filas se leen con aiterator() y se obtiene un generador
+    asíncrono: mientras se espera a la BD o a un cliente lento el worker
+    sigue atendiendo otras peticiones. Con WSGI se usa iterator().
+    """
+    if isinstance(request, ASGIRequest):
+        async def _features():
+            async for row in rows.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+                feature = to_feature(row)
+                if feature is not None:
+                    yield feature
+        return _features()
+
+    return (
+        feature
+        for feature in map(to_feature, rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        if feature is not None
+    )
+
+
+def _export_response(request, features, fmt, filename=None):
     """
-    Exporta SOLO la ruta de un vuelo en formato GeoJSON.
+    Respuesta en streaming con los Features en el formato indicado.
+    filename es el nombre sin extensión para Content-Disposition.
+    El cuerpo es asíncrono con ASGI y síncrono con WSGI: cada servidor
+    consume el suyo sin cargar la exportación entera en memoria.
     """
-    from .models import Flight
+    content_type, extension = EXPORT_FORMATS[fmt]
+    if isinstance(request, ASGIRequest):
+        chunks = afeature_chunks(features, fmt)
+    else:
+        chunks = feature_chunks(features, fmt)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}.{extension}"'
+    return response
 
-    flight = Flight.objects.filter(id=flight_id).first()
+
+@conditional_on('flight')
+@cached_response('flight')
+async def export_single_flight_geojson(request, flight_id):
+    """
+    Exporta SOLO la ruta de un vuelo en formato GeoJSON
+    (o como secuencia de un registro con ?format=geojsonseq|ndjson).
+    """
+    flight = await Flight.objects.filter(id=flight_id).afirst()
     if not flight or not flight.path_geojson:
         return JsonResponse({"error": "Vuelo no encontrado o sin ruta"}, status=404)
 
@@ -203,6 +903,10 @@ def export_single_flight_geojson(request, flight_id):
         "geometry": flight.path_geojson
     }
 
+    fmt = request.GET.get('format')
+    if fmt in ('geojsonseq', 'ndjson'):
+        return _export_response(request, [feature], fmt, f'flight_{flight.id}')
+
     response = HttpResponse(
         json.dumps(feature, indent=2),
         content_type="application/geo+json"
@@ -218,62 +922,72 @@ def map3d_view(request):
     """
     return render(request, 'map3d.html')
 
-def export_flights_geojson(request):
+def _flight_line(gj):
     """
-    Exporta todos los vuelos con ruta (path_geojson) en formato GeoJSON estándar.
-    Cada vuelo se convierte en un Feature con geometría LineString y propiedades
-    como id, nombre, modelo de dron, fecha y número de fotos asociadas.
+    Devuelve la LineString de una ruta, o None si no es válida. Aceptamos:
+      - {"type": "LineString", "coordinates": [...]}
+      - {"type": "Feature", "geometry": {"type": "LineString", ...}}
     """
-    features = []
-
-    for flight in Flight.objects.all().order_by('-date', 'id'):
-        gj = flight.path_geojson
-        if not gj:
-            # Si el vuelo no tiene ruta, lo saltamos
-            continue
-
-        line = None
-
-        # Aceptamos:
-        #  - {"type": "LineString", "coordinates": [...]}
-        #  - {"type": "Feature", "geometry": {"type": "LineString", ...}}
-        if isinstance(gj, dict):
-            if gj.get('type') == 'LineString':
-                line = gj
-            elif gj.get('type') == 'Feature':
-                geom = gj.get('geometry') or {}
-                if geom.get('type') == 'LineString':
-                    line = geom
-
-        # Si no hemos podido obtener una LineString válida, lo saltamos
-        if not line or not isinstance(line.get('coordinates'), list) or not line['coordinates']:
-            continue
-
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "id": flight.id,
-                "name": flight.name,
-                "drone_model": flight.drone_model,
-                "date": flight.date.isoformat() if flight.date else None,
-                "num_photos": flight.photos.count(),
-            },
-            "geometry": line,
-        }
-        features.append(feature)
+    line = None
+    if isinstance(gj, dict):
+        if gj.get('type') == 'LineString':
+            line = gj
+        elif gj.get('type') == 'Feature':
+            geom = gj.get('geometry') or {}
+            if geom.get('type') == 'LineString':
+                line = geom
+
+    if not line or not isinstance(line.get('coordinates'), list) or not line['coordinates']:
+        return None
+    return line
 
-    data = {
-        "type": "FeatureCollection",
-        "features": features,
+
+def _flight_feature(flight):
+    """
+    Feature de un vuelo (fila .values()), o None si no tiene ruta válida.
+    """
+    line = _flight_line(flight['path_geojson'])
+    if line is None:
+        return None
+
+    return {
+        "type": "Feature",
+        "properties": {
+            "id": flight['id'],
+            "name": flight['name'],
+            "drone_model": flight['drone_model'],
+            "date": flight['date'].isoformat() if flight['date'] else None,
+            "num_photos": flight['num_photos'],
+        },
+        "geometry": line,
     }
 
-    # Devolvemos GeoJSON bonito e identificable como tal
-    return JsonResponse(
-        data,
-        json_dumps_params={"indent": 2},
-        content_type="application/geo+json"
+
+@conditional_on('flight', 'photo')
+@cached_response('flight', 'photo')
+async def export_flights_geojson(request):
+    """
+    Exporta todos los vuelos con ruta (path_geojson) en formato GeoJSON estándar.
+    Cada vuelo se convierte en un Feature con geometría LineString y propiedades
+    como id, nombre, modelo de dron, fecha y número de fotos asociadas.
+    Admite ?format=geojsonseq o ?format=ndjson (un vuelo por línea).
+
+    La respuesta se genera en streaming con una única consulta
+    (el nº de fotos va anotado), así que la memoria no depende del nº de vuelos.
+    """
+    flights = (
+        Flight.objects
+        .exclude(path_geojson__isnull=True)
+        .annotate(num_photos=Count('photos'))
+        .order_by('-date', 'id')
+        .values('id', 'name', 'drone_model', 'date', 'path_geojson', 'num_photos')
     )
 
+    fmt = _export_format(request)
+    features = _export_features(request, flights, _flight_feature)
+    # El FeatureCollection clásico se sigue sirviendo sin adjunto
+    return _export_response(request, features, fmt, None if fmt == 'geojson' else 'flights')
+
 def delete_flight(request, flight_id):
     flight = get_object_or_404(Flight, id=flight_id)
     flight.delete()
@@ -281,51 +995,59 @@ def delete_flight(request, flight_id):
     return redirect('flight_list')
 
 
-def export_photos_geojson(request):
+def _photo_feature(request, storage, p):
+    """
+    Feature de una foto a partir de una fila .values().
+    """
+    image_url = request.build_absolute_uri(storage.url(p['image'])) if p['image'] else None
+
+    return {
+        "type": "Feature",
+        "properties": {
+            "id": p['id'],
+            "flight_id": p['flight_id'],
+            "flight_name": p['flight__name'],
+            "taken_at": p['taken_at'].isoformat() if p['taken_at'] else None,
+            "notes": p['notes'],
+            "image_url": image_url,
+        },
+        "geometry": {
+            "type": "Point",
+            # GeoJSON siempre va [lon, lat]
+            "coordinates": [p['lon'], p['lat']],
+        },
+    }
+
+
+@conditional_on('photo', 'flight')
+@cached_response('photo', 'flight')
+async def export_photos_geojson(request):
     """
     Exporta las fotos como un FeatureCollection GeoJSON.
     Opcionalmente puede filtrar por ?flight=<id>.
+    Con ?format=geojsonseq (RFC 8142) o ?format=ndjson se exporta una
+    foto por línea.
+
+    Se genera en streaming: el nombre del vuelo llega por JOIN en la misma
+    consulta y las filas se leen por bloques, así que la memoria y el nº de
+    consultas no crecen con el número de fotos.
     """
     flight_id = request.GET.get('flight')
 
-    photos_qs = Photo.objects.all()
+    # Solo fotos con coordenadas válidas
+    photos_qs = Photo.objects.filter(lat__isnull=False, lon__isnull=False)
     if flight_id:
         photos_qs = photos_qs.filter(flight_id=flight_id)
 
-    features = []
-    for p in photos_qs:
-        # Solo fotos con coordenadas válidas
-        if p.lat is None or p.lon is None:
-            continue
-
-        image_url = request.build_absolute_uri(p.image.url) if p.image else None
-
-        features.append({
-            "type": "Feature",
-            "properties": {
-                "id": p.id,
-                "flight_id": p.flight_id,
-                "flight_name": p.flight.name if p.flight else None,
-                "taken_at": p.taken_at.isoformat() if p.taken_at else None,
-                "notes": p.notes,
-                "image_url": image_url,
-            },
-            "geometry": {
-                "type": "Point",
-                # GeoJSON siempre va [lon, lat]
-                "coordinates": [p.lon, p.lat],
-            },
-        })
-
-    data = {
-        "type": "FeatureCollection",
-        "features": features,
-    }
+    photos = (
+        photos_qs
+        .order_by('id')
+        .values('id', 'flight_id', 'flight__name', 'taken_at', 'notes', 'image', 'lat', 'lon')
+    )
 
-    response = JsonResponse(data)
-    response["Content-Type"] = "application/geo+json"
-    response["Content-Disposition"] = 'attachment; filename="photos.geojson"'
-    return response
+    storage = Photo._meta.get_field('image').storage
+    features = _export_features(request, photos, lambda row: _photo_feature(request, storage, row))
+    return _export_response(request, features, _export_format(request), 'photos')
 
 def edit_flight_path(request, flight_id):
     """
@@ -348,6 +1070,11 @@ def edit_flight_path(request, flight_id):
                 flight.path_geojson = geojson_obj
                 flight.save()
                 messages.success(request, "Ruta del vuelo guardada correctamente.")
+
+                conflicts = check_flight_conflicts(flight.path_geojson)
+                if conflicts:
+                    names = ", ".join(c["name"] for c in conflicts)
+                    messages.warning(request, f"La ruta atraviesa zonas UAS prohibidas o restringidas: {names}")
                 return redirect("flight_list")
         else:
             # Si no se ha enviado nada, interpretamos como “sin ruta”
@@ -383,7 +1110,38 @@ def api_save_flight_path(request, flight_id):
         flight.path_geojson = geojson
         flight.save()
 
-        return JsonResponse({"status": "ok"})
+        return JsonResponse({
+            "status": "ok",
+            "conflicts": check_flight_conflicts(flight.path_geojson),
+        })
     except Exception as exc:
         return JsonResponse({"error": str(exc)}, status=400)
 
+
+
+async def vector_tile(request, layer, z, x, y):
+    """
+    Devuelve una tesela vectorial (Mapbox Vector Tile) de fotos, rutas
+    de vuelo o zonas UAS. Las teselas se cachean en el servidor.
+    Con ?flight=<id> las fotos y rutas se limitan a ese vuelo.
+    """
+    if layer not in TILE_LAYERS:
+        raise Http404("Capa desconocida")
+
+    if not (0 <= z <= 22) or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        raise Http404("Tesela fuera de rango")
+
+    # Las zonas no dependen del vuelo: misma tesela (y entrada de caché)
+    flight = request.GET.get("flight") if layer != "zones" else None
+    if flight:
+        if not flight.isdigit():
+            raise Http404("Vuelo no válido")
+        flight = int(flight)
+    else:
+        flight = None
+
+    data = await aget_tile(layer, z, x, y, flight)
+
+    response = HttpResponse(data, content_type="application/vnd.mapbox-vector-tile")
+    response["Cache-Control"] = "public, max-age=60"
+    return response
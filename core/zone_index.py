@@ -0,0 +1,159 @@
+# core/zone_index.py
+
+"""
+Índice espacial en memoria sobre los bounding boxes de las zonas UAS.
+
+Las columnas min_lon/min_lat/max_lon/max_lat de Zone permiten filtrar
+candidatas en SQL; para consultas por lotes (miles de puntos) se
+construye además una rejilla uniforme en memoria, de modo que cada
+punto solo se compara con las zonas de su celda.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+from .geometry import extract_polygons, point_in_polygons
+
+BBox = Tuple[float, float, float, float]
+
+# Tamaño mínimo de celda (grados, ~1 cm) para extensiones degeneradas:
+# una sola zona, o zonas alineadas en un meridiano o un paralelo
+MIN_CELL_DEG = 1e-7
+
+
+class BBoxGridIndex:
+    """
+    Rejilla uniforme de bounding boxes. Cada bbox se registra en todas
+    las celdas que toca; una consulta por punto solo mira una celda.
+    """
+
+    def __init__(self, items: Iterable[Tuple[Hashable, BBox]], cells_per_axis: int = None):
+        self._bboxes: Dict[Hashable, BBox] = dict(items)
+        self._cells: Dict[Tuple[int, int], List[Hashable]] = defaultdict(list)
+
+        if not self._bboxes:
+            self.min_lon = self.min_lat = 0.0
+            self.max_lon = self.max_lat = 0.0
+            self.cell_w = self.cell_h = 1.0
+            self.cells_per_axis = 1
+            return
+
+        self.min_lon = min(b[0] for b in self._bboxes.values())
+        self.min_lat = min(b[1] for b in self._bboxes.values())
+        self.max_lon = max(b[2] for b in self._bboxes.values())
+        self.max_lat = max(b[3] for b in self._bboxes.values())
+
+        # Aproximadamente una bbox por celda si se reparten uniformemente
+        if cells_per_axis is None:
+            cells_per_axis = max(1, int(math.sqrt(len(self._bboxes))))
+        self.cells_per_axis = cells_per_axis
+        self.cell_w = max((self.max_lon - self.min_lon) / cells_per_axis, MIN_CELL_DEG)
+        self.cell_h = max((self.max_lat - self.min_lat) / cells_per_axis, MIN_CELL_DEG)
+
+        for key, bbox in self._bboxes.items():
+            x0, y0 = self._cell(bbox[0], bbox[1])
+            x1, y1 = self._cell(bbox[2], bbox[3])
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self._cells[(cx, cy)].append(key)
+
+    def __len__(self):
+        return len(self._bboxes)
+
+    def _cell(self, lon: float, lat: float) -> Tuple[int, int]:
+        # Acotado a la rejilla: lo que cae fuera va a la celda del borde
+        # (la comprobación de bbox posterior descarta falsos candidatos)
+        last = self.cells_per_axis - 1
+        return (
+            min(max(int((lon - self.min_lon) // self.cell_w), 0), last),
+            min(max(int((lat - self.min_lat) // self.cell_h), 0), last),
+        )
+
+    def query_point(self, lon: float, lat: float) -> List[Hashable]:
+        """
+        Claves cuyas bbox contienen el punto.
+        """
+        result = []
+        for key in self._cells.get(self._cell(lon, lat), ()):
+            b = self._bboxes[key]
+            if b[0] <= lon <= b[2] and b[1] <= lat <= b[3]:
+                result.append(key)
+        return result
+
+    def query_bbox(self, bbox: BBox) -> List[Hashable]:
+        """
+        Claves cuyas bbox intersectan con la bbox dada.
+        Solo se recorren las celdas de la rejilla, por grande que sea la
+        bbox consultada.
+        """
+        if (not self._bboxes or bbox[2] < self.min_lon or bbox[0] > self.max_lon
+                or bbox[3] < self.min_lat or bbox[1] > self.max_lat):
+            return []
+        x0, y0 = self._cell(bbox[0], bbox[1])
+        x1, y1 = self._cell(bbox[2], bbox[3])
+        seen = set()
+        result = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for key in self._cells.get((cx, cy), ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    b = self._bboxes[key]
+                    if not (b[2] < bbox[0] or b[0] > bbox[2] or b[3] < bbox[1] or b[1] > bbox[3]):
+                        result.append(key)
+        return result
+
+
+class ZoneIndex:
+    """
+    Índice de zonas listo para consultas punto-en-zona.
+    Guarda los polígonos ya extraídos para no reparsear el GeoJSON.
+    """
+
+    def __init__(self, zones: Iterable):
+        self.zones = {}
+        self.polygons = {}
+        items = []
+        for zone in zones:
+            if zone.min_lon is None:
+                continue
+            self.zones[zone.pk] = zone
+            self.polygons[zone.pk] = extract_polygons(zone.geometry)
+            items.append((zone.pk, (zone.min_lon, zone.min_lat, zone.max_lon, zone.max_lat)))
+        self.grid = BBoxGridIndex(items)
+
+    @classmethod
+    def for_bbox(cls, bbox: BBox = None, queryset=None):
+        """
+        Construye el índice con las zonas cuya bbox intersecta con la dada
+        (o con todas si no se indica), filtrando en SQL. Se puede partir
+        de un queryset ya filtrado (por ejemplo, por tipo de zona).
+        """
+        from .models import Zone
+
+        if queryset is None:
+            queryset = Zone.objects.all()
+        qs = queryset.exclude(min_lon__isnull=True)
+        if bbox is not None:
+            qs = qs.intersecting_bbox(bbox)
+        return cls(qs.only('id', 'name', 'zone_type', 'geometry',
+                           'min_lon', 'min_lat', 'max_lon', 'max_lat'))
+
+    def zones_at(self, lon: float, lat: float) -> List[int]:
+        """
+        Ids de las zonas que contienen el punto.
+        """
+        return [
+            pk for pk in self.grid.query_point(lon, lat)
+            if point_in_polygons(lon, lat, self.polygons[pk])
+        ]
+
+    def zones_at_many(self, points: Sequence[Tuple[float, float]]) -> List[List[int]]:
+        """
+        Versión por lotes de zones_at. points es una lista de (lon, lat).
+        """
+        return [self.zones_at(lon, lat) for lon, lat in points]
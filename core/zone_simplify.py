@@ -0,0 +1,257 @@
+# core/zone_simplify.py
+
+"""
+Versiones simplificadas de las zonas UAS para zooms bajos.
+
+Cada zona guarda en Zone.simplified un Feature por nivel de tolerancia
+(en grados). La simplificación respeta la topología entre zonas vecinas:
+  1. los anillos se parten en arcos por los vértices donde cambia el
+     conjunto de anillos que comparten ese vértice (uniones),
+  2. cada arco se simplifica con Douglas–Peucker una sola vez,
+  3. las zonas que comparten un borde reciben exactamente el mismo arco
+     simplificado, así que no aparecen huecos ni solapes entre ellas.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db.models import Q
+
+from .geometry import extract_polygons, simplify_dp
+
+# Tolerancias precalculadas (grados). Aproximadamente 1 píxel a
+# zoom 12, 10, 8 y 6 respectivamente.
+ZONE_LOD_TOLERANCES = (0.0003, 0.001, 0.005, 0.02)
+
+# Bboxes por consulta al buscar zonas vecinas (cada uno añade un OR)
+NEIGHBOUR_QUERY_BBOXES = 100
+
+# Precisión con la que se comparan vértices de zonas distintas
+_SNAP_DIGITS = 9
+
+
+def lod_key(tolerance: float) -> str:
+    return f"{tolerance:g}"
+
+
+def tolerance_for_zoom(zoom: int) -> float:
+    """
+    Tamaño de un píxel (en grados de longitud) a un zoom dado.
+    """
+    return 360.0 / (256 * 2 ** zoom)
+
+
+def lod_for_tolerance(tolerance: Optional[float]) -> Optional[str]:
+    """
+    Nivel precalculado más simplificado que no supera la tolerancia pedida,
+    o None si hay que usar la geometría original.
+    """
+    if tolerance is None:
+        return None
+    levels = [t for t in ZONE_LOD_TOLERANCES if t <= tolerance]
+    return lod_key(max(levels)) if levels else None
+
+
+def _snap(pt) -> Tuple[float, float]:
+    return (round(pt[0], _SNAP_DIGITS), round(pt[1], _SNAP_DIGITS))
+
+
+def _closed(ring) -> List[Tuple[float, float]]:
+    ring = [_snap(p) for p in ring]
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return ring
+
+
+def _split_at_junctions(ring, owners) -> List[list]:
+    """
+    Parte un anillo cerrado en arcos cuyos extremos son uniones.
+    Si el anillo no toca ningún otro, se devuelve entero.
+    """
+    pts = ring[:-1]
+    n = len(pts)
+    junctions = [
+        i for i in range(n)
+        if owners[pts[i]] != owners[pts[i - 1]] or owners[pts[i]] != owners[pts[(i + 1) % n]]
+    ]
+    if not junctions:
+        return [ring]
+
+    # Rotar para empezar en una unión y no cortar un arco compartido
+    start = junctions[0]
+    rotated = pts[start:] + pts[:start] + [pts[start]]
+    cuts = sorted(((j - start) % n) for j in junctions) + [n]
+
+    arcs = []
+    for a, b in zip(cuts, cuts[1:]):
+        if b > a:
+            arcs.append(rotated[a:b + 1])
+    return arcs
+
+
+class _ArcSimplifier:
+    """
+    Simplifica arcos con una caché: un arco y su inverso comparten resultado.
+    """
+
+    def __init__(self, tolerance: float):
+        self.tolerance = tolerance
+        self._cache: Dict[tuple, list] = {}
+
+    def __call__(self, arc) -> list:
+        key = tuple(arc)
+        if key in self._cache:
+            return self._cache[key]
+        # Se simplifica siempre en el mismo sentido: así dos zonas vecinas
+        # obtienen el mismo arco aunque se calculen en lotes distintos
+        rkey = key[::-1]
+        if rkey < key:
+            result = self(list(rkey))[::-1]
+        else:
+            result = simplify_dp(arc, self.tolerance)
+        self._cache[key] = result
+        return result
+
+
+def _simplify_ring(ring, owners, simplify) -> List[List[float]]:
+    out = []
+    for arc in _split_at_junctions(ring, owners):
+        simplified = simplify(arc)
+        out.extend(simplified if not out else simplified[1:])
+    if len(out) < 4:
+        # El anillo se ha colapsado a esta tolerancia: se deja sin simplificar
+        out = ring
+    return [list(p) for p in out]
+
+
+def build_zone_lods(items: Iterable[Tuple[int, dict]],
+                    tolerances=ZONE_LOD_TOLERANCES) -> Dict[int, Dict[str, dict]]:
+    """
+    Calcula los niveles simplificados de un conjunto de zonas.
+
+    items: pares (pk, geometry) con geometry tal como se guarda en Zone.
+    Devuelve {pk: {"<tolerancia>": Feature simplificado, ...}}.
+    """
+    zones = []
+    owners: Dict[Tuple[float, float], frozenset] = {}
+    ring_id = 0
+
+    for pk, geometry in items:
+        polygons = []
+        for rings in extract_polygons(geometry):
+            closed = []
+            for ring in rings:
+                ring = _closed(ring)
+                for pt in set(ring):
+                    owners[pt] = owners.get(pt, frozenset()) | {ring_id}
+                closed.append(ring)
+                ring_id += 1
+            polygons.append(closed)
+        props = geometry.get("properties") if isinstance(geometry, dict) else None
+        zones.append((pk, props, polygons))
+
+    result: Dict[int, Dict[str, dict]] = {pk: {} for pk, _props, _polys in zones}
+    for tolerance in tolerances:
+        simplify = _ArcSimplifier(tolerance)
+        for pk, props, polygons in zones:
+            if not polygons:
+                continue
+            coords = [
+                [_simplify_ring(ring, owners, simplify) for ring in rings]
+                for rings in polygons
+            ]
+            geom = (
+                {"type": "Polygon", "coordinates": coords[0]}
+                if len(coords) == 1
+                else {"type": "MultiPolygon", "coordinates": coords}
+            )
+            result[pk][lod_key(tolerance)] = {
+                "type": "Feature",
+                "properties": props or {},
+                "geometry": geom,
+            }
+    return result
+
+
+def _bbox_filter(bboxes):
+    q = Q()
+    for min_lon, min_lat, max_lon, max_lat in bboxes:
+        q |= Q(min_lon__lte=max_lon, max_lon__gte=min_lon,
+               min_lat__lte=max_lat, max_lat__gte=min_lat)
+    return q
+
+
+def zone_ids_touching(bboxes, chunk_size: int = NEIGHBOUR_QUERY_BBOXES) -> Set[int]:
+    """
+    Ids de las zonas cuyo bounding box intersecta alguno de los bboxes
+    (min_lon, min_lat, max_lon, max_lat). Acepta un iterable perezoso:
+    se consulta por bloques de chunk_size bboxes.
+    """
+    from .models import Zone
+
+    ids: Set[int] = set()
+    chunk = []
+    for bbox in bboxes:
+        if bbox is None or None in bbox:
+            continue
+        chunk.append(bbox)
+        if len(chunk) >= chunk_size:
+            ids.update(Zone.objects.filter(_bbox_filter(chunk)).values_list("id", flat=True))
+            chunk = []
+    if chunk:
+        ids.update(Zone.objects.filter(_bbox_filter(chunk)).values_list("id", flat=True))
+    return ids
+
+
+def _rebuild_batch(batch, batch_size: int) -> None:
+    """
+    Recalcula las zonas del lote. Para que los arcos coincidan con los de
+    las vecinas se cargan también todas las zonas que tocan su bbox, pero
+    solo se guardan las del lote.
+    """
+    from .models import Zone
+
+    ids = {row[0] for row in batch}
+    context = ids | zone_ids_touching(row[1:] for row in batch)
+    rows = (
+        Zone.objects.filter(pk__in=sorted(context))
+        .order_by("id")
+        .values_list("id", "geometry")
+    )
+    lods = build_zone_lods(rows.iterator(chunk_size=batch_size))
+    Zone.objects.bulk_update(
+        [Zone(pk=pk, simplified=lods.get(pk, {})) for pk in sorted(ids)],
+        ["simplified"],
+        batch_size=batch_size,
+    )
+
+
+def rebuild_zone_lods(queryset=None, batch_size: int = 500) -> int:
+    """
+    Recalcula y guarda Zone.simplified de las zonas del queryset (por
+    defecto todas). Se procesan por lotes de batch_size zonas, cada uno
+    con sus vecinas como contexto, así que la memoria depende del lote y
+    no del tamaño de la tabla. Si cambia una zona conviene pasar también
+    las que la tocan (zone_ids_touching): sus uniones pueden cambiar.
+    """
+    from .models import Zone
+    from .versioning import bump
+
+    qs = queryset if queryset is not None else Zone.objects.all()
+    rows = qs.order_by("id").values_list("id", "min_lon", "min_lat", "max_lon", "max_lat")
+
+    count = 0
+    last_id = 0
+    while True:
+        # Paginación por id: no se mantiene un cursor abierto mientras se escribe
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        _rebuild_batch(batch, batch_size)
+        count += len(batch)
+        last_id = batch[-1][0]
+
+    if count:
+        bump("zone")
+    return count
@@ -0,0 +1,30 @@
+// Decodificador de "encoded polyline" (formato de Google) para las rutas
+// que devuelve /api/flights/?encoding=polyline. Devuelve [[lat, lon], ...].
+function decodePolyline(str, precision) {
+  const factor = Math.pow(10, precision === undefined ? 5 : precision);
+  const coords = [];
+  let index = 0, lat = 0, lon = 0;
+
+  while (index < str.length) {
+    for (let k = 0; k < 2; k++) {
+      let shift = 0, result = 0, b;
+      do {
+        b = str.charCodeAt(index++) - 63;
+        result |= (b & 0x1f) << shift;
+        shift += 5;
+      } while (b >= 0x20);
+      const delta = (result & 1) ? ~(result >> 1) : (result >> 1);
+      if (k === 0) lat += delta; else lon += delta;
+    }
+    coords.push([lat / factor, lon / factor]);
+  }
+  return coords;
+}
+
+// Líneas de un vuelo de la API como arrays de [lat, lon]
+function flightPathLatLngs(flight) {
+  if (!flight.path || flight.path.encoding !== 'polyline') return [];
+  return flight.path.lines.map(function (line) {
+    return decodePolyline(line, flight.path.precision);
+  });
+}